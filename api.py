@@ -11,18 +11,34 @@ Phase 2: REST API implementation with FastAPI
 5. 순위 변동 조회 (GET /api/ranking-changes)
 6. 스크래핑 작업 이력 (GET /api/jobs/history)
 7. 시스템 상태 (GET /api/health)
+8. 대시보드 번들 (GET /api/dashboard, 크롤링 후 미리 만든 압축 JSON)
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from fastapi.exceptions import RequestValidationError
+from fastapi.exception_handlers import request_validation_exception_handler
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import sqlite3
 from contextlib import contextmanager
 import json
 import os
 from threading import Lock
+import asyncio
+import gzip
+
+from database import (Database, LATEST_SNAPSHOT_IDS_SQL, CURRENT_PRODUCTS_SQL, CATEGORY_UPDATE_TIMES_SQL,
+                      HISTORY_RAW_RETENTION_DAYS, fetch_product_history, latest_snapshot_summary,
+                      data_version_path, read_data_version, write_data_version)
+from sqlite_pool import get_manager, close_all as close_db_connections
+from response_cache import ResponseCache, make_key
+from db_executor import QueryExecutor, QueryDeadlineExceeded, query_deadline
+from dashboard_bundle import (bundle_path, build_dashboard_bundle, encode_dashboard_bundle,
+                              save_dashboard_bundle, read_dashboard_bundle)
 
 # FastAPI 앱 초기화
 app = FastAPI(
@@ -45,21 +61,177 @@ app.add_middleware(
 # 데이터베이스 설정 (환경변수 우선 사용)
 DB_PATH = os.environ.get('DB_PATH', 'wconcept_tracking.db')
 
+# GET 응답 캐시 (response_cache.py): 키 = 경로 + 쿼리 파라미터 + 데이터 버전
+response_cache = ResponseCache()
+UNCACHED_PATHS = {'/', '/api/crawl/pool', '/api/db/metrics', '/api/cache/metrics'}  # 이력 DB와 무관하거나 지표
+PRECOMPUTED_PATHS = {'/api/dashboard'}  # ETag / Cache-Control 만 적용 (본문은 미리 만든 압축 파일)
+
+# DB 작업 실행기 (db_executor.py): DB를 쓰는 엔드포인트는 def 로 두면 제한된 스레드 풀에서 요청 기한 안에 실행
+query_executor = QueryExecutor()
+
+# 조건부 요청 / Cache-Control: 다음 정시 크롤링(scheduler.get_next_run_time, 매시 20분)이 반영될 때까지 캐시
+CRAWL_SCHEDULE_MINUTE = 20
+CACHE_CRAWL_GRACE_SECONDS = int(os.environ.get('CACHE_CRAWL_GRACE_SECONDS', '300'))  # 크롤링 시작 → 저장 완료 여유
+CACHE_SHORT_MAX_AGE = 60  # 크롤링 중(카테고리별로 차례로 커밋)이거나 예정보다 늦을 때
+
+_data_version_state = {'stat': None, 'marker': None}
+
+def current_data_version() -> Optional[Dict]:
+    """데이터 버전 파일 (database.write_data_version, DB 조회 없음: 요청마다 stat, 바뀌었을 때만 다시 읽음)"""
+    try:
+        stat = os.stat(data_version_path(DB_PATH))
+    except OSError:
+        return None
+    stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _data_version_state['stat'] != stat_key:
+        _data_version_state['marker'] = read_data_version(DB_PATH)
+        _data_version_state['stat'] = stat_key
+    return _data_version_state['marker']
+
+def restore_data_version() -> Dict:
+    """버전 파일을 지금 DB 상태로 다시 기록 (시작 후 지워졌거나 기록에 실패했을 때, query_executor 스레드에서)"""
+    with get_db_connection() as conn:
+        return write_data_version(conn, DB_PATH)
+
+async def data_version_marker() -> Optional[Dict]:
+    """요청 처리용 데이터 버전 (보통은 파일만 읽음, 없을 때만 DB 스레드에서 다시 기록, 실패 시 None)"""
+    marker = current_data_version()
+    if marker is None:
+        try:
+            marker = await query_executor.run(restore_data_version)
+        except (sqlite3.Error, OSError, QueryDeadlineExceeded) as e:
+            print(f"⚠️  데이터 버전 파일 복구 실패: {e}")
+            return None
+    return marker
+
+def cache_max_age(updated_at: datetime, now: datetime) -> int:
+    """데이터가 다시 바뀔 것으로 예상되는 시각(다음 정시 크롤링 + 여유)까지 남은 초"""
+    if (now - updated_at).total_seconds() < CACHE_CRAWL_GRACE_SECONDS:
+        return CACHE_SHORT_MAX_AGE
+    next_crawl = updated_at.replace(minute=CRAWL_SCHEDULE_MINUTE, second=0, microsecond=0)
+    if next_crawl <= updated_at:
+        next_crawl += timedelta(hours=1)
+    remaining = (next_crawl - now).total_seconds() + CACHE_CRAWL_GRACE_SECONDS
+    return max(CACHE_SHORT_MAX_AGE, int(remaining))
+
+def cache_headers(marker: Dict) -> Dict[str, str]:
+    """ETag (마지막 스냅샷 기준 데이터 버전) + Cache-Control"""
+    max_age = cache_max_age(datetime.fromisoformat(marker['updated_at']), datetime.now(timezone.utc))
+    return {
+        'ETag': f'"{marker["version"]}"',
+        'Cache-Control': f"public, max-age={max_age}, s-maxage={max_age}",
+    }
+
+def accepts_gzip(request: Request) -> bool:
+    """Accept-Encoding 에 gzip 이 있는지 (미리 압축한 본문을 그대로 보낼 수 있는지)"""
+    return 'gzip' in request.headers.get('accept-encoding', '').lower()
+
+def encoding_headers(headers: Dict[str, str], gzipped: bool) -> Dict[str, str]:
+    """인코딩별 응답(gzip / 원본)의 ETag 를 구분하고 Vary 추가 (304에도 같은 헤더)"""
+    headers = {**headers, 'Vary': 'Accept-Encoding'}
+    if gzipped and 'ETag' in headers:
+        headers['ETag'] = headers['ETag'][:-1] + '-gz"'
+    return headers
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 비교 (목록, '*', W/ 접두어 허용)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or etag in [candidate.removeprefix('W/') for candidate in candidates]
+
+
+class CachedRoute(APIRoute):
+    """GET 라우트: If-None-Match 가 맞으면 DB 없이 304, 아니면 response_cache 의 응답(검증·직렬화가 끝난 바이트) 재사용
+    일반 함수(def) 엔드포인트는 query_executor 스레드에서 실행 (이벤트 루프를 막지 않음)"""
+
+    def __init__(self, path, endpoint, **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = query_executor.endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if 'GET' not in self.methods or self.path in UNCACHED_PATHS:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            marker = await data_version_marker()
+            headers = cache_headers(marker) if marker is not None else {}
+            if self.path in PRECOMPUTED_PATHS:
+                headers = encoding_headers(headers, accepts_gzip(request))
+            if headers and etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+                return Response(status_code=304, headers=headers)
+
+            cacheable = response_cache.enabled and self.path not in PRECOMPUTED_PATHS
+            version = marker['version'] if cacheable and marker is not None else None
+            key = make_key(request.url.path, request.query_params.multi_items())
+            cached = response_cache.get(key, version) if version is not None else None
+            if cached is not None:
+                status_code, body, media_type = cached
+                return Response(content=body, status_code=status_code, media_type=media_type,
+                                headers={**headers, 'X-Cache': 'HIT'})
+            try:
+                response = await handler(request)
+            except HTTPException as e:
+                e.headers = {**(e.headers or {}), 'Cache-Control': 'no-store'}
+                raise
+            except RequestValidationError as e:
+                response = await request_validation_exception_handler(request, e)
+            body = getattr(response, 'body', None)
+            # no-store: DB 조회에 실패한 대체 응답 (예: /api/health 의 database_connected=False) → 캐시하지 않음
+            storable = 'no-store' not in response.headers.get('cache-control', '')
+            if response.status_code == 200 and storable:
+                response.headers.update(headers)
+                if version is not None and body is not None:
+                    response_cache.put(key, version, (response.status_code, body, response.media_type), len(body))
+                    response.headers['X-Cache'] = 'MISS'
+            elif 'cache-control' not in response.headers:
+                # 오류 응답: 브라우저 / Cloudflare 가 다음 크롤링까지 들고 있지 않도록 (ETag 없음)
+                response.headers['Cache-Control'] = 'no-store'
+            return response
+
+        return cached_handler
+
+app.router.route_class = CachedRoute
+
+# 동향 조회: 이 일수 이하(원본 보관 기간 안)면 시간 단위 원본 이력, 넘으면 일별 롤업
+TREND_RAW_MAX_DAYS = int(os.environ.get('TREND_RAW_MAX_DAYS', '7'))
+TREND_MAX_DAYS = 365
+
+def trend_resolution(days: int) -> str:
+    """조회 기간에 맞는 데이터 단위 ('raw': 크롤링 시각별, 'daily': 일별 롤업)"""
+    raw_limit = TREND_RAW_MAX_DAYS
+    if HISTORY_RAW_RETENTION_DAYS > 0:
+        raw_limit = min(raw_limit, HISTORY_RAW_RETENTION_DAYS)
+    return 'raw' if days <= raw_limit else 'daily'
+
 # 크롤링 동시 실행 방지 Lock
 crawl_lock = Lock()
 
+# 스케줄러 상주 브라우저 풀 (scheduler.py / browser_pool.py 와 같은 경로 사용)
+BROWSER_POOL_HEALTH_PATH = os.environ.get('BROWSER_POOL_HEALTH_PATH', '/tmp/browser_pool_health.json')
+CRAWL_TRIGGER_PATH = os.environ.get('CRAWL_TRIGGER_PATH', '/tmp/wconcept_crawl_trigger')
+POOL_HEARTBEAT_STALE_SECONDS = 120
+
+def read_pool_health() -> Optional[Dict]:
+    """스케줄러가 기록한 브라우저 풀 상태 (없거나 오래됐으면 None)"""
+    try:
+        with open(BROWSER_POOL_HEALTH_PATH, 'r', encoding='utf-8') as f:
+            health = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if health.get('status') != 'running':
+        return None
+    if datetime.now().timestamp() - os.path.getmtime(BROWSER_POOL_HEALTH_PATH) > POOL_HEARTBEAT_STALE_SECONDS:
+        return None
+    return health
+
 @contextmanager
 def get_db_connection():
-    """데이터베이스 연결 컨텍스트 매니저"""
-    # timeout 30초로 설정 (DB Lock 대기)
-    conn = sqlite3.connect(DB_PATH, timeout=30.0)
-    conn.row_factory = sqlite3.Row
-    try:
-        # WAL mode 활성화 (동시 읽기 허용)
-        conn.execute("PRAGMA journal_mode=WAL")
+    """읽기 전용 연결 컨텍스트 매니저 (sqlite_pool 읽기 풀, Database 와 공유)"""
+    with get_manager(DB_PATH).reader() as conn, query_deadline(conn):
         yield conn
-    finally:
-        conn.close()
 
 
 # ==================== Pydantic Models ====================
@@ -212,13 +384,14 @@ async def root():
             "가격_변동": "/api/price-changes",
             "순위_변동": "/api/ranking-changes",
             "작업_이력": "/api/jobs/history",
-            "시스템_상태": "/api/health"
+            "시스템_상태": "/api/health",
+            "대시보드": "/api/dashboard"
         }
     }
 
 
 @app.get("/api/health", response_model=HealthStatus, tags=["System"])
-async def health_check():
+def health_check(response: Response):
     """시스템 상태 확인"""
     try:
         with get_db_connection() as conn:
@@ -248,13 +421,8 @@ async def health_check():
             cursor.execute("SELECT COUNT(DISTINCT brand_name) FROM products")
             total_brands = cursor.fetchone()[0] or 0
             
-            # 최근 수집 시간
-            cursor.execute("SELECT MAX(collected_at) FROM ranking_history")
-            latest_collection = cursor.fetchone()[0]
-            
-            # 총 수집 횟수
-            cursor.execute("SELECT COUNT(DISTINCT collected_at) FROM ranking_history")
-            total_collections = cursor.fetchone()[0] or 0
+            # 최근 수집 시간 / 총 수집 횟수 (카테고리별 스냅샷 기준)
+            latest_collection, total_collections = latest_snapshot_summary(cursor)
             
             return HealthStatus(
                 status="healthy",
@@ -266,7 +434,8 @@ async def health_check():
                 api_version="2.0.0"
             )
     except Exception as e:
-        # 에러가 발생해도 API는 살아있으므로 기본 상태 반환
+        # 에러가 발생해도 API는 살아있으므로 기본 상태 반환 (배포 헬스 체크용 200, 응답 캐시에는 남기지 않음)
+        response.headers['Cache-Control'] = 'no-store'
         return HealthStatus(
             status="healthy",
             database_connected=False,
@@ -279,27 +448,14 @@ async def health_check():
 
 
 @app.get("/api/categories/update-times", tags=["System"])
-async def get_category_update_times():
+def get_category_update_times():
     """카테고리별 최신 수집 시간 조회"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # 카테고리별 최신 수집 시간 조회
-            query = """
-                SELECT 
-                    p.category_key,
-                    p.category,
-                    MAX(rh.collected_at) as latest_collection,
-                    COUNT(DISTINCT rh.product_id) as product_count
-                FROM products p
-                JOIN ranking_history rh ON p.product_id = rh.product_id
-                WHERE p.category_key IS NOT NULL
-                GROUP BY p.category_key, p.category
-                ORDER BY p.category_key
-            """
-            
-            cursor.execute(query)
+            # 카테고리별 최신 수집 시간 조회 (스냅샷 + 최신 상태 테이블, 이력 스캔 없음)
+            cursor.execute(CATEGORY_UPDATE_TIMES_SQL)
             rows = cursor.fetchall()
             
             category_times = {}
@@ -320,8 +476,65 @@ async def get_category_update_times():
         raise HTTPException(status_code=500, detail=f"Failed to fetch category update times: {str(e)}")
 
 
+# 대시보드 번들 (dashboard_bundle.py): 파일이 바뀌었을 때만 다시 읽고, 데이터 버전과 다르면 새로 만듦
+_dashboard_state = {'stat': None, 'version': None, 'gzip': None, 'json': None}
+_dashboard_lock = Lock()
+
+def dashboard_bundle_bytes(version: Optional[str]) -> Dict:
+    """현재 데이터 버전의 번들 {'gzip': 압축 바이트, 'json': 압축 해제 바이트(필요할 때)}"""
+    with _dashboard_lock:
+        try:
+            stat = os.stat(bundle_path(DB_PATH))
+            stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+        if stat_key is not None and stat_key != _dashboard_state['stat']:
+            data = read_dashboard_bundle(DB_PATH)
+            if data is not None:
+                _dashboard_state.update({
+                    'stat': stat_key,
+                    'version': json.loads(gzip.decompress(data)).get('version'),
+                    'gzip': data,
+                    'json': None,
+                })
+        
+        if _dashboard_state['gzip'] is None or version is None or _dashboard_state['version'] != version:
+            # 크롤링 중간(카테고리별 커밋)이나 번들을 만들지 않는 작업(수동 스크립트, 보관 정리) 뒤: 여기서 한 번 만듦
+            with get_db_connection() as conn:
+                data = encode_dashboard_bundle(build_dashboard_bundle(conn, version))
+            try:
+                save_dashboard_bundle(DB_PATH, data)
+                stat = os.stat(bundle_path(DB_PATH))
+                stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            except OSError as e:
+                print(f"⚠️  대시보드 번들 파일 기록 실패: {e}")
+                stat_key = None
+            _dashboard_state.update({'stat': stat_key, 'version': version, 'gzip': data, 'json': None})
+        
+        if _dashboard_state['json'] is None:
+            _dashboard_state['json'] = gzip.decompress(_dashboard_state['gzip'])
+        return dict(_dashboard_state)
+
+
+@app.get("/api/dashboard", tags=["Dashboard"])
+async def get_dashboard(request: Request):
+    """대시보드 첫 화면 데이터 한 번에 (현재 TOP/카테고리별, 48시간 순위 sparkline, 카테고리 수집 시간, 상태)"""
+    try:
+        marker = await data_version_marker()
+        bundle = await query_executor.run(dashboard_bundle_bytes, marker['version'] if marker else None)
+    except QueryDeadlineExceeded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build dashboard bundle: {str(e)}")
+    
+    if accepts_gzip(request):
+        return Response(content=bundle['gzip'], media_type='application/json',
+                        headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'})
+    return Response(content=bundle['json'], media_type='application/json', headers={'Vary': 'Accept-Encoding'})
+
+
 @app.get("/api/products/current", response_model=List[Product], tags=["Products"])
-async def get_current_products(
+def get_current_products(
     limit: int = Query(10000, ge=1, le=10000, description="조회할 제품 수"),
     brand: Optional[str] = Query(None, description="브랜드명 필터"),
     category: Optional[str] = Query(None, description="카테고리 필터")
@@ -331,77 +544,19 @@ async def get_current_products(
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # 카테고리별 최신 수집 시간을 사용하도록 개선
-            if category:
-                # 특정 카테고리의 최신 시간
-                cursor.execute("""
-                    SELECT MAX(rh.collected_at) 
-                    FROM ranking_history rh
-                    JOIN products p ON rh.product_id = p.product_id
-                    WHERE p.category_key = ?
-                """, (category,))
-                latest_time = cursor.fetchone()[0]
-            else:
-                # 전체 최신 시간 (하지만 카테고리별로 다를 수 있음)
-                latest_time = None
+            # 카테고리별 마지막 스냅샷 (product_latest_state: 이력 전체를 GROUP BY 하지 않음)
+            query = CURRENT_PRODUCTS_SQL
+            params = []
             
-            # 제품 목록 조회
-            if latest_time:
-                # 특정 카테고리의 최신 데이터
-                query = """
-                    SELECT 
-                        p.product_id,
-                        p.brand_name,
-                        p.product_name,
-                        p.category,
-                        p.category_key,
-                        p.product_url,
-                        rh.sale_price as price,
-                        rh.discount_rate,
-                        p.image_url,
-                        rh.ranking,
-                        rh.collected_at
-                    FROM products p
-                    JOIN ranking_history rh ON p.product_id = rh.product_id
-                    WHERE rh.collected_at = ? AND p.category_key = ?
-                """
-                params = [latest_time, category]
-            else:
-                # 카테고리별 최신 데이터 모두 가져오기
-                query = """
-                    SELECT 
-                        p.product_id,
-                        p.brand_name,
-                        p.product_name,
-                        p.category,
-                        p.category_key,
-                        p.product_url,
-                        rh.sale_price as price,
-                        rh.discount_rate,
-                        p.image_url,
-                        rh.ranking,
-                        rh.collected_at
-                    FROM products p
-                    JOIN ranking_history rh ON p.product_id = rh.product_id
-                    JOIN (
-                        SELECT p2.category_key, MAX(rh2.collected_at) as max_time
-                        FROM products p2
-                        JOIN ranking_history rh2 ON p2.product_id = rh2.product_id
-                        GROUP BY p2.category_key
-                    ) latest ON p.category_key = latest.category_key AND rh.collected_at = latest.max_time
-                    WHERE 1=1
-                """
-                params = []
+            if category:
+                query += " AND s.category_key = ?"
+                params.append(category)
             
             if brand:
                 query += " AND p.brand_name = ?"
                 params.append(brand)
             
-            if category and not latest_time:
-                query += " AND p.category_key = ?"
-                params.append(category)
-            
-            query += " ORDER BY rh.ranking ASC LIMIT ?"
+            query += " ORDER BY s.ranking ASC LIMIT ?"
             params.append(limit)
             
             cursor.execute(query, params)
@@ -430,7 +585,7 @@ async def get_current_products(
 
 
 @app.get("/api/brands/list", response_model=List[str], tags=["Brands"])
-async def get_all_brands():
+def get_all_brands():
     """모든 브랜드 목록 조회"""
     try:
         with get_db_connection() as conn:
@@ -451,47 +606,50 @@ async def get_all_brands():
 
 
 @app.get("/api/brands/stats", response_model=List[BrandStats], tags=["Brands"])
-async def get_brand_statistics(
+def get_brand_statistics(
     sort_by: str = Query("product_count", enum=["product_count", "total_value", "avg_price"]),
-    limit: int = Query(50, ge=1, le=200, description="조회할 브랜드 수")
+    limit: int = Query(50, ge=1, le=200, description="조회할 브랜드 수"),
+    category: Optional[str] = Query(None, description="카테고리 필터")
 ):
-    """브랜드별 통계 조회"""
+    """브랜드별 통계 조회 (카테고리별 마지막 스냅샷 기준)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # 최신 수집 시간
-            cursor.execute("SELECT MAX(collected_at) FROM brand_stats_history")
-            latest_time = cursor.fetchone()[0]
-            
-            if not latest_time:
-                return []
-            
             # 정렬 기준 매핑
             sort_column_map = {
                 "product_count": "product_count DESC",
-                "total_value": "(avg_price * product_count) DESC",
+                "total_value": "total_value DESC",
                 "avg_price": "avg_price DESC"
             }
             sort_clause = sort_column_map.get(sort_by, "product_count DESC")
             
-            query = f"""
+            # 브랜드 × 카테고리 통계를 카테고리 전체로 합산 (이력 테이블 조회 없음)
+            query = """
                 SELECT 
                     brand_name,
-                    product_count,
-                    (avg_price * product_count) as total_value,
-                    avg_price,
-                    avg_discount_rate,
-                    avg_ranking as min_ranking,
-                    avg_ranking as max_ranking,
-                    collected_at as last_updated
-                FROM brand_stats_history
-                WHERE collected_at = ?
+                    SUM(product_count) as product_count,
+                    SUM(avg_price * product_count) as total_value,
+                    SUM(avg_price * product_count) * 1.0 / SUM(product_count) as avg_price,
+                    AVG(avg_discount_rate) as avg_discount_rate,
+                    MIN(min_ranking) as min_ranking,
+                    MAX(max_ranking) as max_ranking,
+                    MAX(collected_at) as last_updated
+                FROM brand_category_stats
+                WHERE snapshot_id IN (""" + LATEST_SNAPSHOT_IDS_SQL + """)
+            """
+            params = []
+            if category:
+                query += " AND category_key = ?"
+                params.append(category)
+            query += f"""
+                GROUP BY brand_name
                 ORDER BY {sort_clause}
                 LIMIT ?
             """
+            params.append(limit)
             
-            cursor.execute(query, [latest_time, limit])
+            cursor.execute(query, params)
             rows = cursor.fetchall()
             
             stats = []
@@ -500,7 +658,7 @@ async def get_brand_statistics(
                     brand_name=row['brand_name'],
                     product_count=row['product_count'],
                     total_value=int(row['total_value']) if row['total_value'] else 0,
-                    avg_price=row['avg_price'],
+                    avg_price=row['avg_price'] or 0,
                     avg_discount_rate=row['avg_discount_rate'],
                     min_ranking=int(row['min_ranking']) if row['min_ranking'] else 0,
                     max_ranking=int(row['max_ranking']) if row['max_ranking'] else 0,
@@ -514,7 +672,7 @@ async def get_brand_statistics(
 
 
 @app.get("/api/products/{product_id}/history", response_model=List[ProductHistory], tags=["Products"])
-async def get_product_history(
+def get_product_history(
     product_id: str,
     days: int = Query(7, ge=1, le=30, description="조회할 일수")
 ):
@@ -528,28 +686,16 @@ async def get_product_history(
             if not cursor.fetchone():
                 raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
             
-            # 히스토리 조회
-            since_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query = """
-                SELECT 
-                    collected_at,
-                    ranking,
-                    sale_price as price,
-                    discount_rate
-                FROM ranking_history
-                WHERE product_id = ? AND collected_at >= ?
-                ORDER BY collected_at DESC
-            """
-            
-            cursor.execute(query, [product_id, since_date])
-            rows = cursor.fetchall()
+            # 히스토리 조회 (ranking_history / 압축 이력 모두, 최신순)
+            since_date = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            rows = fetch_product_history(cursor, [product_id], since_date)[product_id]
             
             history = []
-            for row in rows:
+            for row in reversed(rows):
                 history.append(ProductHistory(
                     collected_at=format_datetime(row['collected_at']),
                     ranking=row['ranking'],
-                    price=row['price'],
+                    price=row['sale_price'],
                     discount_rate=row['discount_rate']
                 ))
             
@@ -562,7 +708,7 @@ async def get_product_history(
 
 
 @app.get("/api/price-changes", response_model=List[PriceChange], tags=["Changes"])
-async def get_price_changes(
+def get_price_changes(
     days: int = Query(7, ge=1, le=30, description="조회할 일수"),
     limit: int = Query(50, ge=1, le=200, description="조회할 변동 수")
 ):
@@ -612,7 +758,7 @@ async def get_price_changes(
 
 
 @app.get("/api/ranking-changes", response_model=List[RankingChange], tags=["Changes"])
-async def get_ranking_changes(
+def get_ranking_changes(
     days: int = Query(7, ge=1, le=30, description="조회할 일수"),
     change_type: Optional[str] = Query(None, enum=["상승", "하락"], description="변동 유형"),
     limit: int = Query(50, ge=1, le=200, description="조회할 변동 수")
@@ -669,7 +815,7 @@ async def get_ranking_changes(
 
 
 @app.get("/api/jobs/history", response_model=List[ScrapingJob], tags=["Jobs"])
-async def get_scraping_jobs(
+def get_scraping_jobs(
     limit: int = Query(20, ge=1, le=100, description="조회할 작업 수")
 ):
     """스크래핑 작업 이력 조회"""
@@ -713,31 +859,68 @@ async def get_scraping_jobs(
 
 
 @app.get("/api/trends/brand/{brand_name}", tags=["Trends"])
-async def get_brand_ranking_trend(
+def get_brand_ranking_trend(
     brand_name: str,
-    days: int = Query(7, ge=1, le=30, description="조회할 일수")
+    days: int = Query(7, ge=1, le=TREND_MAX_DAYS, description="조회할 일수"),
+    category: Optional[str] = Query(None, description="카테고리 필터")
 ):
-    """브랜드의 순위 동향 조회"""
+    """브랜드의 순위 동향 조회 (짧은 기간은 크롤링 시각별, 긴 기간은 일별 / 카테고리 미지정 시 전체 합산)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            since_date = (datetime.now() - timedelta(days=days)).isoformat()
+            resolution = trend_resolution(days)
+            since = datetime.now(timezone.utc) - timedelta(days=days)
             
-            query = """
-                SELECT 
-                    bsh.collected_at,
-                    bsh.product_count,
-                    bsh.avg_ranking,
-                    bsh.avg_price,
-                    bsh.avg_discount_rate
-                FROM brand_stats_history bsh
-                WHERE bsh.brand_name = ?
-                AND bsh.collected_at >= ?
-                ORDER BY bsh.collected_at ASC
+            if resolution == 'raw':
+                query = """
+                    SELECT 
+                        MAX(collected_at) as collected_at,
+                        SUM(product_count) as product_count,
+                        SUM(avg_ranking * product_count) * 1.0 / SUM(product_count) as avg_ranking,
+                        SUM(avg_price * product_count) * 1.0 / SUM(product_count) as avg_price,
+                        AVG(avg_discount_rate) as avg_discount_rate,
+                        MIN(min_ranking) as min_ranking,
+                        MAX(max_ranking) as max_ranking,
+                        SUM(rank_share) as rank_share
+                    FROM brand_category_stats
+                    WHERE brand_name = ?
+                    AND collected_at >= ?
+                """
+                params = [brand_name, since.strftime('%Y-%m-%d %H:%M:%S')]
+            else:
+                # 일별 롤업: 상품 수/점유율은 그날 크롤링 1회 평균
+                query = """
+                    SELECT 
+                        MAX(last_collected_at) as collected_at,
+                        SUM(product_count_sum * 1.0 / snapshot_count) as product_count,
+                        SUM(ranking_sum) * 1.0 / SUM(product_count_sum) as avg_ranking,
+                        SUM(price_sum) * 1.0 / NULLIF(SUM(price_count), 0) as avg_price,
+                        SUM(discount_sum) * 1.0 / NULLIF(SUM(discount_count), 0) as avg_discount_rate,
+                        MIN(min_ranking) as min_ranking,
+                        MAX(max_ranking) as max_ranking,
+                        SUM(rank_share_sum / snapshot_count) as rank_share
+                    FROM brand_daily_rollup
+                    WHERE brand_name = ?
+                    AND day >= ?
+                """
+                params = [brand_name, since.date().isoformat()]
+            if category:
+                query += " AND category_key = ?"
+                params.append(category)
+            # 원본 - 카테고리 지정: 스냅샷별 / 전체: 같은 시각(시간 단위) 크롤링의 카테고리들을 합산
+            if resolution == 'daily':
+                group_by = "day"
+            elif category:
+                group_by = "snapshot_id"
+            else:
+                group_by = "strftime('%Y-%m-%d %H', collected_at)"
+            query += """
+                GROUP BY """ + group_by + """
+                ORDER BY collected_at ASC
             """
             
-            cursor.execute(query, [brand_name, since_date])
+            cursor.execute(query, params)
             rows = cursor.fetchall()
             
             trend_data = []
@@ -747,12 +930,18 @@ async def get_brand_ranking_trend(
                     'product_count': row['product_count'],
                     'avg_ranking': row['avg_ranking'],
                     'avg_price': row['avg_price'],
-                    'avg_discount_rate': row['avg_discount_rate']
+                    'avg_discount_rate': row['avg_discount_rate'],
+                    'min_ranking': row['min_ranking'],
+                    'max_ranking': row['max_ranking'],
+                    # 카테고리 내 순위 가중 점유율 (카테고리 지정 시에만 의미 있음)
+                    'rank_share': row['rank_share'] if category else None
                 })
             
             return {
                 'brand_name': brand_name,
+                'category': category,
                 'period_days': days,
+                'resolution': resolution,
                 'data': trend_data
             }
     
@@ -761,11 +950,11 @@ async def get_brand_ranking_trend(
 
 
 @app.get("/api/trends/product/{product_id}", tags=["Trends"])
-async def get_product_ranking_trend(
+def get_product_ranking_trend(
     product_id: str,
-    days: int = Query(7, ge=1, le=30, description="조회할 일수")
+    days: int = Query(7, ge=1, le=TREND_MAX_DAYS, description="조회할 일수")
 ):
-    """특정 제품의 순위 동향 조회"""
+    """특정 제품의 순위 동향 조회 (짧은 기간은 크롤링 시각별, 긴 기간은 일별 롤업)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
@@ -781,22 +970,31 @@ async def get_product_ranking_trend(
             if not product_info:
                 raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
             
-            since_date = (datetime.now() - timedelta(days=days)).isoformat()
+            resolution = trend_resolution(days)
+            since = datetime.now(timezone.utc) - timedelta(days=days)
             
-            query = """
-                SELECT 
-                    rh.collected_at,
-                    rh.ranking,
-                    rh.sale_price,
-                    rh.discount_rate
-                FROM ranking_history rh
-                WHERE rh.product_id = ?
-                AND rh.collected_at >= ?
-                ORDER BY rh.collected_at ASC
-            """
-            
-            cursor.execute(query, [product_id, since_date])
-            rows = cursor.fetchall()
+            if resolution == 'raw':
+                rows = [
+                    dict(row, min_ranking=row['ranking'], max_ranking=row['ranking'])
+                    for row in fetch_product_history(
+                        cursor, [product_id], since.strftime('%Y-%m-%d %H:%M:%S'))[product_id]
+                ]
+            else:
+                # 일별 롤업: 그날 마지막 순위/가격 + 그날 최고/최저 순위
+                cursor.execute("""
+                    SELECT 
+                        last_collected_at as collected_at,
+                        last_ranking as ranking,
+                        last_price as sale_price,
+                        last_discount_rate as discount_rate,
+                        min_ranking,
+                        max_ranking
+                    FROM product_daily_rollup
+                    WHERE product_id = ?
+                    AND day >= ?
+                    ORDER BY day ASC
+                """, [product_id, since.date().isoformat()])
+                rows = cursor.fetchall()
             
             trend_data = []
             for row in rows:
@@ -804,7 +1002,9 @@ async def get_product_ranking_trend(
                     'collected_at': format_datetime(row['collected_at']),
                     'ranking': row['ranking'],
                     'price': row['sale_price'],
-                    'discount_rate': row['discount_rate']
+                    'discount_rate': row['discount_rate'],
+                    'min_ranking': row['min_ranking'],
+                    'max_ranking': row['max_ranking']
                 })
             
             return {
@@ -812,6 +1012,7 @@ async def get_product_ranking_trend(
                 'product_name': product_info['product_name'],
                 'brand_name': product_info['brand_name'],
                 'period_days': days,
+                'resolution': resolution,
                 'data': trend_data
             }
     
@@ -822,19 +1023,14 @@ async def get_product_ranking_trend(
 
 
 @app.get("/api/crawl/status", tags=["Admin"])
-async def crawl_status():
+def crawl_status():
     """크롤링 상태 정보 (읽기 전용)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # 최근 수집 시간
-            cursor.execute("SELECT MAX(collected_at) FROM ranking_history")
-            latest_collection = cursor.fetchone()[0]
-            
-            # 총 수집 횟수
-            cursor.execute("SELECT COUNT(DISTINCT collected_at) FROM ranking_history")
-            total_collections = cursor.fetchone()[0]
+            # 최근 수집 시간 / 총 수집 횟수
+            latest_collection, total_collections = latest_snapshot_summary(cursor)
             
             return {
                 'status': 'read_only',
@@ -868,6 +1064,12 @@ async def internal_error_handler(request, exc):
     }
 
 
+@app.exception_handler(QueryDeadlineExceeded)
+async def query_deadline_handler(request, exc):
+    """요청 기한(API_QUERY_DEADLINE_SECONDS) 안에 DB 작업이 끝나지 않음"""
+    return JSONResponse(status_code=504, content={"detail": str(exc)}, headers={'Cache-Control': 'no-store'})
+
+
 # ==================== Startup/Shutdown Events ====================
 
 @app.on_event("startup")
@@ -880,54 +1082,33 @@ async def startup_event():
     print(f"📖 ReDoc: http://localhost:8000/api/redoc")
     print(f"💾 Database: {DB_PATH}")
     print("=" * 50)
+    # 스키마 확인 (최신이면 user_version 조회 한 번, 밀린 마이그레이션이 있으면 실행)
+    db = Database(DB_PATH)
+    # 데이터 버전 파일이 없으면(이전 버전에서 만든 DB) 지금 상태로 기록 → ETag / 응답 캐시가 DB 조회 없이 동작
+    if current_data_version() is None:
+        db.write_data_version()
 
 
 @app.post("/api/products/batch/history", tags=["Products"])
-async def get_batch_product_history(request: BatchHistoryRequest):
+def get_batch_product_history(request: BatchHistoryRequest):
     """여러 제품의 히스토리를 한 번에 조회 (배치 처리)"""
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            results = {}
-            since_date = (datetime.now() - timedelta(days=request.days)).isoformat()
-            
-            # 모든 제품의 히스토리를 한 번의 쿼리로 조회
-            placeholders = ','.join(['?' for _ in request.product_ids])
-            query = f"""
-                SELECT 
-                    product_id,
-                    collected_at,
-                    ranking,
-                    sale_price as price,
-                    discount_rate
-                FROM ranking_history
-                WHERE product_id IN ({placeholders})
-                AND collected_at >= ?
-                ORDER BY product_id, collected_at DESC
-            """
-            
-            params = request.product_ids + [since_date]
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            since_date = (datetime.now(timezone.utc) - timedelta(days=request.days)).strftime('%Y-%m-%d %H:%M:%S')
             
-            # 제품별로 그룹화
-            for row in rows:
-                product_id = row['product_id']
-                if product_id not in results:
-                    results[product_id] = []
-                
-                results[product_id].append({
+            # 모든 제품의 히스토리를 한 번에 조회 (요청한 모든 제품에 대해 빈 배열이라도 반환, 최신순)
+            history = fetch_product_history(cursor, request.product_ids, since_date)
+            results = {
+                product_id: [{
                     'collected_at': format_datetime(row['collected_at']),
                     'ranking': row['ranking'],
-                    'price': row['price'],
+                    'price': row['sale_price'],
                     'discount_rate': row['discount_rate']
-                })
-            
-            # 요청한 모든 제품에 대해 빈 배열이라도 반환
-            for product_id in request.product_ids:
-                if product_id not in results:
-                    results[product_id] = []
+                } for row in reversed(rows)]
+                for product_id, rows in history.items()
+            }
             
             return {
                 'success': True,
@@ -946,6 +1127,25 @@ async def trigger_crawl():
     import asyncio
     from pathlib import Path
     
+    # 스케줄러 브라우저 풀이 살아 있으면 그쪽에서 실행 (Chromium 콜드 스타트 없음)
+    pool_health = read_pool_health()
+    if pool_health is not None:
+        if pool_health.get('crawl_running') or os.path.exists(CRAWL_TRIGGER_PATH):
+            raise HTTPException(
+                status_code=409,
+                detail="Crawl is already in progress. Please wait for the current crawl to complete."
+            )
+        with open(CRAWL_TRIGGER_PATH, 'w', encoding='utf-8') as f:
+            f.write(datetime.now().isoformat())
+        return {
+            "status": "queued",
+            "message": "Manual crawl handed off to the scheduler browser pool",
+            "estimated_time": "1-2 minutes",
+            "scheduler_pid": pool_health.get('pid'),
+            "timestamp": datetime.now().isoformat(),
+            "db_path": DB_PATH
+        }
+    
     # 이미 크롤링 실행 중인지 확인
     if crawl_lock.locked():
         raise HTTPException(
@@ -1028,32 +1228,34 @@ async def trigger_crawl():
 
 
 @app.get("/api/crawl/status")
-async def get_crawl_status():
+def get_crawl_status():
     """크롤링 상태 조회"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        # 최근 크롤링 정보
+        # 오늘(UTC) 크롤링 정보: 스냅샷 epoch 범위 검색
+        today_start = int(datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
         cursor.execute("""
             SELECT 
                 MAX(collected_at) as last_crawl,
-                COUNT(DISTINCT product_id) as products_count,
-                COUNT(*) as records_count
-            FROM ranking_history
-            WHERE date(collected_at) = date('now')
-        """)
+                COALESCE(SUM(product_count), 0) as records_count
+            FROM snapshots
+            WHERE status = 'complete' AND collected_epoch >= ?
+        """, (today_start,))
         
-        today_stats = cursor.fetchone()
+        today_stats = dict(cursor.fetchone())
         
-        # 전체 통계
+        # 오늘 수집된 상품 수: 최신 상태 테이블 기준 (HISTORY_STORAGE=packed 이면 ranking_history 가 비어 있음)
         cursor.execute("""
-            SELECT 
-                MAX(collected_at) as latest_collection,
-                COUNT(DISTINCT collected_at) as total_collections
-            FROM ranking_history
-        """)
+            SELECT COUNT(DISTINCT product_id)
+            FROM product_latest_state
+            WHERE last_collected_at >= ?
+        """, (datetime.fromtimestamp(today_start, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),))
+        today_stats['products_count'] = cursor.fetchone()[0]
         
-        overall = cursor.fetchone()
+        # 전체 통계
+        latest_collection, total_collections = latest_snapshot_summary(cursor)
+        overall = {'latest_collection': latest_collection, 'total_collections': total_collections}
         
         return {
             "last_crawl": today_stats["last_crawl"],
@@ -1065,10 +1267,33 @@ async def get_crawl_status():
         }
 
 
+@app.get("/api/crawl/pool", tags=["Admin"])
+async def get_browser_pool_health():
+    """스케줄러 상주 브라우저 풀 상태"""
+    pool_health = read_pool_health()
+    if pool_health is None:
+        raise HTTPException(status_code=503, detail="Browser pool is not running (scheduler heartbeat missing)")
+    return pool_health
+
+
+@app.get("/api/db/metrics", tags=["System"])
+async def get_db_metrics():
+    """SQLite 연결 풀 지표 (연결 생성/재사용/대기 횟수, PRAGMA 설정) + DB 스레드 풀 지표"""
+    return {**get_manager(DB_PATH).metrics(), 'executor': query_executor.metrics()}
+
+
+@app.get("/api/cache/metrics", tags=["System"])
+async def get_cache_metrics():
+    """GET 응답 캐시 지표 (적중/미스/제거 횟수, 항목 수, 크기, 데이터 버전)"""
+    return response_cache.metrics()
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """서버 종료 시 실행"""
     print("\n🛑 W Concept Tracking API Server Shutting Down...")
+    query_executor.close()
+    close_db_connections()
 
 
 # ==================== Main ====================
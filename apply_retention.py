@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+오래된 원본 이력 다운샘플링 (스케줄러가 하루 한 번 자동 실행)
+HISTORY_RAW_RETENTION_DAYS 일보다 오래된 ranking_history 는 (상품, 카테고리)별 하루 마지막 행만 남기고
+brand_category_stats 는 삭제합니다. 일별 값은 product_daily_rollup / brand_daily_rollup 에 남아 있습니다.
+
+사용법:
+    python apply_retention.py                   # DB_PATH, HISTORY_RAW_RETENTION_DAYS (기본 30일)
+    python apply_retention.py --days 14 --dry-run
+    python apply_retention.py --vacuum          # 삭제 후 DB 파일 크기 줄이기
+    python apply_retention.py --rebuild-rollups # 일별 롤업을 이력에서 다시 생성 (다운샘플링 전에만 정확)
+"""
+
+import argparse
+import sqlite3
+import time
+
+from database import Database, HISTORY_RAW_RETENTION_DAYS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오래된 원본 이력 다운샘플링")
+    parser.add_argument('--db', default=None, help="DB 경로 (기본: DB_PATH 환경변수)")
+    parser.add_argument('--days', type=int, default=HISTORY_RAW_RETENTION_DAYS,
+                        help="원본 이력 보관 일수 (기본: HISTORY_RAW_RETENTION_DAYS)")
+    parser.add_argument('--dry-run', action='store_true', help="삭제하지 않고 대상 행 수만 출력")
+    parser.add_argument('--vacuum', action='store_true', help="삭제 후 VACUUM 실행")
+    parser.add_argument('--rebuild-rollups', action='store_true', help="일별 롤업 재생성 후 종료")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    started = time.perf_counter()
+
+    if args.rebuild_rollups:
+        counts = db.rebuild_daily_rollups()
+        print(f"✅ 일별 롤업 재생성: 상품 {counts['product_daily_rollup']:,}행, "
+              f"브랜드 {counts['brand_daily_rollup']:,}행 ({time.perf_counter() - started:.1f}초)")
+        return
+
+    counts = db.apply_retention(args.days, dry_run=args.dry_run)
+    action = "삭제 대상" if args.dry_run else "삭제"
+    print(f"✅ {args.days}일 이전 이력 다운샘플링 ({counts['days']}일치): "
+          f"ranking_history {counts['ranking_history']:,}행, "
+          f"brand_category_stats {counts['brand_category_stats']:,}행 {action} "
+          f"({time.perf_counter() - started:.1f}초)")
+
+    if args.vacuum and not args.dry_run:
+        conn = sqlite3.connect(db.db_path)
+        try:
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        print("💾 VACUUM 완료")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,42 +5,92 @@ W Concept 자동 크롤링 스크립트
 """
 
 import asyncio
+import os
 import sys
 from datetime import datetime, timezone
-from wconcept_scraper_v2 import WConceptScraper
+from wconcept_scraper_v2 import iter_category_batches, print_timing_report, DEFAULT_CONCURRENCY
 from database import Database
+from dashboard_bundle import refresh_dashboard_bundle
 
-async def crawl_all_categories():
-    """모든 카테고리 크롤링"""
+# 크롤링 → 저장 사이에 대기할 수 있는 카테고리 배치 수 (메모리 상한)
+INGEST_QUEUE_SIZE = int(os.environ.get('CRAWL_INGEST_QUEUE_SIZE', '2'))
+
+async def crawl_all_categories(concurrency=DEFAULT_CONCURRENCY, browser=None):
+    """모든 카테고리 크롤링 (Chromium 1개 공유, 카테고리 동시 실행)
+
+    카테고리가 끝나는 대로 제한된 크기의 큐를 거쳐 DB에 저장(커밋)하므로,
+    다음 카테고리를 로딩하는 동안 앞 카테고리가 저장되고 중간에 실패해도 저장된 카테고리는 남습니다.
+
+    Args:
+        concurrency: 동시에 크롤링할 카테고리 수
+        browser: 상주 브라우저 풀 (scheduler.py). 없으면 Chromium을 새로 실행
+
+    Returns:
+        저장된 상품 수
+    """
     print("\n" + "=" * 80)
     print(f"🚀 자동 크롤링 시작: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC")
     print("=" * 80 + "\n")
     
     categories = ['outer', 'dress', 'blouse', 'shirt', 'tshirt', 'knit', 'skirt', 'underwear']
-    all_products = []
     
-    for category_key in categories:
+    db = Database()
+    queue = asyncio.Queue(maxsize=max(1, INGEST_QUEUE_SIZE))
+    results = {}
+    report = {}
+    saved = {'products': 0}
+    
+    async def produce():
         try:
-            print(f"\n📦 {category_key} 카테고리 크롤링 중...")
-            scraper = WConceptScraper(category_key=category_key)
-            products = await scraper.scrape(max_products=200)
-            all_products.extend(products)
-            print(f"✅ {category_key}: {len(products)}개 수집 완료")
-        except Exception as e:
-            print(f"❌ {category_key} 크롤링 실패: {str(e)}")
-    
-    # 데이터베이스에 저장
-    if all_products:
-        print(f"\n💾 데이터베이스 저장 중... (총 {len(all_products)}개)")
-        db = Database()
-        db.save_products(all_products)
-        print(f"✅ {len(all_products)}개 제품 저장 완료!")
-    else:
-        print("\n⚠️  수집된 제품이 없습니다.")
+            async for category_key, products in iter_category_batches(
+                    categories, max_products=200, concurrency=concurrency, browser=browser, report=report):
+                results[category_key] = products
+                print(f"✅ {category_key}: {len(products)}개 수집 완료")
+                await queue.put((category_key, products))
+        finally:
+            await queue.put(None)
+    
+    async def ingest():
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            category_key, products = batch
+            try:
+                if not products:
+                    print(f"⚠️  {category_key}: 수집된 제품이 없습니다.")
+                    await asyncio.to_thread(db.record_snapshot, category_key, 'failed')
+                    continue
+                # 카테고리 단위 트랜잭션 (이벤트 루프를 막지 않도록 스레드에서 실행)
+                count = await asyncio.to_thread(db.save_products, products)
+                saved['products'] += count
+                print(f"💾 {category_key}: {count}개 제품 저장 완료")
+            except Exception as e:
+                print(f"❌ {category_key} 저장 실패: {str(e)}")
+                try:
+                    await asyncio.to_thread(db.record_snapshot, category_key, 'failed', len(products))
+                except Exception:
+                    pass
+    
+    await asyncio.gather(produce(), ingest())
+    
+    # 저장이 모두 끝난 뒤 대시보드 번들(/api/dashboard)을 한 번 만들어 둠
+    try:
+        size = await asyncio.to_thread(refresh_dashboard_bundle, db)
+        print(f"📦 대시보드 번들 갱신 ({size / 1024:.0f}KB gzip)")
+    except Exception as e:
+        print(f"⚠️  대시보드 번들 갱신 실패: {str(e)}")
+    
+    if report:
+        print_timing_report(results, report)
     
     print("\n" + "=" * 80)
-    print(f"✅ 크롤링 완료: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+    print(f"✅ 크롤링 완료: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC "
+          f"(총 {saved['products']}개 저장, 크롤링 {report.get('total_seconds', 0):.1f}초)")
     print("=" * 80 + "\n")
+    return saved['products']
 
 if __name__ == "__main__":
-    asyncio.run(crawl_all_categories())
+    # 사용법: python auto_crawl.py [동시 실행 수]
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CONCURRENCY
+    asyncio.run(crawl_all_categories(concurrency=concurrency))
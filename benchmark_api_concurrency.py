@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+API 동시 요청 벤치마크 (느린 요청 + 빠른 요청 섞어서)
+느린 요청(ranking_history 전체 GROUP BY, 예전 /api/products/current 쿼리)을 보내는 클라이언트와
+빠른 요청(상태/카테고리/현재 순위/브랜드 통계)을 보내는 클라이언트를 동시에 돌리면서
+요청 종류별 지연 시간 p50/p99 를 측정합니다.
+- inline: DB 작업을 이벤트 루프에서 바로 실행 (예전 방식, API_DB_THREADS=0)
+- threads: db_executor 스레드 풀에서 실행 (API_DB_THREADS, 기본 읽기 연결 풀 크기)
+모드마다 API 서버(uvicorn)를 별도 프로세스로 띄우고 HTTP로 요청합니다. 응답 캐시는 끔. 임시 DB 사용.
+
+사용법:
+    python benchmark_api_concurrency.py
+    python benchmark_api_concurrency.py --duration 20 --slow-clients 2 --fast-clients 16
+    python benchmark_api_concurrency.py --deadline 0.2       # 요청 기한을 짧게: 느린 요청은 504
+    python benchmark_api_concurrency.py --db synthetic_1x.db   # generate_synthetic_history.py 로 만든 DB 복사본에서 측정
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+SLOW_PATH = '/api/benchmark/history-scan'
+# 이력 전체를 읽는 집계 (product_latest_state 도입 전 현재 순위 조회와 같은 형태)
+SLOW_SQL = """
+    SELECT product_id, MAX(collected_at) as collected_at, COUNT(*) as observations, AVG(ranking) as avg_ranking
+    FROM ranking_history
+    GROUP BY product_id
+"""
+FAST_REQUESTS = [
+    ('/api/health', None),
+    ('/api/categories/update-times', None),
+    ('/api/products/current', {'limit': 20, 'category': 'outer'}),
+    ('/api/brands/stats', None),
+]
+SERVER_START_TIMEOUT_SECONDS = 30
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def serve(port):
+    """벤치마크용 API 서버 (느린 엔드포인트 추가, 다른 엔드포인트처럼 def + get_db_connection)"""
+    import uvicorn
+    import api
+
+    def history_scan():
+        with api.get_db_connection() as conn:
+            return {'products': len(conn.execute(SLOW_SQL).fetchall())}
+
+    api.app.get(SLOW_PATH, include_in_schema=False)(history_scan)
+    uvicorn.run(api.app, host='127.0.0.1', port=port, log_level='warning', access_log=False)
+
+
+@contextlib.contextmanager
+def api_server(db_path, threads, deadline):
+    """API 서버 프로세스 실행 → base URL (종료 시 서버 종료)"""
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, DB_PATH=db_path, API_DB_THREADS=str(threads), RESPONSE_CACHE_MAX_ENTRIES='0')
+    if deadline is not None:
+        env['API_QUERY_DEADLINE_SECONDS'] = str(deadline)
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                               env=env, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        started = time.perf_counter()
+        while True:
+            try:
+                if httpx.get(f"{base_url}/api/health", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None or time.perf_counter() - started > SERVER_START_TIMEOUT_SECONDS:
+                raise RuntimeError("API 서버 시작 실패")
+            time.sleep(0.1)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def run_load(base_url, duration, slow_clients, fast_clients, seed):
+    """duration 초 동안 요청을 보내고 종류별 (지연 시간 목록(ms), 상태 코드별 횟수)"""
+    import httpx
+
+    results = {'slow': ([], {}), 'fast': ([], {})}
+    limits = httpx.Limits(max_connections=slow_clients + fast_clients)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as http:
+        # 연결 / 첫 요청 준비 (측정에서 제외)
+        await asyncio.gather(*(http.get(path, params=params) for path, params in FAST_REQUESTS + [(SLOW_PATH, None)]))
+        stop_at = time.perf_counter() + duration
+
+        async def client(kind, rng):
+            latencies, statuses = results[kind]
+            while time.perf_counter() < stop_at:
+                path, params = (SLOW_PATH, None) if kind == 'slow' else rng.choice(FAST_REQUESTS)
+                started = time.perf_counter()
+                response = await http.get(path, params=params)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        rng = random.Random(seed)
+        await asyncio.gather(
+            *(client('slow', random.Random(rng.random())) for _ in range(slow_clients)),
+            *(client('fast', random.Random(rng.random())) for _ in range(fast_clients)),
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="느린/빠른 요청 혼합 시 API 지연 시간 (inline vs 스레드 풀)")
+    parser.add_argument('--duration', type=float, default=10, help="모드별 측정 시간 (초)")
+    parser.add_argument('--slow-clients', type=int, default=2, help="느린 요청을 계속 보내는 클라이언트 수")
+    parser.add_argument('--fast-clients', type=int, default=8, help="빠른 요청을 계속 보내는 클라이언트 수")
+    parser.add_argument('--crawls', type=int, default=168, help="채울 크롤링 횟수 (1시간 간격)")
+    parser.add_argument('--threads', type=int, default=None, help="threads 모드 스레드 수 (기본: API_DB_THREADS)")
+    parser.add_argument('--deadline', type=float, default=None, help="요청 기한 초 (기본: API_QUERY_DEADLINE_SECONDS)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', default=None, help="채우는 대신 이 DB의 복사본 사용 (--crawls 무시)")
+    parser.add_argument('--serve', type=int, default=None, help=argparse.SUPPRESS)  # 내부용: 서버 프로세스
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve)
+        return
+
+    from benchmark_ingest import copy_database
+    from check_query_plans import populate
+    from db_executor import API_DB_THREADS, API_QUERY_DEADLINE_SECONDS
+
+    threads = args.threads if args.threads is not None else API_DB_THREADS
+    deadline = args.deadline if args.deadline is not None else API_QUERY_DEADLINE_SECONDS
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.db:
+                copy_database(args.db, db_path)
+            else:
+                populate(db_path, args.crawls, args.seed).close()
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT COUNT(*) FROM ranking_history").fetchone()[0]
+        conn.close()
+
+        print("=" * 78)
+        print(f"API 동시 요청 벤치마크 (이력 {rows:,}행, 느린 클라이언트 {args.slow_clients}개 + "
+              f"빠른 클라이언트 {args.fast_clients}개, {args.duration:g}초, 기한 {deadline:g}초)")
+        print("=" * 78)
+        print(f"   {'모드':10s} {'요청':6s} {'처리 수':>8s} {'p50(ms)':>9s} {'p99(ms)':>9s} {'최대(ms)':>9s}  상태 코드")
+
+        for mode, mode_threads in (('inline', 0), (f'threads={threads}', threads)):
+            with api_server(db_path, mode_threads, deadline) as base_url:
+                results = asyncio.run(run_load(base_url, args.duration, args.slow_clients,
+                                               args.fast_clients, args.seed))
+            for kind, (latencies, statuses) in results.items():
+                codes = ', '.join(f"{code}×{count}" for code, count in sorted(statuses.items()))
+                print(f"   {mode:10s} {kind:6s} {len(latencies):8,d} {percentile(latencies, 50):9.1f} "
+                      f"{percentile(latencies, 99):9.1f} {max(latencies, default=0):9.1f}  {codes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+녹화된 픽스처 재생 테스트 + 파싱 벤치마크 (오프라인, 사이트 접속 없음)
+
+픽스처 디렉토리 구조 (SCRAPER_CAPTURE_DIR=fixtures 로 크롤링하면 생성):
+    fixtures/<category_key>/page.html.gz     렌더링된 베스트 페이지 HTML
+    fixtures/<category_key>/listing_<n>.json 목록 API 응답 (있을 때만)
+    fixtures/<category_key>/expected.json    기대 상품 레코드 ({"dom": [...], "network": [...]})
+
+각 카테고리의 HTML을 모든 파서 백엔드로, 목록 응답을 네트워크 추출 경로로 재생하여
+기대 레코드와 정확히 일치하는지 확인하고 파싱 지연 시간과 메모리 할당량을 출력합니다.
+
+사용법:
+    python benchmark_fixtures.py                  # 검증 + 벤치마크 (불일치 시 종료 코드 1)
+    python benchmark_fixtures.py --update         # 기준 파서(html.parser)로 expected.json 재생성
+    python benchmark_fixtures.py --repeat 20 --fixtures fixtures
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import gzip
+import io
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from html_parsers import PARSERS, get_parser
+from wconcept_scraper_v2 import WConceptScraper, diff_products
+
+REFERENCE_PARSER = 'html.parser'
+
+def strip_volatile(products):
+    """비교에서 제외할 필드 제거 (수집 시각)"""
+    return [{k: v for k, v in product.items() if k != 'collected_at'} for product in products]
+
+
+def load_fixture(directory):
+    """카테고리 픽스처 로드 → (html 또는 None, 목록 응답 리스트, expected dict)"""
+    html = None
+    html_path = os.path.join(directory, 'page.html.gz')
+    if os.path.exists(html_path):
+        with gzip.open(html_path, 'rt', encoding='utf-8') as f:
+            html = f.read()
+
+    def page_number(path):
+        return int(re.search(r'listing_(\d+)\.json$', path).group(1))
+
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(directory, 'listing_*.json')), key=page_number):
+        with open(path, 'r', encoding='utf-8') as f:
+            payloads.append(json.load(f))
+
+    expected = {}
+    expected_path = os.path.join(directory, 'expected.json')
+    if os.path.exists(expected_path):
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+
+    return html, payloads, expected
+
+
+def replay_dom(category_key, html, parser_name):
+    scraper = WConceptScraper(category_key, html_parser=get_parser(parser_name))
+    return scraper.parse_html(html, max_products=10000)
+
+
+def replay_network(category_key, payloads):
+    scraper = WConceptScraper(category_key)
+    for payload in payloads:
+        scraper.add_listing_payload(payload)
+    return asyncio.run(scraper._extract_from_payloads(10000))
+
+
+def measure(func, repeat):
+    """평균 지연 시간(ms), 최대 메모리(KB), 호출당 할당 블록 수 측정"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()  # 워밍업
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        latency_ms = (time.perf_counter() - started) / repeat * 1000
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        func()
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return latency_ms, peak / 1024, allocations
+
+
+def run_category(directory, repeat, update):
+    """카테고리 하나 재생. 불일치 건수 반환"""
+    category_key = os.path.basename(directory.rstrip('/'))
+    html, payloads, expected = load_fixture(directory)
+    failures = 0
+
+    print(f"\n📂 {category_key}")
+    print(f"   {'경로':18s} {'상품수':>6s} {'지연(ms)':>9s} {'최대메모리(KB)':>14s} {'할당블록':>9s}  결과")
+
+    if update:
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = {}
+            if html is not None:
+                expected['dom'] = strip_volatile(replay_dom(category_key, html, REFERENCE_PARSER))
+            if payloads:
+                expected['network'] = strip_volatile(replay_network(category_key, payloads))
+        with open(os.path.join(directory, 'expected.json'), 'w', encoding='utf-8') as f:
+            json.dump(expected, f, ensure_ascii=False, indent=1)
+        print(f"   💾 expected.json 갱신")
+
+    cases = []
+    if html is not None:
+        for name in PARSERS:
+            cases.append((f"dom/{name}", 'dom', lambda name=name: replay_dom(category_key, html, name)))
+    if payloads:
+        cases.append(("network", 'network', lambda: replay_network(category_key, payloads)))
+
+    for label, source, func in cases:
+        with contextlib.redirect_stdout(io.StringIO()):
+            products = strip_volatile(func())
+        latency_ms, peak_kb, allocations = measure(func, repeat)
+
+        if source not in expected:
+            verdict = "기대 결과 없음 (--update 필요)"
+            failures += 1
+        else:
+            diffs = diff_products(expected[source], products)
+            verdict = "✓ 일치" if not diffs else f"✗ 차이 {len(diffs)}건: {diffs[0]}"
+            failures += bool(diffs)
+
+        print(f"   {label:18s} {len(products):6d} {latency_ms:9.1f} {peak_kb:14,.0f} {allocations:9,d}  {verdict}")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="픽스처 재생 테스트 + 파싱 벤치마크")
+    parser.add_argument('--fixtures', default='fixtures', help="픽스처 디렉토리")
+    parser.add_argument('--repeat', type=int, default=5, help="지연 시간 측정 반복 횟수")
+    parser.add_argument('--update', action='store_true', help="expected.json 재생성")
+    args = parser.parse_args()
+
+    directories = sorted(d for d in glob.glob(os.path.join(args.fixtures, '*')) if os.path.isdir(d))
+    if not directories:
+        print(f"⚠️  픽스처가 없습니다: {args.fixtures}")
+        sys.exit(1)
+
+    print("=" * 70)
+    print(f"픽스처 재생 테스트 ({len(directories)}개 카테고리)")
+    print("=" * 70)
+
+    failures = sum(run_category(directory, args.repeat, args.update) for directory in directories)
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"❌ 불일치 {failures}건")
+        sys.exit(1)
+    print("✅ 모든 픽스처 일치")
+
+
+if __name__ == "__main__":
+    main()
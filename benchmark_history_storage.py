@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+이력 저장 형식 벤치마크 (HISTORY_STORAGE=rows vs packed)
+합성 이력(기본 1년, 매시간 카테고리 8개 × 200개)을 두 형식의 임시 DB에 각각 저장한 뒤
+DB 파일 크기(VACUUM 후)와 Database.get_product_history 상품별 조회 시간을 비교합니다.
+실제 DB는 건드리지 않습니다.
+
+사용법:
+    python benchmark_history_storage.py
+    python benchmark_history_storage.py --days 30 --reads 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+
+import database
+from database import Database
+from packed_history import empty_day, encode_day, set_observation
+
+CATEGORIES = ['outer', 'dress', 'blouse', 'shirt', 'tshirt', 'knit', 'skirt', 'underwear']
+PRODUCTS_PER_CATEGORY = 200
+CHURN = 0.01  # 매시간 순위에서 빠지고 새로 들어오는 상품 비율
+RANK_NOISE = 5.0  # 매시간 순위 변동 폭 (표준편차)
+PRICES = [29000, 39000, 59000, 89000, 129000, 189000]
+
+
+def iter_crawls(days, rng):
+    """(수집 시각, [(product_id, category_key, rank, original_price, sale_price, discount_rate)]) 시간순"""
+    end = database.utc_now().replace(minute=20, second=0, microsecond=0)
+    collected_at = end - timedelta(days=days)
+    next_product = 0
+    prices = {}
+    rankings = {}
+    for category_key in CATEGORIES:
+        rankings[category_key] = []
+        for _ in range(PRODUCTS_PER_CATEGORY):
+            rankings[category_key].append(f"PROD_{300000000 + next_product}")
+            prices[rankings[category_key][-1]] = rng.choice(PRICES)
+            next_product += 1
+
+    while collected_at <= end:
+        rows = []
+        for category_key in CATEGORIES:
+            current = rankings[category_key]
+            for index in range(len(current)):
+                if rng.random() < CHURN:
+                    current[index] = f"PROD_{300000000 + next_product}"
+                    prices[current[index]] = rng.choice(PRICES)
+                    next_product += 1
+            order = {product_id: index for index, product_id in enumerate(current)}
+            current.sort(key=lambda product_id: order[product_id] + rng.gauss(0, RANK_NOISE))
+            for rank, product_id in enumerate(current, start=1):
+                price = prices[product_id]
+                discount = rng.choice([None, None, 10, 20])
+                sale_price = price * (100 - discount) // 100 if discount else price
+                rows.append((product_id, category_key, rank, price, sale_price, discount))
+        yield collected_at, rows
+        collected_at += timedelta(hours=1)
+
+
+def build_rows_db(path, days, seed):
+    """ranking_history 행 형식 DB 생성, 관측 수 반환"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(path, history_storage='rows')
+    observations = 0
+    with db.get_connection() as conn:
+        for snapshot, (collected_at, rows) in enumerate(iter_crawls(days, random.Random(seed))):
+            conn.executemany("""
+                INSERT INTO ranking_history (
+                    product_id, ranking, original_price, sale_price,
+                    discount_rate, collected_at, snapshot_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(product_id, rank, original, sale, discount, collected_at,
+                   snapshot * len(CATEGORIES) + CATEGORIES.index(category_key))
+                  for product_id, category_key, rank, original, sale, discount in rows])
+            observations += len(rows)
+    return db, observations
+
+
+def build_packed_db(path, days, seed):
+    """product_history_packed 형식 DB 생성 (하루치씩 모아서 저장), 관측 수 반환"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(path, history_storage='packed')
+    observations = 0
+
+    def flush(conn, day, arrays):
+        conn.executemany("""
+            INSERT INTO product_history_packed (product_id, day, category_key, data)
+            VALUES (?, ?, ?, ?)
+        """, [(product_id, day, category_key, encode_day(values))
+              for (product_id, category_key), values in arrays.items()])
+
+    with db.get_connection() as conn:
+        current_day, arrays = None, {}
+        for collected_at, rows in iter_crawls(days, random.Random(seed)):
+            day = collected_at.date().isoformat()
+            if day != current_day:
+                if arrays:
+                    flush(conn, current_day, arrays)
+                current_day, arrays = day, {}
+            for product_id, category_key, rank, original, sale, discount in rows:
+                values = arrays.setdefault((product_id, category_key), empty_day())
+                set_observation(values, collected_at, rank, original, sale, discount)
+            observations += len(rows)
+        if arrays:
+            flush(conn, current_day, arrays)
+    return db, observations
+
+
+def vacuum_size(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return os.path.getsize(path)
+
+
+def time_reads(db, product_ids, days):
+    """상품별 get_product_history 평균 시간(ms)과 평균 관측 수"""
+    started = time.perf_counter()
+    points = 0
+    for product_id in product_ids:
+        points += len(db.get_product_history(product_id, days))
+    return (time.perf_counter() - started) * 1000 / len(product_ids), points / len(product_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="이력 저장 형식(rows / packed) 크기·조회 벤치마크")
+    parser.add_argument('--days', type=int, default=365, help="합성 이력 기간 (일)")
+    parser.add_argument('--reads', type=int, default=300, help="조회 시간 측정에 쓸 상품 수")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = {}
+        for storage, build in (('rows', build_rows_db), ('packed', build_packed_db)):
+            path = os.path.join(tmp_dir, f'{storage}.db')
+            started = time.perf_counter()
+            db, observations = build(path, args.days, args.seed)
+            build_seconds = time.perf_counter() - started
+            results[storage] = {'db': db, 'observations': observations,
+                                'size': vacuum_size(path), 'build_seconds': build_seconds}
+
+        # 마지막 날 순위에 있던 상품 중에서 조회 대상 선택 (두 DB 동일)
+        with results['rows']['db'].get_connection() as conn:
+            recent = [row[0] for row in conn.execute("""
+                SELECT DISTINCT product_id FROM ranking_history
+                WHERE collected_at >= (SELECT datetime(MAX(collected_at), '-1 day') FROM ranking_history)
+            """)]
+        product_ids = random.Random(args.seed).sample(recent, min(args.reads, len(recent)))
+
+        print("=" * 70)
+        print(f"이력 저장 형식 벤치마크 ({args.days}일, 관측 {results['rows']['observations']:,}회)")
+        print("=" * 70)
+        print(f"   {'형식':8s} {'DB 크기(MB)':>12s} {'관측당(B)':>10s} {'생성(초)':>10s}")
+        for storage, result in results.items():
+            print(f"   {storage:8s} {result['size'] / 1024 / 1024:12.1f} "
+                  f"{result['size'] / result['observations']:10.1f} {result['build_seconds']:10.1f}")
+        print(f"   크기 비율: {results['rows']['size'] / results['packed']['size']:.1f}배")
+
+        print(f"\n   get_product_history 평균 (상품 {len(product_ids)}개)")
+        print(f"   {'기간(일)':>8s} {'관측 수':>8s} {'rows(ms)':>10s} {'packed(ms)':>11s}")
+        for days in (1, 7, 30, args.days):
+            rows_ms, points = time_reads(results['rows']['db'], product_ids, days)
+            packed_ms, _ = time_reads(results['packed']['db'], product_ids, days)
+            print(f"   {days:8d} {points:8.1f} {rows_ms:10.3f} {packed_ms:11.3f}")
+
+
+if __name__ == "__main__":
+    main()
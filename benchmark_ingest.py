@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+DB 저장(Database.save_products) 벤치마크
+ranking_history 누적 행 수를 늘려가며 크롤링 1회분(카테고리 8개 × 200개) 저장 시간과
+실행된 SQL 문 수(executemany는 행마다 1회)를 측정합니다. 임시 DB를 사용하므로 실제 DB는 건드리지 않습니다.
+
+사용법:
+    python benchmark_ingest.py
+    python benchmark_ingest.py --sizes 0,100000,1000000 --repeat 3
+    python benchmark_ingest.py --db synthetic_1x.db   # generate_synthetic_history.py 로 만든 DB 복사본에서 측정
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from database import Database
+
+CATEGORIES = ['outer', 'dress', 'blouse', 'shirt', 'tshirt', 'knit', 'skirt', 'underwear']
+PRODUCTS_PER_CATEGORY = 200
+PRODUCT_POOL = 6000  # 이력에 등장하는 전체 상품 수
+
+
+class TracedDatabase(Database):
+    """실행된 SQL 문 수를 세는 Database"""
+
+    statements = 0
+
+    @contextmanager
+    def get_connection(self):
+        with super().get_connection() as conn:
+            conn.set_trace_callback(self._count_statement)
+            yield conn
+
+    def _count_statement(self, sql):
+        self.statements += 1
+
+
+def make_crawl(rng):
+    """크롤링 1회분 상품 dict (상품 풀에서 무작위 선택)"""
+    product_ids = rng.sample(range(PRODUCT_POOL), PRODUCTS_PER_CATEGORY * len(CATEGORIES))
+    products = []
+    for index, product_num in enumerate(product_ids):
+        category_key = CATEGORIES[index // PRODUCTS_PER_CATEGORY]
+        price = rng.choice([39000, 59000, 89000, 129000])
+        products.append({
+            'rank': index % PRODUCTS_PER_CATEGORY + 1,
+            'product_id': f"PROD_{300000000 + product_num}",
+            'product_name': f"상품 {product_num}",
+            'brand_name': f"브랜드 {product_num % 400}",
+            'category': category_key,
+            'category_key': category_key,
+            'original_price': price,
+            'sale_price': price - rng.choice([0, 0, 5000, 10000]),
+            'discount_rate': rng.choice([None, 5, 10, 20]),
+            'image_url': "N/A",
+            'product_url': "N/A",
+        })
+    return products
+
+
+def grow_history(db, target_rows, rng):
+    """ranking_history 행 수가 target_rows가 될 때까지 과거 이력 추가 (1시간 간격)"""
+    with db.get_connection() as conn:
+        current = conn.execute("SELECT COUNT(*) FROM ranking_history").fetchone()[0]
+        oldest = conn.execute("SELECT MIN(collected_at) FROM ranking_history").fetchone()[0]
+        collected_at = datetime.fromisoformat(oldest) if oldest else datetime.now()
+
+        rows_per_crawl = PRODUCTS_PER_CATEGORY * len(CATEGORIES)
+        while current < target_rows:
+            collected_at -= timedelta(hours=1)
+            count = min(rows_per_crawl, target_rows - current)
+            conn.executemany("""
+                INSERT INTO ranking_history (product_id, ranking, original_price, sale_price, discount_rate, collected_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(f"PROD_{300000000 + rng.randrange(PRODUCT_POOL)}", rank % PRODUCTS_PER_CATEGORY + 1,
+                   59000, 59000, None, collected_at) for rank in range(count)])
+            current += count
+        return current
+
+
+def copy_database(source, target):
+    """SQLite 백업 API로 DB 복사 (WAL 에 남은 내용 포함, 원본은 읽기만)"""
+    source_conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    target_conn = sqlite3.connect(target)
+    try:
+        source_conn.backup(target_conn)
+    finally:
+        source_conn.close()
+        target_conn.close()
+
+
+def count_history(db):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM ranking_history").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="save_products 벤치마크 (이력 크기별)")
+    parser.add_argument('--sizes', default='0,100000,500000,1000000', help="측정할 이력 행 수 (쉼표 구분)")
+    parser.add_argument('--repeat', type=int, default=3, help="크기별 저장 반복 횟수")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', default=None, help="이 DB의 복사본에서 측정 (--sizes 무시)")
+    args = parser.parse_args()
+
+    sizes = [None] if args.db else sorted(int(size) for size in args.sizes.split(','))
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'benchmark.db')
+        if args.db:
+            copy_database(args.db, db_path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            db = TracedDatabase(db_path)
+
+        print("=" * 70)
+        print(f"save_products 벤치마크 (1회 {PRODUCTS_PER_CATEGORY * len(CATEGORIES)}개 상품)")
+        print("=" * 70)
+        print(f"   {'이력 행 수':>12s} {'평균(ms)':>10s} {'최소(ms)':>10s} {'SQL 실행 수':>10s}")
+
+        for size in sizes:
+            rows = count_history(db) if args.db else grow_history(db, size, rng)
+            timings = []
+            for _ in range(args.repeat):
+                products = make_crawl(rng)
+                db.statements = 0
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    db.save_products(products)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"   {rows:12,d} {sum(timings) / len(timings):10.1f} {min(timings):10.1f} {db.statements:10,d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+HTML 파서 백엔드 벤치마크
+저장된 베스트 페이지 HTML을 각 파서 백엔드로 반복 파싱하여 초당 처리 상품 수 비교
+(결과는 html.parser 기준 결과와 필드 단위로 비교)
+
+사용법:
+    python benchmark_parsers.py [html 파일 ...] [--repeat N]
+    python benchmark_parsers.py final_page_source.html --repeat 20
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from html_parsers import PARSERS, get_parser
+from wconcept_scraper_v2 import WConceptScraper, diff_products
+
+
+def parse_quietly(scraper, content):
+    """진행 로그 없이 파싱"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scraper.parse_html(content, max_products=10000)
+
+
+def benchmark_file(path, repeat):
+    """파일 하나에 대해 모든 백엔드 측정"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    print(f"\n📄 {path} ({len(content) / 1024:,.0f}KB)")
+    print(f"{'백엔드':14s} {'상품수':>6s} {'평균(ms)':>10s} {'상품/초':>10s}  결과")
+    print("-" * 60)
+
+    baseline = None
+    for name in PARSERS:
+        scraper = WConceptScraper('outer', html_parser=get_parser(name))
+        products = parse_quietly(scraper, content)
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            parse_quietly(scraper, content)
+        elapsed = (time.perf_counter() - started) / repeat
+
+        if baseline is None:
+            baseline = products
+            verdict = "기준"
+        else:
+            diffs = diff_products(baseline, products)
+            verdict = "일치" if not diffs else f"차이 {len(diffs)}건: {diffs[0]}"
+
+        rate = len(products) / elapsed if elapsed else 0
+        print(f"{name:14s} {len(products):6d} {elapsed * 1000:10.1f} {rate:10,.0f}  {verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 파서 백엔드 벤치마크")
+    parser.add_argument('files', nargs='*', default=['final_page_source.html'], help="저장된 페이지 HTML")
+    parser.add_argument('--repeat', type=int, default=10, help="반복 횟수")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("HTML 파서 백엔드 벤치마크")
+    print("=" * 60)
+    for path in args.files:
+        benchmark_file(path, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
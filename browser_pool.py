@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+상주 Chromium 브라우저 풀
+scheduler.py 프로세스 안에서 크롤링 사이에도 브라우저를 띄워두고 재사용
+
+- 크롤링은 풀에서 컨텍스트를 빌려 쓰고 닫으면 반납 (컨텍스트는 매번 새로 생성)
+- 브라우저가 N개 페이지를 처리했거나 메모리(RSS)가 한도를 넘으면 새 브라우저로 교체
+  (사용 중인 컨텍스트가 모두 반납된 뒤 이전 브라우저 종료)
+- 상태 정보는 health() 및 상태 파일(JSON)로 노출 → API /api/crawl/pool
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from playwright.async_api import async_playwright
+
+from wconcept_scraper_v2 import launch_browser
+
+DEFAULT_MAX_PAGES = int(os.environ.get('BROWSER_POOL_MAX_PAGES', '200'))
+DEFAULT_MAX_MEMORY_MB = int(os.environ.get('BROWSER_POOL_MAX_MEMORY_MB', '600'))
+HEALTH_PATH = os.environ.get('BROWSER_POOL_HEALTH_PATH', '/tmp/browser_pool_health.json')
+
+
+def _descendant_rss_mb(root_pid: int) -> float:
+    """root_pid의 모든 하위 프로세스(Chromium 포함) RSS 합계 (MB, Linux /proc 기준)"""
+    parents = {}
+    rss_kb = {}
+    try:
+        pids = [int(name) for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return 0.0
+
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status', 'r') as f:
+                for line in f:
+                    if line.startswith('PPid:'):
+                        parents[pid] = int(line.split()[1])
+                    elif line.startswith('VmRSS:'):
+                        rss_kb[pid] = int(line.split()[1])
+        except (OSError, ValueError):
+            continue
+
+    total_kb = 0
+    for pid in pids:
+        ancestor = parents.get(pid)
+        while ancestor and ancestor != root_pid:
+            ancestor = parents.get(ancestor)
+        if ancestor == root_pid:
+            total_kb += rss_kb.get(pid, 0)
+    return total_kb / 1024
+
+
+class BrowserPool:
+    """재사용 가능한 Chromium 풀 (SharedBrowser와 같은 new_context 인터페이스)"""
+
+    def __init__(self, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_memory_mb: int = DEFAULT_MAX_MEMORY_MB,
+                 health_path: str = HEALTH_PATH):
+        """
+        Args:
+            max_pages: 브라우저 하나가 처리할 최대 페이지(컨텍스트) 수
+            max_memory_mb: 브라우저 프로세스 RSS 한도 (초과 시 다음 요청 때 교체)
+            health_path: 상태 JSON 파일 경로 (None이면 기록 안 함)
+        """
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.health_path = health_path
+
+        self._playwright = None
+        self._browser = None
+        self._lock = asyncio.Lock()
+        self._in_use = {}      # id(browser) → 사용 중인 컨텍스트 수
+        self._retiring = {}    # id(browser) → 반납 대기 중인 이전 브라우저
+
+        self.started_at = None
+        self.browser_started_at = None
+        self.pages_served = 0
+        self.browser_pages = 0
+        self.restarts = 0
+        self.last_restart_reason = None
+        self.last_error = None
+
+    async def start(self):
+        """Playwright 드라이버 시작 (브라우저는 첫 요청 때 실행)"""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+            self.started_at = time.time()
+        self.write_health()
+        return self
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def memory_mb(self) -> float:
+        """현재 프로세스 하위 Chromium 프로세스 메모리 (MB)"""
+        return _descendant_rss_mb(os.getpid())
+
+    def _recycle_reason(self):
+        if self._browser is None:
+            return None
+        if not self._browser.is_connected():
+            return 'disconnected'
+        if self.browser_pages >= self.max_pages:
+            return f'max_pages ({self.browser_pages})'
+        memory = self.memory_mb()
+        if self.max_memory_mb and memory > self.max_memory_mb:
+            return f'memory ({memory:.0f}MB)'
+        return None
+
+    async def _replace_browser(self, reason):
+        """새 브라우저 실행 후 이전 브라우저는 반납이 끝나면 종료"""
+        old = self._browser
+        self._browser = None
+        if old is not None:
+            self.restarts += 1
+            self.last_restart_reason = reason
+            print(f"♻️  브라우저 교체: {reason}")
+            if self._in_use.get(id(old), 0) == 0 or not old.is_connected():
+                await self._close_browser(old)
+            else:
+                self._retiring[id(old)] = old
+
+        print("🌐 상주 브라우저 실행 중...")
+        browser = await launch_browser(self._playwright)
+        self._browser = browser
+        self._in_use[id(browser)] = 0
+        self.browser_started_at = time.time()
+        self.browser_pages = 0
+
+    async def _close_browser(self, browser):
+        self._in_use.pop(id(browser), None)
+        self._retiring.pop(id(browser), None)
+        try:
+            await browser.close()
+        except Exception as e:
+            self.last_error = f"browser close: {str(e)}"
+
+    def _release(self, browser):
+        """컨텍스트 반납 (close 이벤트)"""
+        key = id(browser)
+        if key in self._in_use:
+            self._in_use[key] = max(0, self._in_use[key] - 1)
+        if key in self._retiring and self._in_use.get(key, 0) == 0:
+            asyncio.ensure_future(self._close_browser(self._retiring[key]))
+
+    async def new_context(self, **kwargs):
+        """풀에서 컨텍스트 대여 (context.close() 시 자동 반납)"""
+        if self._playwright is None:
+            await self.start()
+
+        async with self._lock:
+            if self._browser is None:
+                await self._replace_browser('start')
+            else:
+                reason = self._recycle_reason()
+                if reason:
+                    await self._replace_browser(reason)
+            browser = self._browser
+            self._in_use[id(browser)] += 1
+            self.pages_served += 1
+            self.browser_pages += 1
+
+        try:
+            context = await browser.new_context(**kwargs)
+        except Exception as e:
+            self.last_error = f"new_context: {str(e)}"
+            self._release(browser)
+            raise
+        context.on('close', lambda _: self._release(browser))
+        return context
+
+    def health(self) -> dict:
+        """풀 상태 정보"""
+        browser_connected = self._browser is not None and self._browser.is_connected()
+        return {
+            'status': 'running' if self._playwright is not None else 'stopped',
+            'pid': os.getpid(),
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+            'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat() if self.started_at else None,
+            'browser_connected': browser_connected,
+            'browser_uptime_seconds': round(time.time() - self.browser_started_at, 1) if browser_connected else None,
+            'pages_served': self.pages_served,
+            'browser_pages': self.browser_pages,
+            'max_pages': self.max_pages,
+            'contexts_in_use': sum(self._in_use.values()),
+            'retiring_browsers': len(self._retiring),
+            'memory_mb': round(self.memory_mb(), 1),
+            'max_memory_mb': self.max_memory_mb,
+            'restarts': self.restarts,
+            'last_restart_reason': self.last_restart_reason,
+            'last_error': self.last_error,
+        }
+
+    def write_health(self, extra: dict = None):
+        """상태 JSON 파일 기록 (API 프로세스가 읽음)"""
+        if not self.health_path:
+            return
+        data = self.health()
+        if extra:
+            data.update(extra)
+        try:
+            tmp_path = self.health_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.health_path)
+        except OSError as e:
+            print(f"⚠️  브라우저 풀 상태 기록 실패: {str(e)}")
+
+    async def close(self):
+        """모든 브라우저와 Playwright 드라이버 종료"""
+        for browser in list(self._retiring.values()):
+            await self._close_browser(browser)
+        if self._browser is not None:
+            await self._close_browser(self._browser)
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self.write_health()
+
+
+def read_health(path: str = HEALTH_PATH):
+    """상태 파일 읽기 (없으면 None)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+쿼리 플랜 회귀 검사
+임시 DB에 크롤링 이력을 채운 뒤 API 엔드포인트와 Database 조회/저장 메서드를 모두 호출하면서
+실행된 SQL 문을 수집하고, 각 문장의 EXPLAIN QUERY PLAN 에 이력 테이블 SCAN 이 있으면 실패합니다.
+(SCAN ... USING INDEX 도 인덱스 전체를 읽으므로 실패. 단, 인덱스 순서대로 읽다가 LIMIT 에서 멈추는
+ ORDER BY ... LIMIT 쿼리(임시 정렬 없음)는 허용. 마이그레이션/롤업 재생성/보관 정리/ID 병합,
+ get_database_stats 같은 유지보수·진단 작업은 전체를 읽는 것이 정상이므로 대상이 아님)
+
+사용법:
+    python check_query_plans.py             # 실패 시 종료 코드 1
+    python check_query_plans.py --verbose   # 모든 문장의 플랜 출력
+    python check_query_plans.py --crawls 72
+    python check_query_plans.py --db synthetic_1x.db   # generate_synthetic_history.py 로 만든 DB 복사본으로 검사
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import database
+from benchmark_ingest import copy_database, make_crawl
+from database import Database
+from sqlite_pool import ConnectionManager
+
+# 이력(시간에 따라 계속 늘어나는) 테이블: 요청/저장 경로에서 전체 스캔 금지
+HISTORY_TABLES = (
+    'ranking_history', 'ranking_changes', 'price_changes', 'brand_stats_history',
+    'brand_category_stats', 'snapshots', 'scraping_logs',
+    'product_daily_rollup', 'brand_daily_rollup', 'product_history_packed',
+)
+CHECKED_STATEMENT_RE = re.compile(r'^\s*(SELECT|WITH|UPDATE|DELETE|INSERT\s+INTO\s+\w+\s*\([^)]*\)\s*SELECT)',
+                                  re.IGNORECASE | re.DOTALL)
+FULL_SCAN_RE = re.compile(r'\bSCAN (\w+)')
+LIMIT_RE = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def is_bounded_index_scan(detail, sql, plan):
+    """인덱스 순서로 읽고 LIMIT 에서 멈추는 스캔인지 (예: ORDER BY started_at DESC LIMIT 20)"""
+    return ('USING INDEX' in detail or 'USING COVERING INDEX' in detail) \
+        and LIMIT_RE.search(sql) is not None \
+        and not any('TEMP B-TREE' in step for step in plan)
+
+
+def populate(db_path, crawls, seed):
+    """crawls 시간 동안 매시간 크롤링한 것처럼 이력 저장 (+ 작업 로그)"""
+    rng = random.Random(seed)
+    db = Database(db_path)
+    now = database.utc_now()
+    for hour in range(crawls, 0, -1):
+        collected_at = now - timedelta(hours=hour)
+        db.save_products(make_crawl(rng), collected_at=collected_at)
+        db.log_scraping_job(collected_at, 'success', 1600, execution_time=60, completed_at=collected_at)
+    return db
+
+
+def exercise(db, record):
+    """API 엔드포인트와 Database 메서드 호출 (record(label) 로 현재 호출 표시)"""
+    import api
+    from fastapi.testclient import TestClient
+
+    product_id = db.get_latest_rankings(1)[0]['product_id']
+    brand = db.get_brand_statistics(24)[0]['brand_name']
+    category = 'outer'
+
+    requests = [
+        ('GET', '/api/health', None),
+        ('GET', '/api/categories/update-times', None),
+        ('GET', '/api/products/current', None),
+        ('GET', '/api/products/current', {'category': category}),
+        ('GET', '/api/products/current', {'brand': brand}),
+        ('GET', '/api/brands/list', None),
+        ('GET', '/api/brands/stats', None),
+        ('GET', '/api/brands/stats', {'category': category, 'sort_by': 'avg_price'}),
+        ('GET', f'/api/products/{product_id}/history', {'days': 7}),
+        ('GET', '/api/price-changes', {'days': 7}),
+        ('GET', '/api/ranking-changes', {'days': 7}),
+        ('GET', '/api/ranking-changes', {'days': 7, 'change_type': '상승'}),
+        ('GET', '/api/jobs/history', None),
+        ('GET', f'/api/trends/brand/{brand}', {'days': 3}),
+        ('GET', f'/api/trends/brand/{brand}', {'days': 3, 'category': category}),
+        ('GET', f'/api/trends/brand/{brand}', {'days': 60}),
+        ('GET', f'/api/trends/brand/{brand}', {'days': 60, 'category': category}),
+        ('GET', f'/api/trends/product/{product_id}', {'days': 3}),
+        ('GET', f'/api/trends/product/{product_id}', {'days': 60}),
+        ('GET', '/api/crawl/status', None),
+        ('GET', '/api/dashboard', None),
+        ('POST', '/api/products/batch/history', {'product_ids': [product_id, 'PROD_0'], 'days': 2}),
+    ]
+    with TestClient(api.app) as client:
+        for method, path, params in requests:
+            record(f"{method} {path}")
+            if method == 'GET':
+                response = client.get(path, params=params)
+            else:
+                response = client.post(path, json=params)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {path} → {response.status_code}: {response.text[:200]}")
+
+    # 같은 경로로 먼저 등록된 /api/crawl/status 에 가려진 두 번째 핸들러도 직접 호출
+    record("api.get_crawl_status")
+    api.get_crawl_status()
+
+    calls = [
+        ('Database.get_latest_rankings', lambda: db.get_latest_rankings(200)),
+        ('Database.get_brand_statistics', lambda: db.get_brand_statistics(24)),
+        ('Database.get_brand_statistics(category)', lambda: db.get_brand_statistics(24, category)),
+        ('Database.get_product_history', lambda: db.get_product_history(product_id, 7)),
+        ('Database.get_ranking_movers(up)', lambda: db.get_ranking_movers('up')),
+        ('Database.get_ranking_movers(down)', lambda: db.get_ranking_movers('down')),
+        ('Database.get_price_changes', lambda: db.get_price_changes(24)),
+        ('Database.record_snapshot', lambda: db.record_snapshot('outer', 'failed')),
+        ('Database.log_scraping_job', lambda: db.log_scraping_job(datetime.now(), 'failed', 0, 'timeout')),
+        ('Database.save_products', lambda: db.save_products(make_crawl(random.Random(0)))),
+    ]
+    for label, call in calls:
+        record(label)
+        call()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN 기반 전체 스캔 검사")
+    parser.add_argument('--crawls', type=int, default=48, help="채울 크롤링 횟수 (1시간 간격)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', action='store_true', help="모든 문장의 플랜 출력")
+    parser.add_argument('--db', default=None, help="채우는 대신 이 DB의 복사본 사용 (--crawls 무시)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'plans.db')
+        os.environ['DB_PATH'] = db_path
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.db:
+                copy_database(args.db, db_path)
+                db = Database(db_path)
+            else:
+                db = populate(db_path, args.crawls, args.seed)
+
+        # 이후 실행되는 모든 SQL 수집 (연결마다 trace callback)
+        statements = {}
+        current = {'label': None}
+
+        def record(label):
+            current['label'] = label
+
+        def trace(sql):
+            if current['label'] and CHECKED_STATEMENT_RE.match(sql):
+                key = LITERAL_RE.sub('?', ' '.join(sql.split()))
+                statements.setdefault(key, (sql, set()))[1].add(current['label'])
+
+        # 새로 여는 연결마다 trace (API 종료 시 매니저가 닫히고 다시 만들어져도 적용되도록 클래스에 설정)
+        db.connections.close()
+        original_connect = ConnectionManager._connect
+
+        def traced_connect(manager, readonly):
+            conn = original_connect(manager, readonly)
+            conn.set_trace_callback(trace)
+            return conn
+
+        ConnectionManager._connect = traced_connect
+
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                exercise(db, record)
+        finally:
+            current['label'] = None
+            ConnectionManager._connect = original_connect
+
+        conn = sqlite3.connect(db_path)
+        failures = []
+        for key, (sql, labels) in statements.items():
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            scans = [detail for detail in plan
+                     if (match := FULL_SCAN_RE.search(detail)) and match.group(1) in HISTORY_TABLES
+                     and not is_bounded_index_scan(detail, sql, plan)]
+            if scans:
+                failures.append((sql, labels, plan))
+            if args.verbose or scans:
+                print(f"\n{'❌' if scans else '✅'} {', '.join(sorted(labels))}")
+                print("   " + ' '.join(sql.split())[:300])
+                for detail in plan:
+                    print(f"      {detail}")
+        conn.close()
+
+        print("\n" + "=" * 70)
+        print(f"쿼리 플랜 검사: SQL {len(statements)}개, 이력 테이블 전체 스캔 {len(failures)}개")
+        print("=" * 70)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,12 @@ import './App.css';
 // API URL - 환경 변수 또는 기본값 사용
 const API_BASE = import.meta.env.VITE_API_BASE_URL || 'https://w-best-tracker.fly.dev';
 
+// 조건부 재검증: 브라우저 캐시가 있어도 서버에 If-None-Match(ETag)로 확인 → 바뀌지 않았으면 304 (본문 재다운로드 없음)
+// 기본 요청은 API의 Cache-Control(다음 크롤링까지) 동안 브라우저/Cloudflare 캐시를 그대로 사용
+const REVALIDATE = { adapter: 'fetch', fetchOptions: { cache: 'no-cache' } };
+const UPDATE_POLL_INTERVAL_MS = 60 * 1000;  // 크롤링 시각 이후 /api/health 확인 간격
+const UPDATE_POLL_MAX_TRIES = 15;
+
 // 서울 시간(KST) 포맷팅 함수
 const formatKST = (dateString) => {
   if (!dateString) return '-';
@@ -141,15 +147,33 @@ function App() {
       const delay = nextUpdate.getTime() - now.getTime();
       console.log(`다음 업데이트: ${nextUpdate.toLocaleString('ko-KR')} (${Math.round(delay/1000/60)}분 후)`);
       
-      const timeout = setTimeout(() => {
-        fetchData();
-        scheduleNextUpdate(); // 다음 업데이트 예약
+      timeout = setTimeout(() => {
+        waitForNewData(0);
       }, delay);
-      
-      return timeout;
     };
     
-    const timeout = scheduleNextUpdate();
+    // 크롤링이 끝나 수집 시각이 바뀔 때까지 /api/health 를 조건부 요청으로 확인 (변경 없으면 304)
+    const waitForNewData = async (tries) => {
+      try {
+        const res = await axios.get(`${API_BASE}/api/health`, REVALIDATE);
+        if (lastCollection === null || res.data.latest_collection !== lastCollection || tries >= UPDATE_POLL_MAX_TRIES) {
+          lastCollection = res.data.latest_collection;
+          fetchData(true);
+          scheduleNextUpdate(); // 다음 업데이트 예약
+          return;
+        }
+      } catch (error) {
+        console.error('업데이트 확인 오류:', error);
+      }
+      timeout = setTimeout(() => waitForNewData(tries + 1), UPDATE_POLL_INTERVAL_MS);
+    };
+    
+    let timeout;
+    let lastCollection = null;
+    axios.get(`${API_BASE}/api/health`)
+      .then(res => { lastCollection = res.data.latest_collection; })
+      .catch(() => {});
+    scheduleNextUpdate();
     return () => clearTimeout(timeout);
   }, []);
 
@@ -219,110 +243,56 @@ function App() {
     link.click();
   };
 
-  const fetchData = async () => {
+  // 대시보드 번들(/api/dashboard) 한 번으로 현재 순위, 최근 48시간 순위(sparkline), 카테고리 수집 시간, 상태를 모두 받음
+  // (크롤링 후 서버가 미리 만들어 둔 압축 JSON - 제품별 히스토리 요청 없음)
+  // revalidate: 새 데이터가 있을 때(자동 업데이트, 수동 크롤링 후) 브라우저 캐시 대신 ETag 로 재확인
+  const fetchData = async (revalidate = false) => {
     try {
-      const categoryParam = selectedCategory !== 'all' ? `&category=${selectedCategory}` : '';
-      const [productsRes, allProductsRes, statsRes, categoryTimesRes] = await Promise.all([
-        axios.get(`${API_BASE}/api/products/current?limit=${topProductLimit}${categoryParam}`),
-        axios.get(`${API_BASE}/api/products/current?limit=200${categoryParam}`),
-        axios.get(`${API_BASE}/api/health`),
-        axios.get(`${API_BASE}/api/categories/update-times`)
-      ]);
-      setProducts(productsRes.data);
-      setAllProducts(allProductsRes.data);
-      setStats(statsRes.data);
-      setCategoryUpdateTimes(categoryTimesRes.data.categories || {});
+      const startTime = Date.now();
+      const bundleRes = await axios.get(`${API_BASE}/api/dashboard`, revalidate ? REVALIDATE : {});
+      const bundle = bundleRes.data;
       
-      // 배치 API로 모든 제품의 히스토리를 한 번에 조회
-      const productsToTrack = [...productsRes.data];
+      // 카테고리별 TOP → 선택한 카테고리 (전체: 모든 카테고리를 순위 순으로)
+      const categoryProducts = selectedCategory !== 'all'
+        ? (bundle.products[selectedCategory] || [])
+        : Object.values(bundle.products).flat().sort((a, b) => a.ranking - b.ranking);
+      const allProductsData = categoryProducts.slice(0, 200);
+      setProducts(categoryProducts.slice(0, topProductLimit));
+      setAllProducts(allProductsData);
+      setStats(bundle.health);
+      setCategoryUpdateTimes(bundle.categories || {});
       
+      // 순위 변동: sparkline(오래된 순)의 마지막 두 순위 비교, 48시간 안에 관측이 1번 이하면 신규
       const changesMap = {};
       const newProducts = new Set();
-      
-      console.log(`순위 변동 조회 시작 (배치 API - ${productsToTrack.length}개)...`);
-      const startTime = Date.now();
-      
-      try {
-        const batchHistoryRes = await axios.post(`${API_BASE}/api/products/batch/history`, {
-          product_ids: productsToTrack.map(p => p.product_id),
-          days: 2
-        });
-        
-        const histories = batchHistoryRes.data.data;
-        
-        // 각 제품의 히스토리 분석
-        for (const product of productsToTrack) {
-          const history = histories[product.product_id] || [];
-          
-          if (history.length === 0 || history.length === 1) {
-            newProducts.add(product.product_id);
-          } else if (history.length >= 2) {
-            const current = history[0];
-            const previous = history[1];
-            
-            if (current.ranking !== previous.ranking) {
-              const diff = previous.ranking - current.ranking;
-              changesMap[product.product_id] = {
-                old_ranking: previous.ranking,
-                new_ranking: current.ranking,
-                ranking_diff: diff,
-                change_type: diff > 0 ? 'up' : 'down'
-              };
-            }
-          }
+      for (const product of categoryProducts) {
+        const sparkline = product.sparkline || [];
+        if (sparkline.length <= 1) {
+          newProducts.add(product.product_id);
+          continue;
         }
-        
-        const elapsedTime = ((Date.now() - startTime) / 1000).toFixed(2);
-        console.log(`✅ 순위 변동 조회 완료: ${elapsedTime}초 (배치 API)`);
-        console.log('순위 변동 개수:', Object.keys(changesMap).length);
-        console.log('신규 제품 개수:', newProducts.size);
-        
-      } catch (error) {
-        console.warn('배치 API 실패, 개별 조회로 폴백:', error.message);
-        
-        // Fallback: 개별 조회 (10개씩 배치)
-        const batchSize = 10;
-        for (let i = 0; i < productsToTrack.length; i += batchSize) {
-          const batch = productsToTrack.slice(i, i + batchSize);
-          
-          await Promise.all(batch.map(async (product) => {
-            try {
-              const historyRes = await axios.get(`${API_BASE}/api/products/${product.product_id}/history?days=2`);
-              const history = historyRes.data;
-              
-              if (history.length === 0 || history.length === 1) {
-                newProducts.add(product.product_id);
-              } else if (history.length >= 2) {
-                const current = history[0];
-                const previous = history[1];
-                
-                if (current.ranking !== previous.ranking) {
-                  const diff = previous.ranking - current.ranking;
-                  changesMap[product.product_id] = {
-                    old_ranking: previous.ranking,
-                    new_ranking: current.ranking,
-                    ranking_diff: diff,
-                    change_type: diff > 0 ? 'up' : 'down'
-                  };
-                }
-              }
-            } catch (err) {
-              // 조용히 실패
-            }
-          }));
+        const current = sparkline[sparkline.length - 1];
+        const previous = sparkline[sparkline.length - 2];
+        if (current !== previous) {
+          const diff = previous - current;
+          changesMap[product.product_id] = {
+            old_ranking: previous,
+            new_ranking: current,
+            ranking_diff: diff,
+            change_type: diff > 0 ? 'up' : 'down'
+          };
         }
-        
-        const elapsedTime = ((Date.now() - startTime) / 1000).toFixed(2);
-        console.log(`✅ 순위 변동 조회 완료: ${elapsedTime}초 (폴백 모드)`);
-        console.log('순위 변동 개수:', Object.keys(changesMap).length);
-        console.log('신규 제품 개수:', newProducts.size);
       }
-      
       setRankingChanges({ ...changesMap, _newProducts: newProducts });
       
+      const elapsedTime = ((Date.now() - startTime) / 1000).toFixed(2);
+      console.log(`✅ 대시보드 데이터 조회 완료: ${elapsedTime}초 (번들 ${bundle.version})`);
+      console.log('순위 변동 개수:', Object.keys(changesMap).length);
+      console.log('신규 제품 개수:', newProducts.size);
+      
       // 현재 카테고리의 브랜드 통계 계산
       const brandStatsMap = {};
-      allProductsRes.data.forEach(product => {
+      allProductsData.forEach(product => {
         const brand = product.brand_name;
         if (!brand || brand === 'N/A') return;
         
@@ -368,98 +338,11 @@ function App() {
       setBrands(brandStatsArray.slice(0, 20));
       
       // 현재 카테고리의 브랜드 목록 추출 (중복 제거)
-      const uniqueBrands = [...new Set(allProductsRes.data.map(p => p.brand_name))].filter(b => b && b !== 'N/A').sort();
+      const uniqueBrands = [...new Set(allProductsData.map(p => p.brand_name))].filter(b => b && b !== 'N/A').sort();
       setAllBrandsList(uniqueBrands);
       
-      // 하시에 제품 찾기 (카테고리 필터 적용)
-      let allHashieProducts;
-      if (selectedCategory === 'all') {
-        // 전체 카테고리 선택 시 모든 제품에서 하시에 제품 가져오기
-        const allCategoriesRes = await axios.get(`${API_BASE}/api/products/current?limit=10000`);
-        allHashieProducts = allCategoriesRes.data.filter(p => p.brand_name === '하시에');
-      } else {
-        // 특정 카테고리 선택 시 해당 카테고리의 하시에 제품만
-        allHashieProducts = allProductsRes.data.filter(p => p.brand_name === '하시에');
-      }
-      
-      // 하시에 제품의 순위 변동도 추적 (TOP 100에 없어도) - 배치 API
-      const hashieProductsToTrack = allHashieProducts.filter(
-        hp => !productsToTrack.find(p => p.product_id === hp.product_id)
-      );
-      
-      if (hashieProductsToTrack.length > 0) {
-        console.log(`하시에 제품 순위 변동 추적 (배치 API - ${hashieProductsToTrack.length}개)...`);
-        const hashieStartTime = Date.now();
-        
-        try {
-          const hashieBatchRes = await axios.post(`${API_BASE}/api/products/batch/history`, {
-            product_ids: hashieProductsToTrack.map(p => p.product_id),
-            days: 2
-          });
-          
-          const hashieHistories = hashieBatchRes.data.data;
-          
-          for (const hashieProduct of hashieProductsToTrack) {
-            const history = hashieHistories[hashieProduct.product_id] || [];
-            
-            if (history.length === 0 || history.length === 1) {
-              newProducts.add(hashieProduct.product_id);
-            } else if (history.length >= 2) {
-              const current = history[0];
-              const previous = history[1];
-              
-              if (current.ranking !== previous.ranking) {
-                const diff = previous.ranking - current.ranking;
-                changesMap[hashieProduct.product_id] = {
-                  old_ranking: previous.ranking,
-                  new_ranking: current.ranking,
-                  ranking_diff: diff,
-                  change_type: diff > 0 ? 'up' : 'down'
-                };
-              }
-            }
-          }
-          
-          const hashieElapsed = ((Date.now() - hashieStartTime) / 1000).toFixed(2);
-          console.log(`✅ 하시에 제품 조회 완료: ${hashieElapsed}초 (배치 API)`);
-          
-        } catch (error) {
-          console.warn('하시에 배치 API 실패, 개별 조회로 폴백:', error.message);
-          
-          // Fallback: 개별 조회
-          await Promise.all(hashieProductsToTrack.map(async (hashieProduct) => {
-            try {
-              const historyRes = await axios.get(`${API_BASE}/api/products/${hashieProduct.product_id}/history?days=2`);
-              const history = historyRes.data;
-              
-              if (history.length === 0 || history.length === 1) {
-                newProducts.add(hashieProduct.product_id);
-              } else if (history.length >= 2) {
-                const current = history[0];
-                const previous = history[1];
-                
-                if (current.ranking !== previous.ranking) {
-                  const diff = previous.ranking - current.ranking;
-                  changesMap[hashieProduct.product_id] = {
-                    old_ranking: previous.ranking,
-                    new_ranking: current.ranking,
-                    ranking_diff: diff,
-                    change_type: diff > 0 ? 'up' : 'down'
-                  };
-                }
-              }
-            } catch (err) {
-              // 조용히 실패
-            }
-          }));
-          
-          const hashieElapsed = ((Date.now() - hashieStartTime) / 1000).toFixed(2);
-          console.log(`✅ 하시에 제품 조회 완료: ${hashieElapsed}초 (폴백 모드)`);
-        }
-      }
-      
-      // 업데이트된 변동 데이터 재설정
-      setRankingChanges({ ...changesMap, _newProducts: newProducts });
+      // 하시에 제품 찾기 (카테고리 필터 적용, 순위 변동은 위에서 함께 계산)
+      const allHashieProducts = categoryProducts.filter(p => p.brand_name === '하시에');
       
       setHashieProducts(allHashieProducts);
       
@@ -667,7 +550,7 @@ function App() {
                 setCrawlMessage('✅ 크롤링 + 배포가 시작되었습니다!\n\n📡 크롤링 중 → 💾 GitHub Push → 🚀 Fly.io 재배포\n\n약 5-6분 후 데이터가 업데이트됩니다.');
                 
                 setTimeout(() => {
-                  fetchData();
+                  fetchData(true);
                   setCrawlMessage('');
                   setIsCrawling(false);
                 }, 6 * 60 * 1000);
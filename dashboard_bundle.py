@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+대시보드 번들 (GET /api/dashboard)
+
+대시보드 첫 화면에 필요한 데이터를 한 번에 담은 JSON을 크롤링 저장이 끝날 때 한 번 만들어
+gzip 으로 압축한 파일(<DB>.dashboard.json.gz)로 둡니다. API 는 이 바이트를 그대로 응답합니다.
+- health: /api/health 와 같은 내용
+- categories: /api/categories/update-times 의 categories
+- products: 카테고리별 현재 순위 TOP (DASHBOARD_TOP_LIMIT), 상품마다 최근 48시간 순위(sparkline, 오래된 순)
+- version: 만들 때의 데이터 버전 (database.write_data_version) → API 가 현재 버전과 다르면 다시 만듦
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from database import (CURRENT_PRODUCTS_SQL, CATEGORY_UPDATE_TIMES_SQL, fetch_product_history,
+                      latest_snapshot_summary, read_data_version)
+
+DASHBOARD_BUNDLE_PATH = os.environ.get('DASHBOARD_BUNDLE_PATH')  # 기본: DB 파일 옆 <DB>.dashboard.json.gz
+DASHBOARD_TOP_LIMIT = int(os.environ.get('DASHBOARD_TOP_LIMIT', '200'))  # 카테고리별 (크롤링 수집 개수)
+DASHBOARD_HISTORY_HOURS = 48
+API_VERSION = "2.0.0"
+
+
+def bundle_path(db_path: str) -> str:
+    """대시보드 번들 파일 경로"""
+    return DASHBOARD_BUNDLE_PATH or f"{db_path}.dashboard.json.gz"
+
+
+def iso_utc(value: Optional[str]) -> Optional[str]:
+    """DB의 UTC 시각 문자열 → API 응답과 같은 ISO 8601 (Z)"""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.isoformat().replace('+00:00', 'Z')
+
+
+def build_dashboard_bundle(conn, version: Optional[str]) -> Dict:
+    """번들 내용 조회 (읽기 연결 하나로, 같은 시점 데이터)"""
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COUNT(DISTINCT product_id) FROM products")
+    total_products = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COUNT(DISTINCT brand_name) FROM products")
+    total_brands = cursor.fetchone()[0] or 0
+    latest_collection, total_collections = latest_snapshot_summary(cursor)
+
+    cursor.execute(CATEGORY_UPDATE_TIMES_SQL)
+    categories = {
+        row['category_key']: {
+            'category_key': row['category_key'],
+            'category_name': row['category'],
+            'latest_collection': iso_utc(row['latest_collection']),
+            'product_count': row['product_count'],
+        }
+        for row in cursor.fetchall()
+    }
+
+    # 카테고리별 TOP: 순위 순으로 읽고 카테고리마다 DASHBOARD_TOP_LIMIT 개까지
+    cursor.execute(CURRENT_PRODUCTS_SQL + " ORDER BY s.category_key, s.ranking ASC")
+    products = {}
+    for row in cursor.fetchall():
+        items = products.setdefault(row['category_key'], [])
+        if len(items) < DASHBOARD_TOP_LIMIT:
+            item = dict(row)
+            item['collected_at'] = iso_utc(item['collected_at'])
+            items.append(item)
+
+    since = (datetime.now(timezone.utc) - timedelta(hours=DASHBOARD_HISTORY_HOURS)).strftime('%Y-%m-%d %H:%M:%S')
+    history = fetch_product_history(
+        cursor, [item['product_id'] for items in products.values() for item in items], since)
+    for items in products.values():
+        for item in items:
+            item['sparkline'] = [observation['ranking'] for observation in history[item['product_id']]]
+
+    return {
+        'version': version,
+        'generated_at': iso_utc(datetime.now(timezone.utc).isoformat()),
+        'history_hours': DASHBOARD_HISTORY_HOURS,
+        'health': {
+            'status': 'healthy',
+            'database_connected': True,
+            'total_products': total_products,
+            'total_brands': total_brands,
+            'latest_collection': iso_utc(latest_collection),
+            'total_collections': total_collections,
+            'api_version': API_VERSION,
+        },
+        'categories': categories,
+        'products': products,
+    }
+
+
+def encode_dashboard_bundle(bundle: Dict) -> bytes:
+    """응답 본문 그대로 쓸 압축 JSON (한 번 만들고 여러 번 보내므로 최고 압축)"""
+    body = json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def save_dashboard_bundle(db_path: str, data: bytes):
+    """번들 파일 기록 (임시 파일 → rename, 읽는 쪽은 항상 완전한 파일을 봄)"""
+    path = bundle_path(db_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def read_dashboard_bundle(db_path: str) -> Optional[bytes]:
+    """번들 파일 (압축된 바이트, 없으면 None)"""
+    try:
+        with open(bundle_path(db_path), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def refresh_dashboard_bundle(db) -> int:
+    """크롤링 저장이 모두 끝난 뒤 호출: 현재 데이터 버전으로 번들을 만들어 기록 (압축 크기 반환)"""
+    marker = read_data_version(db.db_path)
+    with db.read_connection() as conn:
+        data = encode_dashboard_bundle(build_dashboard_bundle(conn, marker['version'] if marker else None))
+    save_dashboard_bundle(db.db_path, data)
+    return len(data)
@@ -4,206 +4,708 @@
 SQLite 기반 시계열 데이터 저장
 """
 
-import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Tuple
 from contextlib import contextmanager
 import json
 import os
+import sqlite3
+import time
+
+from packed_history import decode_day, empty_day, encode_day, iter_observations, merge_days, set_observation
+from sqlite_pool import get_manager
+
+def utc_now() -> datetime:
+    """현재 UTC 시각 (tzinfo 없음: 저장 형식 'YYYY-MM-DD HH:MM:SS.ffffff' 유지, SQLite datetime('now')와 비교 가능)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+# 카테고리별 마지막 정상 스냅샷 id (snapshots 인덱스만 사용)
+LATEST_SNAPSHOT_IDS_SQL = """
+    SELECT MAX(id) FROM snapshots
+    WHERE status = 'complete'
+    GROUP BY category_key
+"""
+
+# 현재 순위 (카테고리별 마지막 스냅샷, product_latest_state: 이력 전체를 GROUP BY 하지 않음)
+# 필터는 뒤에 " AND ..." 로 붙임 (api /api/products/current, dashboard_bundle.py 공통)
+CURRENT_PRODUCTS_SQL = """
+    SELECT 
+        p.product_id,
+        p.brand_name,
+        p.product_name,
+        p.category,
+        s.category_key,
+        p.product_url,
+        s.sale_price as price,
+        s.discount_rate,
+        p.image_url,
+        s.ranking,
+        s.last_collected_at as collected_at
+    FROM product_latest_state s
+    JOIN products p ON p.product_id = s.product_id
+    WHERE s.last_snapshot_id IN (""" + LATEST_SNAPSHOT_IDS_SQL + """)
+"""
+
+# 카테고리별 최신 수집 시간 (스냅샷 + 최신 상태 테이블, 이력 스캔 없음)
+CATEGORY_UPDATE_TIMES_SQL = """
+    SELECT 
+        snap.category_key,
+        (SELECT p.category FROM product_latest_state s
+         JOIN products p ON p.product_id = s.product_id
+         WHERE s.last_snapshot_id = snap.id LIMIT 1) as category,
+        snap.collected_at as latest_collection,
+        (SELECT COUNT(*) FROM product_latest_state s
+         WHERE s.category_key = snap.category_key) as product_count
+    FROM snapshots snap
+    WHERE snap.id IN (""" + LATEST_SNAPSHOT_IDS_SQL + """)
+    ORDER BY snap.category_key
+"""
+
+def latest_snapshot_summary(cursor):
+    """(가장 최근 정상 스냅샷 수집 시각, 정상 스냅샷 수)"""
+    cursor.execute("""
+        SELECT collected_at FROM snapshots
+        WHERE status = 'complete'
+        ORDER BY id DESC
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    cursor.execute("SELECT COUNT(*) FROM snapshots WHERE status = 'complete'")
+    return (row[0] if row else None), cursor.fetchone()[0]
+
+# 원본 이력(시간 단위)을 그대로 보관하는 기간, 이보다 오래된 이력은 apply_retention 이 일 1행으로 줄임 (0: 줄이지 않음)
+HISTORY_RAW_RETENTION_DAYS = int(os.environ.get('HISTORY_RAW_RETENTION_DAYS', '30'))
+
+# 이력 저장 형식: rows (ranking_history 행) | packed (product_history_packed, 상품·날짜별 배열 BLOB)
+# 읽기(fetch_product_history)는 두 형식을 모두 읽으므로 중간에 바꿔도 됩니다.
+HISTORY_STORAGE = os.environ.get('HISTORY_STORAGE', 'rows')
+
+# 데이터 버전 파일: 데이터를 바꾼 쓰기가 커밋될 때마다 갱신 (API 가 DB 조회 없이 ETag / 응답 캐시 키로 사용)
+DATA_VERSION_PATH = os.environ.get('DATA_VERSION_PATH')  # 기본: DB 파일 옆 <DB>.version
+
+def data_version_path(db_path: str) -> str:
+    """데이터 버전 파일 경로"""
+    return DATA_VERSION_PATH or f"{db_path}.version"
+
+def write_data_version(conn, db_path: str) -> Dict:
+    """마지막 스냅샷 ID + 기록 시각을 버전 파일에 기록 (임시 파일 → rename, 읽는 쪽은 항상 완전한 파일을 봄)"""
+    try:
+        snapshot_id = conn.execute("SELECT MAX(id) FROM snapshots").fetchone()[0] or 0
+    except sqlite3.OperationalError:  # 마이그레이션 중 (스냅샷 테이블 전)
+        snapshot_id = 0
+    marker = {
+        'version': f"{snapshot_id}.{time.time_ns():x}",
+        'snapshot_id': snapshot_id,
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+    }
+    path = data_version_path(db_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(marker, f)
+    os.replace(tmp_path, path)
+    return marker
+
+def read_data_version(db_path: str) -> Optional[Dict]:
+    """데이터 버전 파일 내용 (없거나 읽을 수 없으면 None)"""
+    try:
+        with open(data_version_path(db_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+PRODUCT_DAILY_ROLLUP_INSERT_SQL = """
+    INSERT INTO product_daily_rollup (
+        product_id, day, first_ranking, last_ranking, min_ranking, max_ranking,
+        min_price, max_price, last_price, last_discount_rate,
+        hours_present, first_collected_at, last_collected_at
+    )
+"""
+
+# 같은 (상품, 날짜) 행 합치기: 크롤링 1회분 증분과 상품 ID 병합에 공통 사용
+# hours_present: 마지막 수집과 같은 시(hour)면 중복으로 보고 1시간을 빼서 더함 (최대 24)
+PRODUCT_DAILY_ROLLUP_UPSERT_SQL = """
+    ON CONFLICT(product_id, day) DO UPDATE SET
+        first_ranking = CASE WHEN excluded.first_collected_at < first_collected_at
+                             THEN excluded.first_ranking ELSE first_ranking END,
+        last_ranking = CASE WHEN excluded.last_collected_at >= last_collected_at
+                            THEN excluded.last_ranking ELSE last_ranking END,
+        last_price = CASE WHEN excluded.last_collected_at >= last_collected_at
+                          THEN excluded.last_price ELSE last_price END,
+        last_discount_rate = CASE WHEN excluded.last_collected_at >= last_collected_at
+                                  THEN excluded.last_discount_rate ELSE last_discount_rate END,
+        min_ranking = MIN(min_ranking, excluded.min_ranking),
+        max_ranking = MAX(max_ranking, excluded.max_ranking),
+        min_price = COALESCE(MIN(min_price, excluded.min_price), min_price, excluded.min_price),
+        max_price = COALESCE(MAX(max_price, excluded.max_price), max_price, excluded.max_price),
+        hours_present = MIN(24, hours_present + excluded.hours_present
+            - (strftime('%H', excluded.last_collected_at) = strftime('%H', last_collected_at))),
+        first_collected_at = MIN(first_collected_at, excluded.first_collected_at),
+        last_collected_at = MAX(last_collected_at, excluded.last_collected_at)
+"""
+
+def fetch_product_history(cursor, product_ids: List[str], since: str) -> Dict[str, List[Dict]]:
+    """상품별 이력 (ranking_history 행 + product_history_packed 배열, collected_at 오름차순)
+
+    since: 'YYYY-MM-DD HH:MM:SS' (UTC) 이후 관측만
+    """
+    history = {product_id: [] for product_id in product_ids}
+    if not product_ids:
+        return history
+    
+    placeholders = ','.join('?' for _ in product_ids)
+    cursor.execute(f"""
+        SELECT product_id, ranking, original_price, sale_price, discount_rate, collected_at
+        FROM ranking_history
+        WHERE product_id IN ({placeholders})
+        AND collected_at >= ?
+        ORDER BY product_id, collected_at ASC
+    """, list(product_ids) + [since])
+    for row in cursor.fetchall():
+        item = dict(row)
+        history[item.pop('product_id')].append(item)
+    
+    cursor.execute(f"""
+        SELECT product_id, day, data
+        FROM product_history_packed
+        WHERE product_id IN ({placeholders})
+        AND day >= ?
+        ORDER BY product_id, day
+    """, list(product_ids) + [since[:10]])
+    packed_rows = cursor.fetchall()
+    for row in packed_rows:
+        history[row['product_id']].extend(
+            item for item in iter_observations(row['day'], decode_day(row['data']))
+            if item['collected_at'] >= since
+        )
+    
+    if packed_rows:
+        for items in history.values():
+            items.sort(key=lambda item: str(item['collected_at']))
+    return history
+
+# 스키마 마이그레이션 (버전, 설명, Database 메서드) - 순서대로 한 번씩, 새 단계는 끝에 추가
+SCHEMA_MIGRATIONS = (
+    (1, "기본 테이블", '_migrate_base_tables'),
+    (2, "최신 상태 테이블", '_migrate_latest_state'),
+    (3, "크롤링 스냅샷", '_migrate_snapshots'),
+    (4, "브랜드 × 카테고리 통계", '_migrate_brand_category_stats'),
+    (5, "일별 롤업", '_migrate_daily_rollups'),
+    (6, "압축 이력", '_migrate_packed_history'),
+    (7, "조회 인덱스", '_migrate_query_indexes'),
+)
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
 
 class Database:
     """데이터베이스 관리 클래스"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, history_storage: str = None):
         # 환경변수에서 DB 경로를 가져오거나 기본값 사용
         if db_path is None:
             db_path = os.environ.get('DB_PATH', 'wconcept_tracking.db')
         self.db_path = db_path
+        self.history_storage = history_storage or HISTORY_STORAGE
+        self.connections = get_manager(db_path)
+        if self.connections.on_commit is None:
+            self.connections.on_commit = lambda conn: write_data_version(conn, db_path)
         self.init_database()
     
     @contextmanager
     def get_connection(self):
-        """데이터베이스 연결 컨텍스트 매니저"""
-        # timeout 30초로 설정 (DB Lock 대기)
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        conn.row_factory = sqlite3.Row  # 딕셔너리 형태로 결과 반환
-        try:
-            # WAL mode 활성화 (동시 읽기 허용)
-            conn.execute("PRAGMA journal_mode=WAL")
+        """쓰기 연결 컨텍스트 매니저 (공용 쓰기 연결, 블록이 끝나면 커밋 / 예외 시 롤백)"""
+        with self.connections.writer() as conn:
+            yield conn
+    
+    @contextmanager
+    def read_connection(self):
+        """읽기 전용 연결 컨텍스트 매니저 (읽기 연결 풀)"""
+        with self.connections.reader() as conn:
             yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+    
+    def write_data_version(self) -> Dict:
+        """데이터 버전 파일 새로 기록 (파일이 없을 때 API 시작 시)"""
+        with self.read_connection() as conn:
+            return write_data_version(conn, self.db_path)
+    
+    def close(self):
+        """이 DB 파일의 공용 연결 닫기"""
+        self.connections.close()
     
     def init_database(self):
-        """데이터베이스 초기화 및 테이블 생성"""
+        """스키마 준비 (PRAGMA user_version 확인 후 밀린 마이그레이션만 실행)
+
+        스키마가 최신이면 버전 조회 한 번으로 끝나고, 같은 프로세스에서 이미 확인한 DB 파일은 조회도 하지 않습니다.
+        """
+        if self.connections.schema_version >= SCHEMA_VERSION:
+            return
+        
+        with self.get_connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < SCHEMA_VERSION:
+            version = self.migrate()
+        self.connections.schema_version = version
+    
+    def schema_version(self) -> int:
+        """DB 파일의 스키마 버전 (PRAGMA user_version)"""
+        with self.get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self, target: int = SCHEMA_VERSION) -> int:
+        """밀린 마이그레이션을 버전 순서대로 실행, 최종 버전 반환
+
+        단계마다 BEGIN IMMEDIATE 트랜잭션 하나로 실행하고 user_version 을 올립니다.
+        (다른 프로세스가 동시에 실행해도 쓰기 잠금을 얻은 뒤 버전을 다시 확인하므로 한 번만 적용,
+        단계가 짧게 끝나므로 API 읽기는 WAL 덕분에 계속 처리됨)
+        모든 단계는 IF NOT EXISTS / 컬럼 존재 확인 / 비어 있을 때만 채우기 방식이라 user_version 이 없던
+        기존 DB(버전 0)에 처음부터 실행해도 안전합니다.
+        """
+        
+        version = 0
+        for step_version, description, method_name in SCHEMA_MIGRATIONS:
+            if step_version > target:
+                break
+            with self.get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version >= step_version:
+                    continue
+                started = datetime.now()
+                getattr(self, method_name)(conn.cursor())
+                conn.execute(f"PRAGMA user_version = {step_version}")
+                version = step_version
+            elapsed = (datetime.now() - started).total_seconds()
+            print(f"✅ 스키마 v{step_version}: {description} ({elapsed:.1f}초)")
+        return version
+    
+    def _migrate_base_tables(self, cursor):
+        """v1: 기본 테이블 (제품, 이력, 브랜드, 변동 로그, 작업 로그) + 인덱스"""
+        
+        # 1. 제품 기본 정보 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id VARCHAR(100) UNIQUE NOT NULL,
+                product_name TEXT,
+                brand_name VARCHAR(200),
+                category VARCHAR(50),
+                category_key VARCHAR(50),
+                image_url TEXT,
+                product_url TEXT,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # 2. 순위 및 가격 이력 테이블 (시계열 데이터)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ranking_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id VARCHAR(100) NOT NULL,
+                ranking INTEGER NOT NULL,
+                original_price INTEGER,
+                sale_price INTEGER,
+                discount_rate DECIMAL(5,2),
+                collected_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (product_id) REFERENCES products(product_id)
+            )
+        """)
+        
+        # 3. 브랜드 정보 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS brands (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                brand_name VARCHAR(200) UNIQUE NOT NULL,
+                total_products INTEGER DEFAULT 0,
+                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # 4. 브랜드 통계 이력 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS brand_stats_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                brand_name VARCHAR(200) NOT NULL,
+                product_count INTEGER NOT NULL,
+                avg_ranking DECIMAL(10,2),
+                avg_price DECIMAL(10,2),
+                min_price INTEGER,
+                max_price INTEGER,
+                avg_discount_rate DECIMAL(5,2),
+                collected_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (brand_name) REFERENCES brands(brand_name)
+            )
+        """)
+        
+        # 5. 순위 변동 로그 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ranking_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id VARCHAR(100) NOT NULL,
+                previous_ranking INTEGER,
+                current_ranking INTEGER,
+                change_amount INTEGER,
+                change_type VARCHAR(20),
+                changed_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (product_id) REFERENCES products(product_id)
+            )
+        """)
+        
+        # 6. 가격 변동 로그 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS price_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id VARCHAR(100) NOT NULL,
+                previous_sale_price INTEGER,
+                current_sale_price INTEGER,
+                price_change_amount INTEGER,
+                price_change_percentage DECIMAL(5,2),
+                previous_discount_rate DECIMAL(5,2),
+                current_discount_rate DECIMAL(5,2),
+                changed_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (product_id) REFERENCES products(product_id)
+            )
+        """)
+        
+        # 7. 크롤링 작업 로그 테이블
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scraping_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TIMESTAMP NOT NULL,
+                completed_at TIMESTAMP,
+                status VARCHAR(50) NOT NULL,
+                products_collected INTEGER DEFAULT 0,
+                error_message TEXT,
+                execution_time_seconds INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # 인덱스 생성 (성능 최적화)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ranking_history_collected_at 
+            ON ranking_history(collected_at)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ranking_history_product_time 
+            ON ranking_history(product_id, collected_at)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ranking_history_ranking 
+            ON ranking_history(ranking)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_brand_stats_collected_at 
+            ON brand_stats_history(collected_at)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ranking_changes_changed_at 
+            ON ranking_changes(changed_at)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_price_changes_changed_at 
+            ON price_changes(changed_at)
+        """)
+    
+    def _migrate_latest_state(self, cursor):
+        """v2: 상품 × 카테고리별 최신 상태 테이블"""
+        
+        # 8. 상품 × 카테고리별 최신 상태 (저장 시 같은 트랜잭션에서 갱신)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS product_latest_state (
+                product_id VARCHAR(100) NOT NULL,
+                category_key VARCHAR(50) NOT NULL,
+                ranking INTEGER,
+                original_price INTEGER,
+                sale_price INTEGER,
+                discount_rate DECIMAL(5,2),
+                last_collected_at TIMESTAMP NOT NULL,
+                first_collected_at TIMESTAMP NOT NULL,
+                seen_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (product_id, category_key)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_latest_state_category_time 
+            ON product_latest_state(category_key, last_collected_at)
+        """)
+    
+    def _migrate_snapshots(self, cursor):
+        """v3: 크롤링 스냅샷, 이력 snapshot_id (기존 이력은 스냅샷 생성 후 연결, 최신 상태 재생성)"""
+        
+        # 9. 크롤링 스냅샷 (카테고리 크롤링 1회 = 1행, 이력은 snapshot_id로 참조)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                category_key VARCHAR(50) NOT NULL,
+                collected_epoch INTEGER NOT NULL,
+                collected_at TIMESTAMP NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                product_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_snapshots_status_category 
+            ON snapshots(status, category_key, id)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_snapshots_epoch 
+            ON snapshots(collected_epoch)
+        """)
+        
+        self._add_column_if_missing(cursor, 'ranking_history', 'snapshot_id', 'INTEGER REFERENCES snapshots(id)')
+        self._add_column_if_missing(cursor, 'product_latest_state', 'last_snapshot_id', 'INTEGER')
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ranking_history_snapshot 
+            ON ranking_history(snapshot_id, ranking)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_latest_state_snapshot 
+            ON product_latest_state(last_snapshot_id, ranking)
+        """)
+        
+        # 기존 DB: 스냅샷 없는 이력은 (수집 시각, 카테고리) 단위로 스냅샷 생성
+        cursor.execute("SELECT 1 FROM ranking_history WHERE snapshot_id IS NULL LIMIT 1")
+        if cursor.fetchone() is not None:
+            count = self._backfill_snapshots(cursor)
+            print(f"✅ 기존 이력 스냅샷 생성 ({count}개)")
+        
+        # 기존 DB: 최신 상태 테이블이 비어 있거나 스냅샷 정보가 없으면 이력에서 생성
+        cursor.execute("SELECT 1 FROM product_latest_state WHERE last_snapshot_id IS NULL LIMIT 1")
+        needs_rebuild = cursor.fetchone() is not None
+        cursor.execute("SELECT 1 FROM product_latest_state LIMIT 1")
+        if needs_rebuild or cursor.fetchone() is None:
+            cursor.execute("SELECT 1 FROM ranking_history LIMIT 1")
+            if cursor.fetchone() is not None:
+                count = self._rebuild_latest_state(cursor)
+                print(f"✅ product_latest_state 생성 ({count}개 상품)")
+    
+    def _migrate_brand_category_stats(self, cursor):
+        """v4: 브랜드 × 카테고리 통계 (기존 이력에서 생성)"""
+        
+        # 10. 브랜드 × 카테고리 통계 (스냅샷별, 저장 배치에서 계산)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS brand_category_stats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                snapshot_id INTEGER NOT NULL,
+                brand_name VARCHAR(200) NOT NULL,
+                category_key VARCHAR(50) NOT NULL,
+                product_count INTEGER NOT NULL,
+                min_ranking INTEGER,
+                avg_ranking DECIMAL(10,2),
+                max_ranking INTEGER,
+                min_price INTEGER,
+                avg_price DECIMAL(10,2),
+                max_price INTEGER,
+                avg_discount_rate DECIMAL(5,2),
+                rank_share DECIMAL(8,6),
+                collected_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (snapshot_id) REFERENCES snapshots(id)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_brand_category_stats_snapshot 
+            ON brand_category_stats(snapshot_id)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_brand_category_stats_brand_time 
+            ON brand_category_stats(brand_name, collected_at)
+        """)
+        
+        # 기존 DB: 브랜드 × 카테고리 통계가 비어 있으면 이력에서 생성
+        cursor.execute("SELECT 1 FROM brand_category_stats LIMIT 1")
+        if cursor.fetchone() is None:
+            cursor.execute("SELECT 1 FROM ranking_history LIMIT 1")
+            if cursor.fetchone() is not None:
+                count = self._backfill_brand_category_stats(cursor)
+                print(f"✅ brand_category_stats 생성 ({count}행)")
+    
+    def _migrate_daily_rollups(self, cursor):
+        """v5: 상품 / 브랜드 일별 롤업 (기존 이력에서 생성)"""
+        
+        # 11. 상품 일별 롤업 (UTC 날짜 기준, 저장할 때마다 증분 갱신)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS product_daily_rollup (
+                product_id VARCHAR(50) NOT NULL,
+                day DATE NOT NULL,
+                first_ranking INTEGER,
+                last_ranking INTEGER,
+                min_ranking INTEGER,
+                max_ranking INTEGER,
+                min_price INTEGER,
+                max_price INTEGER,
+                last_price INTEGER,
+                last_discount_rate INTEGER,
+                hours_present INTEGER NOT NULL DEFAULT 1,
+                first_collected_at TIMESTAMP NOT NULL,
+                last_collected_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (product_id, day)
+            )
+        """)
+        
+        # 12. 브랜드 × 카테고리 일별 롤업 (평균은 합계/개수로 보관 → 조회 시 계산)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS brand_daily_rollup (
+                brand_name VARCHAR(200) NOT NULL,
+                category_key VARCHAR(50) NOT NULL,
+                day DATE NOT NULL,
+                snapshot_count INTEGER NOT NULL DEFAULT 0,
+                product_count_sum INTEGER NOT NULL DEFAULT 0,
+                ranking_sum DECIMAL(12,2),
+                price_sum DECIMAL(16,2),
+                price_count INTEGER NOT NULL DEFAULT 0,
+                discount_sum DECIMAL(10,2),
+                discount_count INTEGER NOT NULL DEFAULT 0,
+                min_ranking INTEGER,
+                max_ranking INTEGER,
+                min_price INTEGER,
+                max_price INTEGER,
+                rank_share_sum DECIMAL(12,6),
+                last_collected_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (brand_name, category_key, day)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_brand_daily_rollup_day
+            ON brand_daily_rollup(day)
+        """)
+        
+        # 기존 DB: 일별 롤업이 비어 있으면 이력에서 생성
+        cursor.execute("SELECT 1 FROM product_daily_rollup LIMIT 1")
+        if cursor.fetchone() is None:
+            cursor.execute("SELECT 1 FROM ranking_history LIMIT 1")
+            if cursor.fetchone() is not None:
+                counts = self._rebuild_daily_rollups(cursor)
+                print(f"✅ 일별 롤업 생성 (상품 {counts['product_daily_rollup']}행, "
+                      f"브랜드 {counts['brand_daily_rollup']}행)")
+    
+    def _migrate_packed_history(self, cursor):
+        """v6: 압축 이력 테이블 (HISTORY_STORAGE=packed)"""
+        
+        # 13. 압축 이력 (HISTORY_STORAGE=packed, 형식은 packed_history.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS product_history_packed (
+                product_id VARCHAR(100) NOT NULL,
+                day DATE NOT NULL,
+                category_key VARCHAR(50) NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (product_id, day, category_key)
+            ) WITHOUT ROWID
+        """)
+    
+    def _migrate_query_indexes(self, cursor):
+        """v7: API/조회 쿼리용 인덱스 (check_query_plans.py 에서 전체 스캔으로 잡힌 쿼리)"""
+        
+        # get_brand_statistics: 최근 N시간 (브랜드 조건 없음)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_brand_category_stats_collected_at 
+            ON brand_category_stats(collected_at)
+        """)
+        
+        # /api/ranking-changes?change_type=, get_ranking_movers: 변동 유형 + 기간
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ranking_changes_type_time 
+            ON ranking_changes(change_type, changed_at)
+        """)
+        
+        # /api/jobs/history: 최근 작업 순
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_scraping_logs_started_at 
+            ON scraping_logs(started_at)
+        """)
+    
+    def _add_column_if_missing(self, cursor, table: str, column: str, declaration: str):
+        """기존 DB에 새 컬럼 추가 (이미 있으면 무시)"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    
+    def _backfill_snapshots(self, cursor) -> int:
+        """snapshot_id가 없는 이력 → (collected_at, products.category_key) 별 스냅샷 생성 후 연결"""
+        
+        cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS snapshot_backfill AS
+            SELECT rh.id AS history_id, rh.collected_at, COALESCE(p.category_key, 'unknown') AS category_key
+            FROM ranking_history rh
+            LEFT JOIN products p ON p.product_id = rh.product_id
+            WHERE rh.snapshot_id IS NULL
+        """)
+        cursor.execute("""
+            INSERT INTO snapshots (category_key, collected_epoch, collected_at, status, product_count)
+            SELECT category_key,
+                   COALESCE(CAST(strftime('%s', collected_at) AS INTEGER), 0),
+                   collected_at, 'complete', COUNT(*)
+            FROM snapshot_backfill
+            GROUP BY collected_at, category_key
+            ORDER BY collected_at, category_key
+        """)
+        count = cursor.rowcount
+        cursor.execute("""
+            CREATE TEMP TABLE snapshot_backfill_ids AS
+            SELECT b.history_id, s.id AS snapshot_id
+            FROM snapshot_backfill b
+            JOIN snapshots s ON s.collected_at = b.collected_at AND s.category_key = b.category_key
+        """)
+        cursor.execute("CREATE INDEX temp.idx_snapshot_backfill_ids ON snapshot_backfill_ids(history_id)")
+        cursor.execute("""
+            UPDATE ranking_history
+            SET snapshot_id = (SELECT snapshot_id FROM snapshot_backfill_ids WHERE history_id = ranking_history.id)
+            WHERE snapshot_id IS NULL
+        """)
+        cursor.execute("DROP TABLE temp.snapshot_backfill")
+        cursor.execute("DROP TABLE temp.snapshot_backfill_ids")
+        return count
+    
+    def record_snapshot(self, category_key: str, status: str, product_count: int = 0,
+                        collected_at: datetime = None) -> int:
+        """이력 없이 스냅샷만 기록 (예: 크롤링 실패한 카테고리 → status='failed')
+
+        collected_at: 기록 시각 (UTC, tzinfo 없음), 기본은 지금 (합성 이력 생성처럼 과거 시각으로 기록할 때 지정)
+        """
         
         with self.get_connection() as conn:
+            collected_at = collected_at or utc_now()
             cursor = conn.cursor()
-            
-            # 1. 제품 기본 정보 테이블
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS products (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id VARCHAR(100) UNIQUE NOT NULL,
-                    product_name TEXT,
-                    brand_name VARCHAR(200),
-                    category VARCHAR(50),
-                    category_key VARCHAR(50),
-                    image_url TEXT,
-                    product_url TEXT,
-                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # 2. 순위 및 가격 이력 테이블 (시계열 데이터)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS ranking_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id VARCHAR(100) NOT NULL,
-                    ranking INTEGER NOT NULL,
-                    original_price INTEGER,
-                    sale_price INTEGER,
-                    discount_rate DECIMAL(5,2),
-                    collected_at TIMESTAMP NOT NULL,
-                    FOREIGN KEY (product_id) REFERENCES products(product_id)
-                )
-            """)
-            
-            # 3. 브랜드 정보 테이블
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS brands (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    brand_name VARCHAR(200) UNIQUE NOT NULL,
-                    total_products INTEGER DEFAULT 0,
-                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # 4. 브랜드 통계 이력 테이블
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS brand_stats_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    brand_name VARCHAR(200) NOT NULL,
-                    product_count INTEGER NOT NULL,
-                    avg_ranking DECIMAL(10,2),
-                    avg_price DECIMAL(10,2),
-                    min_price INTEGER,
-                    max_price INTEGER,
-                    avg_discount_rate DECIMAL(5,2),
-                    collected_at TIMESTAMP NOT NULL,
-                    FOREIGN KEY (brand_name) REFERENCES brands(brand_name)
-                )
-            """)
-            
-            # 5. 순위 변동 로그 테이블
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS ranking_changes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id VARCHAR(100) NOT NULL,
-                    previous_ranking INTEGER,
-                    current_ranking INTEGER,
-                    change_amount INTEGER,
-                    change_type VARCHAR(20),
-                    changed_at TIMESTAMP NOT NULL,
-                    FOREIGN KEY (product_id) REFERENCES products(product_id)
-                )
-            """)
-            
-            # 6. 가격 변동 로그 테이블
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS price_changes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_id VARCHAR(100) NOT NULL,
-                    previous_sale_price INTEGER,
-                    current_sale_price INTEGER,
-                    price_change_amount INTEGER,
-                    price_change_percentage DECIMAL(5,2),
-                    previous_discount_rate DECIMAL(5,2),
-                    current_discount_rate DECIMAL(5,2),
-                    changed_at TIMESTAMP NOT NULL,
-                    FOREIGN KEY (product_id) REFERENCES products(product_id)
-                )
-            """)
-            
-            # 7. 크롤링 작업 로그 테이블
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS scraping_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    started_at TIMESTAMP NOT NULL,
-                    completed_at TIMESTAMP,
-                    status VARCHAR(50) NOT NULL,
-                    products_collected INTEGER DEFAULT 0,
-                    error_message TEXT,
-                    execution_time_seconds INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # 인덱스 생성 (성능 최적화)
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_ranking_history_collected_at 
-                ON ranking_history(collected_at)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_ranking_history_product_time 
-                ON ranking_history(product_id, collected_at)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_ranking_history_ranking 
-                ON ranking_history(ranking)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_brand_stats_collected_at 
-                ON brand_stats_history(collected_at)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_ranking_changes_changed_at 
-                ON ranking_changes(changed_at)
-            """)
-            
-            cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_price_changes_changed_at 
-                ON price_changes(changed_at)
-            """)
-            
-            print("✅ 데이터베이스 초기화 완료")
+                INSERT INTO snapshots (category_key, collected_epoch, collected_at, status, product_count)
+                VALUES (?, ?, ?, ?, ?)
+            """, (category_key, int(collected_at.replace(tzinfo=timezone.utc).timestamp()),
+                  collected_at, status, product_count))
+            return cursor.lastrowid
     
-    def save_products(self, products: List[Dict]) -> int:
-        """크롤링한 상품 데이터 저장"""
+    def save_products(self, products: List[Dict], collected_at: datetime = None) -> int:
+        """크롤링한 상품 데이터 저장 (배치 단위 일괄 처리)
+
+        상품마다 쿼리를 실행하지 않고, 이전 상태를 한 번의 쿼리로 읽어
+        순위/가격 변동을 메모리에서 계산한 뒤 테이블별로 executemany 합니다.
+        collected_at: 수집 시각 (UTC, tzinfo 없음), 기본은 지금
+        """
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            saved_count = 0
-            collected_at = datetime.now()
+            collected_at = collected_at or utc_now()
             
+            # 1. 행 데이터 구성 (필수 필드가 없는 상품은 건너뜀)
+            product_rows = []
+            history_rows = []
+            valid_products = []
             for product in products:
                 try:
-                    # 1. 제품 기본 정보 저장/업데이트
-                    cursor.execute("""
-                        INSERT INTO products (product_id, product_name, brand_name, category, category_key, image_url, product_url, last_seen, updated_at)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(product_id) DO UPDATE SET
-                            product_name = excluded.product_name,
-                            brand_name = excluded.brand_name,
-                            category = excluded.category,
-                            category_key = excluded.category_key,
-                            image_url = excluded.image_url,
-                            product_url = excluded.product_url,
-                            last_seen = excluded.last_seen,
-                            updated_at = excluded.updated_at
-                    """, (
+                    product_rows.append((
                         product['product_id'],
                         product['product_name'],
                         product['brand_name'],
@@ -214,14 +716,7 @@ class Database:
                         collected_at,
                         collected_at
                     ))
-                    
-                    # 2. 순위 및 가격 이력 저장
-                    cursor.execute("""
-                        INSERT INTO ranking_history (
-                            product_id, ranking, original_price, sale_price, 
-                            discount_rate, collected_at
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
+                    history_rows.append((
                         product['product_id'],
                         product['rank'],
                         product['original_price'],
@@ -229,155 +724,558 @@ class Database:
                         product['discount_rate'],
                         collected_at
                     ))
-                    
-                    # 3. 브랜드 정보 저장/업데이트
-                    if product['brand_name'] and product['brand_name'] != 'N/A':
-                        cursor.execute("""
-                            INSERT INTO brands (brand_name, last_updated)
-                            VALUES (?, ?)
-                            ON CONFLICT(brand_name) DO UPDATE SET
-                                last_updated = excluded.last_updated
-                        """, (product['brand_name'], collected_at))
-                    
-                    # 4. 순위 변동 감지 및 저장
-                    self._detect_ranking_change(cursor, product, collected_at)
-                    
-                    # 5. 가격 변동 감지 및 저장
-                    self._detect_price_change(cursor, product, collected_at)
-                    
-                    saved_count += 1
-                    
+                    valid_products.append(product)
                 except Exception as e:
                     print(f"⚠️  상품 저장 실패 ({product.get('product_id', 'unknown')}): {str(e)}")
+            
+            if not valid_products:
+                print("✅ 0개 상품 데이터베이스에 저장 완료")
+                return 0
+            
+            # 2. 카테고리별 스냅샷 생성 → 이력 행에 snapshot_id 연결
+            category_counts = {}
+            for product in valid_products:
+                category_key = product.get('category_key', 'unknown')
+                category_counts[category_key] = category_counts.get(category_key, 0) + 1
+            
+            collected_epoch = int(collected_at.replace(tzinfo=timezone.utc).timestamp())
+            snapshot_ids = {}
+            for category_key, count in category_counts.items():
+                cursor.execute("""
+                    INSERT INTO snapshots (category_key, collected_epoch, collected_at, status, product_count)
+                    VALUES (?, ?, ?, 'complete', ?)
+                """, (category_key, collected_epoch, collected_at, count))
+                snapshot_ids[category_key] = cursor.lastrowid
+            
+            history_rows = [row + (snapshot_ids[product.get('category_key', 'unknown')],)
+                            for row, product in zip(history_rows, valid_products)]
+            
+            # 3. 이전 상태 (이번 이력을 넣기 전에 최신 상태 테이블에서 한 번에 조회)
+            previous = self._fetch_previous_state(
+                cursor, [product['product_id'] for product in valid_products])
+            
+            # 4. 제품 기본 정보 저장/업데이트
+            cursor.executemany("""
+                INSERT INTO products (product_id, product_name, brand_name, category, category_key, image_url, product_url, last_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(product_id) DO UPDATE SET
+                    product_name = excluded.product_name,
+                    brand_name = excluded.brand_name,
+                    category = excluded.category,
+                    category_key = excluded.category_key,
+                    image_url = excluded.image_url,
+                    product_url = excluded.product_url,
+                    last_seen = excluded.last_seen,
+                    updated_at = excluded.updated_at
+            """, product_rows)
+            
+            # 5. 순위 및 가격 이력 저장
+            if self.history_storage == 'packed':
+                self._save_packed_history(cursor, valid_products, collected_at)
+            else:
+                cursor.executemany("""
+                    INSERT INTO ranking_history (
+                        product_id, ranking, original_price, sale_price, 
+                        discount_rate, collected_at, snapshot_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, history_rows)
+            
+            # 6. 브랜드 정보 저장/업데이트
+            brands = sorted({product['brand_name'] for product in valid_products
+                             if product['brand_name'] and product['brand_name'] != 'N/A'})
+            cursor.executemany("""
+                INSERT INTO brands (brand_name, last_updated)
+                VALUES (?, ?)
+                ON CONFLICT(brand_name) DO UPDATE SET
+                    last_updated = excluded.last_updated
+            """, [(brand, collected_at) for brand in brands])
+            
+            # 7. 순위/가격 변동 계산 및 저장
+            ranking_changes = []
+            price_changes = []
+            for product in valid_products:
+                state = previous.get((product['product_id'], product.get('category_key', 'unknown')))
+                if state is None:
                     continue
+                ranking_change = self._ranking_change_row(product, state, collected_at)
+                if ranking_change:
+                    ranking_changes.append(ranking_change)
+                price_change = self._price_change_row(product, state, collected_at)
+                if price_change:
+                    price_changes.append(price_change)
+            
+            cursor.executemany("""
+                INSERT INTO ranking_changes (
+                    product_id, previous_ranking, current_ranking,
+                    change_amount, change_type, changed_at
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, ranking_changes)
+            
+            cursor.executemany("""
+                INSERT INTO price_changes (
+                    product_id, previous_sale_price, current_sale_price,
+                    price_change_amount, price_change_percentage,
+                    previous_discount_rate, current_discount_rate, changed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, price_changes)
+            
+            # 8. 최신 상태 갱신
+            cursor.executemany("""
+                INSERT INTO product_latest_state (
+                    product_id, category_key, ranking, original_price, sale_price,
+                    discount_rate, last_collected_at, first_collected_at, seen_count, last_snapshot_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT(product_id, category_key) DO UPDATE SET
+                    ranking = excluded.ranking,
+                    original_price = excluded.original_price,
+                    sale_price = excluded.sale_price,
+                    discount_rate = excluded.discount_rate,
+                    last_collected_at = excluded.last_collected_at,
+                    last_snapshot_id = excluded.last_snapshot_id,
+                    seen_count = seen_count + 1
+            """, [(
+                product['product_id'],
+                product.get('category_key', 'unknown'),
+                product['rank'],
+                product['original_price'],
+                product['sale_price'],
+                product['discount_rate'],
+                collected_at,
+                collected_at,
+                snapshot_ids[product.get('category_key', 'unknown')]
+            ) for product in valid_products])
             
-            # 6. 브랜드 통계 저장
-            self._save_brand_stats(cursor, collected_at)
+            # 9. 브랜드 × 카테고리 통계 저장 (방금 저장한 배치에서 계산, 이력 재조회 없음)
+            brand_aggregates = self._brand_category_aggregates(valid_products)
+            cursor.executemany("""
+                INSERT INTO brand_category_stats (
+                    snapshot_id, brand_name, category_key, product_count,
+                    min_ranking, avg_ranking, max_ranking,
+                    min_price, avg_price, max_price,
+                    avg_discount_rate, rank_share, collected_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self._brand_category_rows(brand_aggregates, snapshot_ids, collected_at))
             
+            # 10. 일별 롤업 증분 갱신 (상품 / 브랜드 × 카테고리)
+            day = collected_at.date().isoformat()
+            cursor.executemany(PRODUCT_DAILY_ROLLUP_INSERT_SQL + """
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+            """ + PRODUCT_DAILY_ROLLUP_UPSERT_SQL, [(
+                product['product_id'],
+                day,
+                product['rank'],
+                product['rank'],
+                product['rank'],
+                product['rank'],
+                product['sale_price'],
+                product['sale_price'],
+                product['sale_price'],
+                product['discount_rate'],
+                collected_at,
+                collected_at
+            ) for product in valid_products])
+            
+            cursor.executemany("""
+                INSERT INTO brand_daily_rollup (
+                    brand_name, category_key, day, snapshot_count,
+                    product_count_sum, ranking_sum, price_sum, price_count,
+                    discount_sum, discount_count,
+                    min_ranking, max_ranking, min_price, max_price,
+                    rank_share_sum, last_collected_at
+                ) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(brand_name, category_key, day) DO UPDATE SET
+                    snapshot_count = snapshot_count + 1,
+                    product_count_sum = product_count_sum + excluded.product_count_sum,
+                    ranking_sum = COALESCE(ranking_sum, 0) + COALESCE(excluded.ranking_sum, 0),
+                    price_sum = COALESCE(price_sum + excluded.price_sum, price_sum, excluded.price_sum),
+                    price_count = price_count + excluded.price_count,
+                    discount_sum = COALESCE(discount_sum + excluded.discount_sum, discount_sum, excluded.discount_sum),
+                    discount_count = discount_count + excluded.discount_count,
+                    min_ranking = MIN(min_ranking, excluded.min_ranking),
+                    max_ranking = MAX(max_ranking, excluded.max_ranking),
+                    min_price = COALESCE(MIN(min_price, excluded.min_price), min_price, excluded.min_price),
+                    max_price = COALESCE(MAX(max_price, excluded.max_price), max_price, excluded.max_price),
+                    rank_share_sum = COALESCE(rank_share_sum + excluded.rank_share_sum, rank_share_sum, excluded.rank_share_sum),
+                    last_collected_at = MAX(last_collected_at, excluded.last_collected_at)
+            """, self._brand_daily_rows(brand_aggregates, collected_at))
+            
+            saved_count = len(valid_products)
             print(f"✅ {saved_count}개 상품 데이터베이스에 저장 완료")
             return saved_count
     
-    def _detect_ranking_change(self, cursor, product: Dict, current_time: datetime):
-        """순위 변동 감지"""
+    def _save_packed_history(self, cursor, products: List[Dict], collected_at: datetime):
+        """이력을 product_history_packed 에 기록 (오늘 행을 한 번에 읽어 해당 시간 위치만 바꿔 씀)"""
         
-        # 이전 순위 조회 (가장 최근 데이터)
+        day = collected_at.date().isoformat()
         cursor.execute("""
-            SELECT ranking FROM ranking_history
-            WHERE product_id = ?
-            AND collected_at < ?
-            ORDER BY collected_at DESC
-            LIMIT 1
-        """, (product['product_id'], current_time))
+            SELECT product_id, category_key, data
+            FROM product_history_packed
+            WHERE day = ?
+            AND product_id IN (SELECT value FROM json_each(?))
+        """, (day, json.dumps(sorted({product['product_id'] for product in products}))))
+        days = {(row['product_id'], row['category_key']): decode_day(row['data']) for row in cursor.fetchall()}
+        
+        for product in products:
+            key = (product['product_id'], product.get('category_key', 'unknown'))
+            set_observation(days.setdefault(key, empty_day()), collected_at, product['rank'],
+                            product['original_price'], product['sale_price'], product['discount_rate'])
+        
+        cursor.executemany("""
+            INSERT OR REPLACE INTO product_history_packed (product_id, day, category_key, data)
+            VALUES (?, ?, ?, ?)
+        """, [(product_id, day, category_key, encode_day(arrays))
+              for (product_id, category_key), arrays in days.items()])
+    
+    def _fetch_previous_state(self, cursor, product_ids: List[str]) -> Dict[Tuple[str, str], Dict]:
+        """(상품, 카테고리)별 직전 상태를 product_latest_state 에서 한 번의 쿼리로 조회"""
+        
+        cursor.execute("""
+            SELECT product_id, category_key, ranking, sale_price, discount_rate
+            FROM product_latest_state
+            WHERE product_id IN (SELECT value FROM json_each(?))
+        """, (json.dumps(sorted(set(product_ids))),))
+        
+        return {(row['product_id'], row['category_key']): dict(row) for row in cursor.fetchall()}
+    
+    def _rebuild_latest_state(self, cursor) -> int:
+        """ranking_history 로부터 product_latest_state 재생성 ((상품, 카테고리)별, 테이블 키와 같게)
+
+        카테고리는 이력의 스냅샷 기준, 스냅샷이 없는 이력만 products.category_key (마지막으로 본 카테고리)를 씁니다.
+        product_history_packed (HISTORY_STORAGE=packed) 이력은 포함하지 않습니다 (rebuild_latest_state 는 거부).
+        """
+        
+        cursor.execute("DELETE FROM product_latest_state")
+        cursor.execute("""
+            INSERT INTO product_latest_state (
+                product_id, category_key, ranking, original_price, sale_price,
+                discount_rate, last_collected_at, first_collected_at, seen_count, last_snapshot_id
+            )
+            SELECT
+                product_id, category_key, ranking, original_price, sale_price,
+                discount_rate, last_collected_at, first_collected_at, seen_count, snapshot_id
+            FROM (
+                SELECT
+                    h.*,
+                    MAX(collected_at) OVER state AS last_collected_at,
+                    MIN(collected_at) OVER state AS first_collected_at,
+                    COUNT(*) OVER state AS seen_count,
+                    ROW_NUMBER() OVER (state ORDER BY collected_at DESC, id DESC) AS latest
+                FROM (
+                    SELECT
+                        rh.id, rh.product_id,
+                        COALESCE(s.category_key, p.category_key, 'unknown') AS category_key,
+                        rh.ranking, rh.original_price, rh.sale_price, rh.discount_rate,
+                        rh.collected_at, rh.snapshot_id
+                    FROM ranking_history rh
+                    LEFT JOIN snapshots s ON s.id = rh.snapshot_id
+                    LEFT JOIN products p ON p.product_id = rh.product_id
+                ) h
+                WINDOW state AS (PARTITION BY product_id, category_key)
+            )
+            WHERE latest = 1
+        """)
+        return cursor.rowcount
+    
+    def rebuild_latest_state(self) -> int:
+        """product_latest_state 재생성 (rebuild_latest_state.py)
+
+        압축 이력(product_history_packed)이 있으면 ranking_history 만으로는 최신 상태를 만들 수 없으므로 거부합니다.
+        """
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM product_history_packed LIMIT 1")
+            if cursor.fetchone() is not None:
+                raise RuntimeError("압축 이력(product_history_packed)이 있어 ranking_history 로 재생성할 수 없습니다")
+            return self._rebuild_latest_state(cursor)
+    
+    def _ranking_change_row(self, product: Dict, previous: Dict, current_time: datetime) -> Optional[Tuple]:
+        """순위 변동 감지 → ranking_changes 행 (변동 없으면 None)"""
+        
+        previous_ranking = previous['ranking']
+        current_ranking = product['rank']
+        
+        if previous_ranking == current_ranking:
+            return None
+        
+        change_amount = previous_ranking - current_ranking  # 양수: 순위 상승, 음수: 순위 하락
+        change_type = 'up' if change_amount > 0 else 'down'
+        
+        return (
+            product['product_id'],
+            previous_ranking,
+            current_ranking,
+            change_amount,
+            change_type,
+            current_time
+        )
+    
+    def _price_change_row(self, product: Dict, previous: Dict, current_time: datetime) -> Optional[Tuple]:
+        """가격 변동 감지 → price_changes 행 (변동 없으면 None)"""
+        
+        previous_price = previous['sale_price']
+        previous_discount = previous['discount_rate']
+        current_price = product['sale_price']
+        current_discount = product['discount_rate']
+        
+        if not (previous_price and current_price and previous_price != current_price):
+            return None
         
-        result = cursor.fetchone()
+        price_change = current_price - previous_price
+        price_change_pct = (price_change / previous_price * 100) if previous_price else 0
         
-        if result:
-            previous_ranking = result[0]
-            current_ranking = product['rank']
+        return (
+            product['product_id'],
+            previous_price,
+            current_price,
+            price_change,
+            price_change_pct,
+            previous_discount,
+            current_discount,
+            current_time
+        )
+    
+    def _brand_category_aggregates(self, products: List[Dict]) -> List[Dict]:
+        """배치 상품 → 브랜드 × 카테고리 집계 (brand_category_stats / brand_daily_rollup 공통)
+
+        rank_share: 카테고리 안에서 순위 가중치(최하위 순위 + 1 - 순위) 합 중 브랜드 몫 (카테고리별 합계 1)
+        """
+        
+        categories = {}
+        for product in products:
+            categories.setdefault(product.get('category_key', 'unknown'), []).append(product)
+        
+        aggregates = []
+        for category_key, items in categories.items():
+            bottom = max(product['rank'] for product in items) + 1
+            total_weight = sum(bottom - product['rank'] for product in items)
             
-            if previous_ranking != current_ranking:
-                change_amount = previous_ranking - current_ranking  # 양수: 순위 상승, 음수: 순위 하락
-                change_type = 'up' if change_amount > 0 else 'down'
-                
-                cursor.execute("""
-                    INSERT INTO ranking_changes (
-                        product_id, previous_ranking, current_ranking,
-                        change_amount, change_type, changed_at
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    product['product_id'],
-                    previous_ranking,
-                    current_ranking,
-                    change_amount,
-                    change_type,
-                    current_time
-                ))
-    
-    def _detect_price_change(self, cursor, product: Dict, current_time: datetime):
-        """가격 변동 감지"""
-        
-        # 이전 가격 조회
-        cursor.execute("""
-            SELECT sale_price, discount_rate FROM ranking_history
-            WHERE product_id = ?
-            AND collected_at < ?
-            ORDER BY collected_at DESC
-            LIMIT 1
-        """, (product['product_id'], current_time))
-        
-        result = cursor.fetchone()
-        
-        if result:
-            previous_price = result[0]
-            previous_discount = result[1]
-            current_price = product['sale_price']
-            current_discount = product['discount_rate']
-            
-            if previous_price and current_price and previous_price != current_price:
-                price_change = current_price - previous_price
-                price_change_pct = (price_change / previous_price * 100) if previous_price else 0
-                
-                cursor.execute("""
-                    INSERT INTO price_changes (
-                        product_id, previous_sale_price, current_sale_price,
-                        price_change_amount, price_change_percentage,
-                        previous_discount_rate, current_discount_rate, changed_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    product['product_id'],
-                    previous_price,
-                    current_price,
-                    price_change,
-                    price_change_pct,
-                    previous_discount,
-                    current_discount,
-                    current_time
-                ))
-    
-    def _save_brand_stats(self, cursor, collected_at: datetime):
-        """브랜드별 통계 저장"""
-        
-        cursor.execute("""
-            SELECT 
+            brands = {}
+            for product in items:
+                if product['brand_name'] and product['brand_name'] != 'N/A':
+                    brands.setdefault(product['brand_name'], []).append(product)
+            
+            for brand_name, brand_items in brands.items():
+                ranks = [product['rank'] for product in brand_items]
+                prices = [product['sale_price'] for product in brand_items if product['sale_price'] is not None]
+                discounts = [product['discount_rate'] for product in brand_items if product['discount_rate'] is not None]
+                aggregates.append({
+                    'brand_name': brand_name,
+                    'category_key': category_key,
+                    'ranks': ranks,
+                    'prices': prices,
+                    'discounts': discounts,
+                    'rank_share': (sum(bottom - rank for rank in ranks) / total_weight
+                                   if total_weight else None),
+                })
+        return aggregates
+    
+    def _brand_category_rows(self, aggregates: List[Dict], snapshot_ids: Dict[str, int],
+                             collected_at: datetime) -> List[Tuple]:
+        """브랜드 × 카테고리 집계 → brand_category_stats 행"""
+        
+        def avg(values):
+            return sum(values) / len(values) if values else None
+        
+        return [(
+            snapshot_ids[agg['category_key']],
+            agg['brand_name'],
+            agg['category_key'],
+            len(agg['ranks']),
+            min(agg['ranks']),
+            avg(agg['ranks']),
+            max(agg['ranks']),
+            min(agg['prices']) if agg['prices'] else None,
+            avg(agg['prices']),
+            max(agg['prices']) if agg['prices'] else None,
+            avg(agg['discounts']),
+            agg['rank_share'],
+            collected_at
+        ) for agg in aggregates]
+    
+    def _brand_daily_rows(self, aggregates: List[Dict], collected_at: datetime) -> List[Tuple]:
+        """브랜드 × 카테고리 집계 → brand_daily_rollup 증분 행 (스냅샷 1회분)"""
+        
+        day = collected_at.date().isoformat()
+        return [(
+            agg['brand_name'],
+            agg['category_key'],
+            day,
+            len(agg['ranks']),
+            sum(agg['ranks']),
+            sum(agg['prices']) if agg['prices'] else None,
+            len(agg['prices']),
+            sum(agg['discounts']) if agg['discounts'] else None,
+            len(agg['discounts']),
+            min(agg['ranks']),
+            max(agg['ranks']),
+            min(agg['prices']) if agg['prices'] else None,
+            max(agg['prices']) if agg['prices'] else None,
+            agg['rank_share'],
+            collected_at
+        ) for agg in aggregates]
+    
+    def _backfill_brand_category_stats(self, cursor) -> int:
+        """기존 이력 → brand_category_stats (_brand_category_rows 와 같은 계산을 SQL로)"""
+        
+        cursor.execute("""
+            INSERT INTO brand_category_stats (
+                snapshot_id, brand_name, category_key, product_count,
+                min_ranking, avg_ranking, max_ranking,
+                min_price, avg_price, max_price,
+                avg_discount_rate, rank_share, collected_at
+            )
+            SELECT
+                rh.snapshot_id,
                 p.brand_name,
-                COUNT(*) as product_count,
-                AVG(rh.ranking) as avg_ranking,
-                AVG(rh.sale_price) as avg_price,
-                MIN(rh.sale_price) as min_price,
-                MAX(rh.sale_price) as max_price,
-                AVG(rh.discount_rate) as avg_discount_rate
+                snap.category_key,
+                COUNT(*),
+                MIN(rh.ranking), AVG(rh.ranking), MAX(rh.ranking),
+                MIN(rh.sale_price), AVG(rh.sale_price), MAX(rh.sale_price),
+                AVG(rh.discount_rate),
+                SUM(totals.max_rank + 1 - rh.ranking) * 1.0 / NULLIF(totals.total_weight, 0),
+                snap.collected_at
             FROM ranking_history rh
-            JOIN products p ON rh.product_id = p.product_id
-            WHERE rh.collected_at = ?
-            AND p.brand_name IS NOT NULL
+            JOIN snapshots snap ON snap.id = rh.snapshot_id
+            JOIN products p ON p.product_id = rh.product_id
+            JOIN (
+                SELECT snapshot_id,
+                       MAX(ranking) AS max_rank,
+                       COUNT(*) * (MAX(ranking) + 1) - SUM(ranking) AS total_weight
+                FROM ranking_history
+                GROUP BY snapshot_id
+            ) totals ON totals.snapshot_id = rh.snapshot_id
+            WHERE p.brand_name IS NOT NULL
             AND p.brand_name != 'N/A'
-            GROUP BY p.brand_name
-        """, (collected_at,))
+            GROUP BY rh.snapshot_id, p.brand_name
+        """)
+        return cursor.rowcount
+    
+    def _rebuild_daily_rollups(self, cursor) -> Dict[str, int]:
+        """ranking_history / brand_category_stats → 일별 롤업 전체 재생성
+
+        apply_retention 으로 줄어든 날짜는 남은 행으로만 계산되므로 (최소/최대, hours_present 부정확)
+        보통은 롤업이 비어 있을 때(기존 DB 최초 실행)만 사용합니다.
+        브랜드 가격/할인 평균의 개수는 스냅샷 평균값이 있는 상품 수로 근사합니다.
+        """
         
-        stats = cursor.fetchall()
+        cursor.execute("DELETE FROM product_daily_rollup")
+        cursor.execute(PRODUCT_DAILY_ROLLUP_INSERT_SQL + """
+            SELECT
+                product_id, day,
+                MAX(first_ranking), MAX(last_ranking), MIN(ranking), MAX(ranking),
+                MIN(sale_price), MAX(sale_price), MAX(last_price), MAX(last_discount_rate),
+                COUNT(DISTINCT strftime('%H', collected_at)),
+                MIN(collected_at), MAX(collected_at)
+            FROM (
+                SELECT
+                    product_id, date(collected_at) AS day, ranking, sale_price, collected_at,
+                    FIRST_VALUE(ranking) OVER (
+                        PARTITION BY product_id, date(collected_at) ORDER BY collected_at, id
+                    ) AS first_ranking,
+                    FIRST_VALUE(ranking) OVER latest AS last_ranking,
+                    FIRST_VALUE(sale_price) OVER latest AS last_price,
+                    FIRST_VALUE(discount_rate) OVER latest AS last_discount_rate
+                FROM ranking_history
+                WINDOW latest AS (PARTITION BY product_id, date(collected_at) ORDER BY collected_at DESC, id DESC)
+            )
+            GROUP BY product_id, day
+        """)
+        counts = {'product_daily_rollup': cursor.rowcount}
         
-        for stat in stats:
-            cursor.execute("""
-                INSERT INTO brand_stats_history (
-                    brand_name, product_count, avg_ranking, avg_price,
-                    min_price, max_price, avg_discount_rate, collected_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                stat[0],  # brand_name
-                stat[1],  # product_count
-                stat[2],  # avg_ranking
-                stat[3],  # avg_price
-                stat[4],  # min_price
-                stat[5],  # max_price
-                stat[6],  # avg_discount_rate
-                collected_at
-            ))
+        cursor.execute("DELETE FROM brand_daily_rollup")
+        cursor.execute("""
+            INSERT INTO brand_daily_rollup (
+                brand_name, category_key, day, snapshot_count,
+                product_count_sum, ranking_sum, price_sum, price_count,
+                discount_sum, discount_count,
+                min_ranking, max_ranking, min_price, max_price,
+                rank_share_sum, last_collected_at
+            )
+            SELECT
+                brand_name, category_key, date(collected_at), COUNT(*),
+                SUM(product_count),
+                SUM(avg_ranking * product_count),
+                SUM(avg_price * product_count),
+                SUM(CASE WHEN avg_price IS NOT NULL THEN product_count ELSE 0 END),
+                SUM(avg_discount_rate * product_count),
+                SUM(CASE WHEN avg_discount_rate IS NOT NULL THEN product_count ELSE 0 END),
+                MIN(min_ranking), MAX(max_ranking), MIN(min_price), MAX(max_price),
+                SUM(rank_share), MAX(collected_at)
+            FROM brand_category_stats
+            GROUP BY brand_name, category_key, date(collected_at)
+        """)
+        counts['brand_daily_rollup'] = cursor.rowcount
+        return counts
+    
+    def rebuild_daily_rollups(self) -> Dict[str, int]:
+        """일별 롤업 재생성 (_rebuild_daily_rollups 참고)"""
+        
+        with self.get_connection() as conn:
+            return self._rebuild_daily_rollups(conn.cursor())
+    
+    def apply_retention(self, raw_days: int = None, dry_run: bool = False) -> Dict[str, int]:
+        """오래된 원본 이력 다운샘플링
+
+        raw_days 일보다 오래된 ranking_history 는 (상품, 카테고리, 날짜)마다 그날 마지막 행만 남기고,
+        brand_category_stats 는 삭제합니다 (일별 값은 brand_daily_rollup 에 있음).
+        스냅샷, 최신 상태, 일별 롤업은 그대로 둡니다. 날짜별로 커밋하므로 중간에 끊겨도 다시 실행하면 됩니다.
+        """
+        raw_days = HISTORY_RAW_RETENTION_DAYS if raw_days is None else raw_days
+        counts = {'ranking_history': 0, 'brand_category_stats': 0, 'days': 0}
+        if raw_days <= 0:
+            return counts
+        
+        cutoff = (utc_now() - timedelta(days=raw_days)).date()
+        with self.get_connection() as conn:
+            oldest = conn.execute("SELECT MIN(collected_at) FROM ranking_history").fetchone()[0]
+        if oldest is None:
+            return counts
+        
+        day = datetime.fromisoformat(oldest).date()
+        while day < cutoff:
+            start, end = day.isoformat(), (day + timedelta(days=1)).isoformat()
+            with self.get_connection() as conn:
+                keep_ids = """
+                    SELECT MAX(rh.id)
+                    FROM ranking_history rh
+                    LEFT JOIN snapshots s ON s.id = rh.snapshot_id
+                    WHERE rh.collected_at >= ? AND rh.collected_at < ?
+                    GROUP BY rh.product_id, COALESCE(s.category_key, 'unknown')
+                """
+                if dry_run:
+                    counts['ranking_history'] += conn.execute(f"""
+                        SELECT COUNT(*) FROM ranking_history
+                        WHERE collected_at >= ? AND collected_at < ?
+                        AND id NOT IN ({keep_ids})
+                    """, (start, end, start, end)).fetchone()[0]
+                    counts['brand_category_stats'] += conn.execute("""
+                        SELECT COUNT(*) FROM brand_category_stats
+                        WHERE collected_at >= ? AND collected_at < ?
+                    """, (start, end)).fetchone()[0]
+                else:
+                    cursor = conn.execute(f"""
+                        DELETE FROM ranking_history
+                        WHERE collected_at >= ? AND collected_at < ?
+                        AND id NOT IN ({keep_ids})
+                    """, (start, end, start, end))
+                    counts['ranking_history'] += cursor.rowcount
+                    cursor = conn.execute("""
+                        DELETE FROM brand_category_stats
+                        WHERE collected_at >= ? AND collected_at < ?
+                    """, (start, end))
+                    counts['brand_category_stats'] += cursor.rowcount
+            counts['days'] += 1
+            day += timedelta(days=1)
+        
+        return counts
     
     def log_scraping_job(self, started_at: datetime, status: str, 
                         products_collected: int = 0, 
                         error_message: str = None,
-                        execution_time: int = None) -> int:
-        """크롤링 작업 로그 저장"""
+                        execution_time: int = None,
+                        completed_at: datetime = None) -> int:
+        """크롤링 작업 로그 저장 (completed_at 기본: 지금)"""
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -389,7 +1287,7 @@ class Database:
                 ) VALUES (?, ?, ?, ?, ?, ?)
             """, (
                 started_at,
-                datetime.now(),
+                completed_at or utc_now(),
                 status,
                 products_collected,
                 error_message,
@@ -399,27 +1297,28 @@ class Database:
             return cursor.lastrowid
     
     def get_latest_rankings(self, limit: int = 200) -> List[Dict]:
-        """최신 순위 조회"""
+        """최신 순위 조회 (카테고리별 마지막 수집분)"""
         
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
                 SELECT 
-                    rh.ranking,
+                    s.ranking,
                     p.product_id,
                     p.product_name,
                     p.brand_name,
-                    rh.original_price,
-                    rh.sale_price,
-                    rh.discount_rate,
+                    s.category_key,
+                    s.original_price,
+                    s.sale_price,
+                    s.discount_rate,
                     p.image_url,
                     p.product_url,
-                    rh.collected_at
-                FROM ranking_history rh
-                JOIN products p ON rh.product_id = p.product_id
-                WHERE rh.collected_at = (SELECT MAX(collected_at) FROM ranking_history)
-                ORDER BY rh.ranking
+                    s.last_collected_at AS collected_at
+                FROM product_latest_state s
+                JOIN products p ON s.product_id = p.product_id
+                WHERE s.last_snapshot_id IN (""" + LATEST_SNAPSHOT_IDS_SQL + """)
+                ORDER BY s.ranking, s.category_key
                 LIMIT ?
             """, (limit,))
             
@@ -427,56 +1326,51 @@ class Database:
             
             return [dict(row) for row in rows]
     
-    def get_brand_statistics(self, hours: int = 24) -> List[Dict]:
-        """브랜드별 통계 조회"""
+    def get_brand_statistics(self, hours: int = 24, category_key: str = None) -> List[Dict]:
+        """브랜드별 통계 조회 (크롤링 1회 기준 평균, category_key 지정 시 해당 카테고리만)"""
         
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
+            # INDEXED BY: 지정하지 않으면 GROUP BY 정렬 때문에 (brand_name, collected_at) 인덱스 전체를 읽는 플랜을 고름
+            query = """
                 SELECT 
                     brand_name,
-                    AVG(product_count) as avg_product_count,
-                    AVG(avg_ranking) as avg_ranking,
-                    AVG(avg_price) as avg_price,
-                    AVG(avg_discount_rate) as avg_discount_rate
-                FROM brand_stats_history
+                    SUM(product_count) * 1.0
+                        / COUNT(DISTINCT strftime('%Y-%m-%d %H', collected_at)) as avg_product_count,
+                    SUM(avg_ranking * product_count) * 1.0 / SUM(product_count) as avg_ranking,
+                    SUM(avg_price * product_count) * 1.0 / SUM(product_count) as avg_price,
+                    AVG(avg_discount_rate) as avg_discount_rate,
+                    MIN(min_ranking) as min_ranking,
+                    MAX(max_ranking) as max_ranking
+                FROM brand_category_stats INDEXED BY idx_brand_category_stats_collected_at
                 WHERE collected_at >= datetime('now', '-' || ? || ' hours')
+            """
+            params = [hours]
+            if category_key:
+                query += " AND category_key = ?"
+                params.append(category_key)
+            query += """
                 GROUP BY brand_name
                 ORDER BY avg_product_count DESC
-            """, (hours,))
+            """
+            cursor.execute(query, params)
             
             rows = cursor.fetchall()
             
             return [dict(row) for row in rows]
     
     def get_product_history(self, product_id: str, days: int = 7) -> List[Dict]:
-        """특정 상품의 순위/가격 변동 이력"""
+        """특정 상품의 순위/가격 변동 이력 (저장 형식과 무관)"""
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    ranking,
-                    original_price,
-                    sale_price,
-                    discount_rate,
-                    collected_at
-                FROM ranking_history
-                WHERE product_id = ?
-                AND collected_at >= datetime('now', '-' || ? || ' days')
-                ORDER BY collected_at ASC
-            """, (product_id, days))
-            
-            rows = cursor.fetchall()
-            
-            return [dict(row) for row in rows]
+        with self.read_connection() as conn:
+            since = (utc_now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            return fetch_product_history(conn.cursor(), [product_id], since)[product_id]
     
     def get_ranking_movers(self, change_type: str = 'up', limit: int = 20) -> List[Dict]:
         """순위 급변동 상품 조회"""
         
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
             order = 'DESC' if change_type == 'up' else 'ASC'
@@ -505,7 +1399,7 @@ class Database:
     def get_price_changes(self, hours: int = 24) -> Dict:
         """가격 변동 분석"""
         
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
             # 가격 인상
@@ -556,7 +1450,7 @@ class Database:
     def get_database_stats(self) -> Dict:
         """데이터베이스 통계"""
         
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             
             stats = {}
@@ -573,13 +1467,16 @@ class Database:
             cursor.execute("SELECT COUNT(*) FROM ranking_history")
             stats['total_data_points'] = cursor.fetchone()[0]
             
-            # 첫 수집 시간
-            cursor.execute("SELECT MIN(collected_at) FROM ranking_history")
-            stats['first_collection'] = cursor.fetchone()[0]
+            # 압축 이력 행 수 (상품 × 날짜)
+            cursor.execute("SELECT COUNT(*) FROM product_history_packed")
+            stats['packed_history_days'] = cursor.fetchone()[0]
             
-            # 최근 수집 시간
-            cursor.execute("SELECT MAX(collected_at) FROM ranking_history")
-            stats['last_collection'] = cursor.fetchone()[0]
+            # 첫 수집 / 최근 수집 시간, 수집 횟수 (스냅샷 테이블)
+            cursor.execute("""
+                SELECT MIN(collected_at), MAX(collected_at), COUNT(*)
+                FROM snapshots WHERE status = 'complete'
+            """)
+            stats['first_collection'], stats['last_collection'], stats['total_snapshots'] = cursor.fetchone()
             
             # 총 크롤링 작업 수
             cursor.execute("SELECT COUNT(*) FROM scraping_logs")
@@ -590,6 +1487,141 @@ class Database:
             stats['successful_jobs'] = cursor.fetchone()[0]
             
             return stats
+    
+    def _merge_packed_history(self, cursor, old_id: str, new_id: str):
+        """product_history_packed 의 old_id 행을 new_id 로 옮기거나 합침"""
+        
+        cursor.execute("""
+            SELECT day, category_key, data FROM product_history_packed WHERE product_id = ?
+        """, (old_id,))
+        for row in cursor.fetchall():
+            cursor.execute("""
+                SELECT data FROM product_history_packed
+                WHERE product_id = ? AND day = ? AND category_key = ?
+            """, (new_id, row['day'], row['category_key']))
+            existing = cursor.fetchone()
+            arrays = decode_day(row['data'])
+            if existing is not None:
+                arrays = merge_days(decode_day(existing['data']), arrays)
+            cursor.execute("""
+                INSERT OR REPLACE INTO product_history_packed (product_id, day, category_key, data)
+                VALUES (?, ?, ?, ?)
+            """, (new_id, row['day'], row['category_key'], encode_day(arrays)))
+        cursor.execute("DELETE FROM product_history_packed WHERE product_id = ?", (old_id,))
+    
+    def _merge_latest_state(self, cursor, old_id: str, new_id: str):
+        """product_latest_state 의 old_id 행을 new_id 로 옮기거나 합침 (최근 관측 기준, 수집 횟수는 합산)"""
+        
+        cursor.execute("""
+            INSERT INTO product_latest_state (
+                product_id, category_key, ranking, original_price, sale_price,
+                discount_rate, last_collected_at, first_collected_at, seen_count, last_snapshot_id
+            )
+            SELECT ?, category_key, ranking, original_price, sale_price,
+                   discount_rate, last_collected_at, first_collected_at, seen_count, last_snapshot_id
+            FROM product_latest_state
+            WHERE product_id = ?
+            ON CONFLICT(product_id, category_key) DO UPDATE SET
+                ranking = CASE WHEN excluded.last_collected_at > last_collected_at THEN excluded.ranking ELSE ranking END,
+                original_price = CASE WHEN excluded.last_collected_at > last_collected_at THEN excluded.original_price ELSE original_price END,
+                sale_price = CASE WHEN excluded.last_collected_at > last_collected_at THEN excluded.sale_price ELSE sale_price END,
+                discount_rate = CASE WHEN excluded.last_collected_at > last_collected_at THEN excluded.discount_rate ELSE discount_rate END,
+                last_snapshot_id = CASE WHEN excluded.last_collected_at > last_collected_at THEN excluded.last_snapshot_id ELSE last_snapshot_id END,
+                last_collected_at = MAX(last_collected_at, excluded.last_collected_at),
+                first_collected_at = MIN(first_collected_at, excluded.first_collected_at),
+                seen_count = seen_count + excluded.seen_count
+        """, (new_id, old_id))
+        cursor.execute("DELETE FROM product_latest_state WHERE product_id = ?", (old_id,))
+    
+    def merge_product_ids(self, id_map: Dict[str, str]) -> Dict[str, int]:
+        """상품 ID 변경/병합 (old → new), 한 트랜잭션으로 처리
+
+        같은 new ID로 모이는 행들은 products에서 하나로 합치고
+        (first_seen은 가장 이른 값, 나머지 정보는 가장 최근에 본 행 기준)
+        ranking_history / ranking_changes / price_changes / product_daily_rollup / product_history_packed 의
+        product_id를 모두 새 ID로 바꿉니다.
+        같은 수집 시각에 같은 상품의 이력이 두 번 생기면 먼저 저장된 행만 남깁니다.
+        """
+        counts = {'products': 0, 'ranking_history': 0, 'ranking_changes': 0,
+                  'price_changes': 0, 'duplicate_history': 0}
+        id_map = {old: new for old, new in id_map.items() if old != new}
+        if not id_map:
+            return counts
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            for old_id, new_id in id_map.items():
+                cursor.execute("SELECT * FROM products WHERE product_id = ?", (old_id,))
+                old_row = cursor.fetchone()
+                cursor.execute("SELECT * FROM products WHERE product_id = ?", (new_id,))
+                new_row = cursor.fetchone()
+                
+                if old_row and new_row:
+                    latest = old_row if (old_row['last_seen'] or '') > (new_row['last_seen'] or '') else new_row
+                    cursor.execute("""
+                        UPDATE products SET
+                            product_name = ?, brand_name = ?, category = ?, category_key = ?,
+                            image_url = ?, product_url = ?,
+                            first_seen = MIN(first_seen, ?), last_seen = MAX(last_seen, ?),
+                            created_at = MIN(created_at, ?), updated_at = MAX(updated_at, ?)
+                        WHERE product_id = ?
+                    """, (
+                        latest['product_name'], latest['brand_name'], latest['category'],
+                        latest['category_key'], latest['image_url'], latest['product_url'],
+                        old_row['first_seen'], old_row['last_seen'],
+                        old_row['created_at'], old_row['updated_at'],
+                        new_id
+                    ))
+                    cursor.execute("DELETE FROM products WHERE product_id = ?", (old_id,))
+                    counts['products'] += 1
+                elif old_row:
+                    cursor.execute("UPDATE products SET product_id = ? WHERE product_id = ?", (new_id, old_id))
+                    counts['products'] += 1
+                
+                for table in ('ranking_history', 'ranking_changes', 'price_changes'):
+                    cursor.execute(f"UPDATE {table} SET product_id = ? WHERE product_id = ?", (new_id, old_id))
+                    counts[table] += cursor.rowcount
+                
+                # 일별 롤업: 같은 날짜 행은 합치고 예전 ID 행 삭제
+                cursor.execute(PRODUCT_DAILY_ROLLUP_INSERT_SQL + """
+                    SELECT ?, day, first_ranking, last_ranking, min_ranking, max_ranking,
+                           min_price, max_price, last_price, last_discount_rate,
+                           hours_present, first_collected_at, last_collected_at
+                    FROM product_daily_rollup
+                    WHERE product_id = ?
+                """ + PRODUCT_DAILY_ROLLUP_UPSERT_SQL, (new_id, old_id))
+                cursor.execute("DELETE FROM product_daily_rollup WHERE product_id = ?", (old_id,))
+                
+                # 압축 이력: 같은 (날짜, 카테고리) 행은 비어 있는 시간만 채워 합침
+                self._merge_packed_history(cursor, old_id, new_id)
+            
+            # 병합으로 생긴 같은 시각 중복 이력 제거
+            new_ids = sorted(set(id_map.values()))
+            for start in range(0, len(new_ids), 500):
+                chunk = new_ids[start:start + 500]
+                placeholders = ','.join('?' for _ in chunk)
+                cursor.execute(f"""
+                    DELETE FROM ranking_history
+                    WHERE product_id IN ({placeholders})
+                    AND id NOT IN (
+                        SELECT MIN(id) FROM ranking_history
+                        WHERE product_id IN ({placeholders})
+                        GROUP BY product_id, collected_at
+                    )
+                """, chunk + chunk)
+                counts['duplicate_history'] += cursor.rowcount
+            
+            # ID가 바뀌었으므로 최신 상태는 이력에서 다시 생성
+            # (압축 이력이 있으면 ranking_history 만으로는 재생성할 수 없으므로 최신 상태 행을 직접 합침)
+            cursor.execute("SELECT 1 FROM product_history_packed LIMIT 1")
+            if cursor.fetchone() is None:
+                self._rebuild_latest_state(cursor)
+            else:
+                for old_id, new_id in id_map.items():
+                    self._merge_latest_state(cursor, old_id, new_id)
+        
+        return counts
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+API DB 작업 실행기 (api.py 공통)
+
+FastAPI 이벤트 루프에서 sqlite3(블로킹)를 직접 부르면 느린 쿼리 하나가 루프를 막아
+캐시 적중/304/헬스 체크까지 같이 멈춥니다. DB를 쓰는 엔드포인트는 일반 함수(def)로 두고
+여기의 제한된 스레드 풀에서 실행합니다.
+- 스레드 수(API_DB_THREADS): 기본은 읽기 연결 풀 크기 → 스레드가 읽기 연결을 기다리지 않음
+  (0이면 예전처럼 이벤트 루프에서 바로 실행, benchmark_api_concurrency.py 비교용)
+- 요청 기한(API_QUERY_DEADLINE_SECONDS): 요청이 들어온 시각부터 계산 (스레드 대기 시간 포함)
+  기한이 지나면 실행 중인 쿼리를 Connection.interrupt() 로 중단 → 스레드가 바로 풀려남
+  API 는 스레드가 끝나기를 기다리지 않고 기한에 바로 504 (연결 대기/쿼리 사이 Python 작업 중이어도, 결과는 버림)
+  (inline 모드에서는 이벤트 루프가 막혀 있으므로 중단하지 못함)
+- metrics(): 실행/대기/기한 초과 횟수 (API /api/db/metrics)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict
+
+from sqlite_pool import SQLITE_READ_POOL_SIZE
+
+API_DB_THREADS = int(os.environ.get('API_DB_THREADS', str(SQLITE_READ_POOL_SIZE)))
+API_QUERY_DEADLINE_SECONDS = float(os.environ.get('API_QUERY_DEADLINE_SECONDS', '10'))
+
+
+class QueryDeadlineExceeded(Exception):
+    """요청 기한 초과 (API 는 504)"""
+
+
+class _Task:
+    """실행 중인 작업 하나: 기한, 사용 중인 연결 (기한이 지나면 이벤트 루프 쪽에서 interrupt)"""
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.expired = False
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def expire(self):
+        with self.lock:
+            self.expired = True
+            for conn in self.connections:
+                conn.interrupt()
+
+
+_local = threading.local()  # 실행 중인 작업 (스레드마다)
+
+
+def _discard_result(future):
+    """기한 초과로 버린 작업의 결과 (asyncio 의 'exception was never retrieved' 경고 방지)"""
+    if not future.cancelled():
+        future.exception()
+
+
+@contextmanager
+def query_deadline(conn):
+    """현재 작업의 기한이 지나면 이 연결에서 실행 중인 쿼리를 중단 (작업 밖에서 쓰면 아무것도 안 함)
+
+    반납하기 전에 작업에서 빼므로 다른 요청이 이어서 쓰는 연결을 중단하는 일은 없음
+    """
+    task = getattr(_local, 'task', None)
+    if task is None:
+        yield conn
+        return
+    with task.lock:
+        if task.expired:
+            raise QueryDeadlineExceeded("요청 기한 초과")
+        task.connections.append(conn)
+    try:
+        yield conn
+    finally:
+        with task.lock:
+            task.connections.remove(conn)
+
+
+class QueryExecutor:
+    """제한된 스레드 풀 + 요청 기한"""
+
+    def __init__(self, threads: int = API_DB_THREADS, deadline_seconds: float = API_QUERY_DEADLINE_SECONDS):
+        self.threads = max(0, threads)
+        self.deadline_seconds = deadline_seconds
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'deadline_exceeded': 0,
+            'queue_wait_ms': 0.0,
+            'max_queue_wait_ms': 0.0,
+            'max_in_flight': 0,
+        }
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='api-db')
+            return self._pool
+
+    async def run(self, func, *args, **kwargs):
+        """func(*args, **kwargs) 를 DB 스레드에서 실행하고 결과 반환 (기한 초과 시 QueryDeadlineExceeded)"""
+        submitted = time.monotonic()
+        task = _Task(submitted + self.deadline_seconds)
+        call = functools.partial(self._call, func, task, submitted, args, kwargs)
+        with self._lock:
+            self._metrics['submitted'] += 1
+            self._in_flight += 1
+            self._metrics['max_in_flight'] = max(self._metrics['max_in_flight'], self._in_flight)
+        try:
+            if self.threads == 0:
+                return call()
+            future = asyncio.get_running_loop().run_in_executor(self._get_pool(), call)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=self.deadline_seconds)
+            except asyncio.TimeoutError:
+                # 실행 중인 쿼리 중단 (대기 중이면 시작하자마자 종료), 스레드를 기다리지 않고 바로 504
+                task.expire()
+                future.add_done_callback(_discard_result)
+                raise QueryDeadlineExceeded(f"요청 기한 초과 ({self.deadline_seconds:g}초)") from None
+        except QueryDeadlineExceeded:
+            self._count('deadline_exceeded')
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _call(self, func, task, submitted, args, kwargs):
+        """DB 스레드에서 실행 (작업을 스레드 로컬에 두고 query_deadline 이 연결을 등록)"""
+        started = time.monotonic()
+        with self._lock:
+            wait_ms = (started - submitted) * 1000
+            self._metrics['queue_wait_ms'] += wait_ms
+            self._metrics['max_queue_wait_ms'] = max(self._metrics['max_queue_wait_ms'], wait_ms)
+        if task.expired or started >= task.deadline:
+            raise QueryDeadlineExceeded(f"DB 스레드 대기 중 요청 기한 초과 ({self.deadline_seconds:g}초)")
+
+        _local.task = task
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if task.expired:
+                # 엔드포인트가 OperationalError('interrupted')를 HTTPException(500)으로 감쌌어도 기한 초과로 보고
+                raise QueryDeadlineExceeded(f"쿼리 실행 중 요청 기한 초과 ({self.deadline_seconds:g}초)") from e
+            self._count('failed')
+            raise
+        finally:
+            _local.task = None
+        if not task.expired:
+            self._count('completed')  # 기한이 지난 뒤 끝난 작업은 이미 deadline_exceeded 로 셈
+        return result
+
+    def _count(self, name: str):
+        with self._lock:
+            self._metrics[name] += 1
+
+    def endpoint(self, func):
+        """일반 함수 엔드포인트 → DB 스레드에서 실행하는 async 엔드포인트 (시그니처는 그대로, FastAPI 가 __wrapped__ 를 읽음)"""
+        @functools.wraps(func)
+        async def run_endpoint(*args, **kwargs):
+            return await self.run(func, *args, **kwargs)
+        return run_endpoint
+
+    def metrics(self) -> Dict:
+        """누적 지표와 설정"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['in_flight'] = self._in_flight
+        metrics['queue_wait_ms'] = round(metrics['queue_wait_ms'], 3)
+        metrics['max_queue_wait_ms'] = round(metrics['max_queue_wait_ms'], 3)
+        metrics.update({
+            'threads': self.threads,
+            'deadline_seconds': self.deadline_seconds,
+        })
+        return metrics
+
+    def close(self):
+        """스레드 풀 종료 (다음 run 에서 다시 만듦)"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+합성 크롤링 이력 DB 생성 (규모 테스트용)
+Database.init_database 스키마로 새 DB를 만들고, 매시간 카테고리별 베스트 목록을 흉내 낸 크롤링을
+Database.save_products 로 저장합니다 (스냅샷, 최신 상태, 변동 로그, 브랜드 통계, 일별 롤업까지 실제 저장 경로 그대로).
+
+모델:
+- 브랜드: Zipf 분포 (상위 브랜드가 상품을 많이 가짐), 브랜드마다 가격대
+- 순위: 상품마다 인기 점수(log)가 자기 '품질' 쪽으로 움직이는 랜덤 워크, 품질은 시간이 지나며 떨어짐
+  → 신상품 진입, 순위 하락 후 이탈, 시간당 순위 변동이 자연스럽게 생김
+- 가격: 정가는 가끔 변경, 할인 행사(며칠간)가 수시로 시작/종료, 상시 할인 상품
+- 크롤링 시각: 매시 20분 + 지터, 카테고리 크롤링 실패(--failure-rate)는 status='failed' 스냅샷만 기록
+
+규모: --scale 은 카테고리당 상품 수 배수 (1 = 200개, 1년이면 ranking_history 약 1,400만 행)
+      10배/100배는 같은 기간에 행 수가 10배/100배 (100배 × 1년은 행 14억 개라 --days 를 줄여 쓰는 것을 권장)
+
+사용법:
+    python generate_synthetic_history.py --db synthetic_1x.db
+    python generate_synthetic_history.py --db synthetic_10x.db --scale 10 --days 90 --seed 7
+    python generate_synthetic_history.py --db synthetic.db --days 30 --storage packed --apply-retention
+
+생성한 DB로 벤치마크 실행:
+    python benchmark_ingest.py --db synthetic_1x.db
+    python check_query_plans.py --db synthetic_1x.db
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+import database
+from database import Database
+
+# category_key → (카테고리 이름, 상품 종류, 가격 배수)
+CATEGORIES = {
+    'outer': ('아우터', ['코트', '자켓', '점퍼', '가디건', '베스트', '패딩'], 2.0),
+    'dress': ('원피스', ['원피스', '셔츠 원피스', '니트 원피스', '점프수트'], 1.3),
+    'blouse': ('블라우스', ['블라우스', '프릴 블라우스', '리본 블라우스'], 0.9),
+    'shirt': ('셔츠', ['셔츠', '오버핏 셔츠', '스트라이프 셔츠'], 0.9),
+    'tshirt': ('티셔츠', ['티셔츠', '맨투맨', '후드', '슬리브리스'], 0.6),
+    'knit': ('니트', ['니트', '라운드 니트', '브이넥 니트', '니트 베스트'], 1.1),
+    'skirt': ('스커트', ['스커트', '롱 스커트', '플리츠 스커트', '미니 스커트'], 0.9),
+    'underwear': ('언더웨어', ['브라', '팬티 세트', '슬립', '라운지웨어'], 0.4),
+}
+BRAND_SKEW = 0.8  # 브랜드 Zipf 지수 (베스트 200개 중 상위 10개 브랜드가 약 40%)
+ADJECTIVES = ['베이직', '오버핏', '크롭', '울', '린넨', '코튼', '시그니처', '데일리', '클래식', '에센셜']
+PRODUCTS_PER_CATEGORY = 200
+PRODUCT_ID_BASE = 300000000
+
+# 순위 모델 (시간 단위)
+POPULARITY_PULL = 0.05   # 점수가 품질 쪽으로 당겨지는 비율
+POPULARITY_NOISE = 0.08  # 시간당 점수 변동 (표준편차)
+QUALITY_DECAY = 0.004    # 시간당 품질 하락 (신상품 효과가 몇 주에 걸쳐 사라짐)
+ARRIVAL_RATE = 0.01      # 시간당 신상품 수 (카테고리 상품 수 대비)
+POOL_FACTOR = 1.5        # 순위 밖 후보까지 포함한 카테고리 상품 풀 크기
+
+# 가격 모델 (시간당 확률)
+SALE_START = 0.004
+SALE_HOURS = (24, 168)
+SALE_RATES = [10, 15, 20, 25, 30, 40]
+ALWAYS_DISCOUNTED = 0.7  # 베스트 목록은 대부분 할인 중
+PRICE_CHANGE = 0.0005
+
+
+class SyntheticMarket:
+    """카테고리별 상품 풀 / 브랜드 / 가격 상태 (seed 가 같으면 항상 같은 이력)"""
+
+    def __init__(self, rng: random.Random, products_per_category: int, brand_count: int):
+        self.rng = rng
+        self.products_per_category = products_per_category
+        self.pool_size = int(products_per_category * POOL_FACTOR)
+        self.brands = [f"브랜드 {index:03d}" for index in range(brand_count)]
+        self.brand_weights = [1 / (index + 1) ** BRAND_SKEW for index in range(brand_count)]
+        self.brand_prices = {brand: math.exp(rng.gauss(math.log(89000), 0.5)) for brand in self.brands}
+        self.next_product = 0
+        self.products = {}  # product_id → 상태 dict
+        self.pools = {category_key: [] for category_key in CATEGORIES}
+        for category_key in CATEGORIES:
+            for _ in range(self.pool_size):
+                # 처음 풀은 이미 진열돼 있던 상품들: 품질/나이를 고르게
+                self._launch(category_key, age_hours=rng.uniform(0, 24 * 60))
+
+    def _launch(self, category_key: str, age_hours: float = 0.0):
+        rng = self.rng
+        product_id = f"PROD_{PRODUCT_ID_BASE + self.next_product}"
+        self.next_product += 1
+        brand = rng.choices(self.brands, weights=self.brand_weights)[0]
+        category_name, items, price_factor = CATEGORIES[category_key]
+        quality = rng.gauss(0.5, 1.0) - QUALITY_DECAY * age_hours
+        price = max(9000, round(self.brand_prices[brand] * price_factor * math.exp(rng.gauss(0, 0.3)), -3) - 1000)
+        code = product_id.split('_')[1]
+        self.products[product_id] = {
+            'product_id': product_id,
+            'product_name': f"{rng.choice(ADJECTIVES)} {rng.choice(items)} {code[-4:]}",
+            'brand_name': brand,
+            'category': category_name,
+            'category_key': category_key,
+            'image_url': f"https://product-image.wconcept.co.kr/productimg/image/img1/{code[-2:]}/{code}.jpg",
+            'product_url': f"https://www.wconcept.co.kr/Product/{code}",
+            'quality': quality,
+            'popularity': quality + rng.gauss(0, 0.5),
+            'original_price': price,
+            'base_discount': rng.choice([5, 10, 15, 20, 30]) if rng.random() < ALWAYS_DISCOUNTED else 0,
+            'sale_rate': 0,
+            'sale_hours_left': 0,
+        }
+        self.pools[category_key].append(product_id)
+
+    def _step_product(self, state: dict):
+        rng = self.rng
+        state['quality'] -= QUALITY_DECAY
+        state['popularity'] += (POPULARITY_PULL * (state['quality'] - state['popularity'])
+                                + rng.gauss(0, POPULARITY_NOISE))
+        if state['sale_hours_left'] > 0:
+            state['sale_hours_left'] -= 1
+            if state['sale_hours_left'] == 0:
+                state['sale_rate'] = 0
+        elif rng.random() < SALE_START:
+            state['sale_rate'] = rng.choice(SALE_RATES)
+            state['sale_hours_left'] = rng.randint(*SALE_HOURS)
+            state['popularity'] += 0.3  # 할인 시작하면 잠깐 순위 상승
+        if rng.random() < PRICE_CHANGE:
+            state['original_price'] = max(9000, round(state['original_price'] * rng.uniform(0.9, 1.15), -3) - 1000)
+
+    def step(self):
+        """1시간 진행: 점수/가격 변화, 신상품 진입, 하위 상품 이탈"""
+        rng = self.rng
+        for category_key, pool in self.pools.items():
+            for product_id in pool:
+                self._step_product(self.products[product_id])
+            arrivals = self.products_per_category * ARRIVAL_RATE
+            count = int(arrivals) + (1 if rng.random() < arrivals - int(arrivals) else 0)
+            for _ in range(count):
+                self._launch(category_key)
+            if len(pool) > self.pool_size:
+                pool.sort(key=lambda product_id: self.products[product_id]['popularity'], reverse=True)
+                for product_id in pool[self.pool_size:]:
+                    del self.products[product_id]
+                del pool[self.pool_size:]
+
+    def crawl(self, category_key: str) -> list:
+        """현재 카테고리 베스트 목록 (save_products 입력 형식)"""
+        pool = self.pools[category_key]
+        ranked = sorted(pool, key=lambda product_id: self.products[product_id]['popularity'], reverse=True)
+        products = []
+        for rank, product_id in enumerate(ranked[:self.products_per_category], start=1):
+            state = self.products[product_id]
+            discount = max(state['base_discount'], state['sale_rate'])
+            original = int(state['original_price'])
+            products.append({
+                'rank': rank,
+                'product_id': product_id,
+                'product_name': state['product_name'],
+                'brand_name': state['brand_name'],
+                'category': state['category'],
+                'category_key': category_key,
+                'original_price': original,
+                'sale_price': original * (100 - discount) // 1000 * 10 if discount else original,
+                'discount_rate': discount or None,
+                'image_url': state['image_url'],
+                'product_url': state['product_url'],
+            })
+        return products
+
+
+def generate(db: Database, days: int, market: SyntheticMarket, rng: random.Random,
+             failure_rate: float) -> dict:
+    """days 일 전부터 지금까지 매시간 크롤링 저장 (하루치를 한 트랜잭션으로)"""
+    end = database.utc_now().replace(minute=20, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    counts = {'crawls': 0, 'observations': 0, 'failed_snapshots': 0}
+    started = time.perf_counter()
+    for day in range(days + 1):
+        # 하루치를 한 트랜잭션으로 (save_products 등의 get_connection 은 바깥 블록에 합류)
+        with db.get_connection(), contextlib.redirect_stdout(io.StringIO()):
+            for hour in range(24):
+                crawl_start = start + timedelta(days=day, hours=hour, seconds=rng.randint(0, 300))
+                if crawl_start > end + timedelta(minutes=5):
+                    break
+                market.step()
+                products = []
+                failed = []
+                for category_key in CATEGORIES:
+                    if rng.random() < failure_rate:
+                        failed.append(category_key)
+                    else:
+                        products.extend(market.crawl(category_key))
+
+                saved = db.save_products(products, collected_at=crawl_start) if products else 0
+                for category_key in failed:
+                    db.record_snapshot(category_key, 'failed', collected_at=crawl_start)
+                finished = crawl_start + timedelta(seconds=rng.randint(60, 180))
+                db.log_scraping_job(crawl_start, 'partial' if failed else 'success', saved,
+                                    execution_time=int((finished - crawl_start).total_seconds()),
+                                    completed_at=finished)
+
+                counts['crawls'] += 1
+                counts['observations'] += saved
+                counts['failed_snapshots'] += len(failed)
+        if day % 10 == 9 or day == days:
+            print(f"   {day + 1}/{days + 1}일  관측 {counts['observations']:,}회  "
+                  f"({time.perf_counter() - started:.0f}초)", flush=True)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 크롤링 이력 DB 생성 (규모 테스트용)")
+    parser.add_argument('--db', required=True, help="생성할 DB 경로 (없는 파일)")
+    parser.add_argument('--days', type=int, default=365, help="이력 기간 (일, 매시간 크롤링)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f"카테고리당 상품 수 배수 (1 = {PRODUCTS_PER_CATEGORY}개)")
+    parser.add_argument('--brands', type=int, default=400, help="브랜드 수 (scale 배수 적용)")
+    parser.add_argument('--failure-rate', type=float, default=0.005, help="카테고리 크롤링 실패 확률")
+    parser.add_argument('--storage', choices=['rows', 'packed'], default=None,
+                        help="이력 저장 형식 (기본: HISTORY_STORAGE)")
+    parser.add_argument('--apply-retention', action='store_true',
+                        help="생성 후 보관 정책 적용 (운영 DB처럼 오래된 원본 이력 다운샘플링)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help="DB 파일이 있으면 지우고 생성")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            parser.error(f"{args.db} 가 이미 있습니다 (--force 로 덮어쓰기)")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+
+    rng = random.Random(args.seed)
+    products_per_category = max(1, round(PRODUCTS_PER_CATEGORY * args.scale))
+    market = SyntheticMarket(rng, products_per_category, max(1, round(args.brands * args.scale)))
+
+    print("=" * 70)
+    print(f"합성 이력 생성: {args.db}")
+    print(f"   {args.days}일 × 24시간, 카테고리 {len(CATEGORIES)}개 × {products_per_category}개 "
+          f"(예상 관측 약 {args.days * 24 * len(CATEGORIES) * products_per_category:,}회), seed={args.seed}")
+    print("=" * 70)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(args.db, history_storage=args.storage)
+    started = time.perf_counter()
+    # 생성 중에는 fsync 생략 (중간에 죽으면 다시 생성)
+    with db.get_connection() as conn:
+        conn.execute("PRAGMA synchronous=OFF")
+    counts = generate(db, args.days, market, rng, args.failure_rate)
+
+    if args.apply_retention:
+        with contextlib.redirect_stdout(io.StringIO()):
+            removed = db.apply_retention()
+        print(f"   보관 정책 적용: ranking_history {removed['ranking_history']:,}행 삭제")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = db.get_database_stats()
+    db.close()
+    elapsed = time.perf_counter() - started
+    print(f"\n✅ 완료 ({elapsed:.0f}초, 크롤링 {counts['crawls']:,}회, 관측 {counts['observations']:,}회, "
+          f"실패 스냅샷 {counts['failed_snapshots']:,}개)")
+    print(f"   상품 {stats['total_products']:,}개, 브랜드 {stats['total_brands']:,}개, "
+          f"ranking_history {stats['total_data_points']:,}행, 압축 이력 {stats['packed_history_days']:,}행")
+    print(f"   DB 크기 {os.path.getsize(args.db) / 1024 / 1024:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
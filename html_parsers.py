@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+상품 카드 HTML 파서 백엔드
+렌더링된 베스트 페이지 HTML → 상품 카드별 원본 레코드 리스트
+
+레코드 형태는 wconcept_scraper_v2.EXTRACT_PRODUCTS_JS 반환값과 같으며,
+WConceptScraper._normalize_record 가 상품 dict로 정규화합니다.
+
+백엔드:
+    html.parser   : BeautifulSoup + 내장 html.parser (기존 방식, 전체 문서 파싱)
+    lxml          : BeautifulSoup + lxml, 상품 카드만 파싱 (SoupStrainer)
+    lxml-xpath    : lxml.html + 미리 컴파일한 XPath (BeautifulSoup 트리 생성 없음)
+"""
+
+import os
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
+
+PRODUCT_CLASS = 'product-item'
+
+DEFAULT_PARSER = os.environ.get('SCRAPER_HTML_PARSER', 'lxml-xpath')
+
+
+def empty_record():
+    """카드에서 아무것도 찾지 못했을 때의 원본 레코드"""
+    return {'brand': None, 'name': None, 'customer_price': None,
+            'discount': None, 'final_price': None, 'image': "N/A", 'href': None}
+
+
+def _is_product_class(value):
+    """SoupStrainer용 class 매칭 (파싱 중에는 class가 공백 구분 문자열로 전달됨)"""
+    if not value:
+        return False
+    tokens = value.split() if isinstance(value, str) else value
+    return PRODUCT_CLASS in tokens
+
+
+class SoupCardParser:
+    """BeautifulSoup 기반 파서 (미리 컴파일한 CSS 셀렉터 사용)"""
+
+    CARD = soupsieve.compile(f'div.{PRODUCT_CLASS}')
+    TITLE = soupsieve.compile('.prdc-title')
+    TITLE_SPANS = soupsieve.compile('span.text')
+    PRICE = soupsieve.compile('.prdc-price')
+    PRICE_FIELDS = (
+        ('customer_price', soupsieve.compile('.customer-price')),
+        ('discount', soupsieve.compile('.final-discount em')),
+        ('final_price', soupsieve.compile('.final-price strong')),
+    )
+    IMG = soupsieve.compile('img')
+    LINK = soupsieve.compile('a')
+
+    def __init__(self, features='html.parser', strain=False):
+        """
+        Args:
+            features: BeautifulSoup 트리 빌더 ('html.parser' 또는 'lxml')
+            strain: True면 상품 카드(div.product-item)만 트리로 만듦
+        """
+        self.features = features
+        self.parse_only = SoupStrainer('div', class_=_is_product_class) if strain else None
+
+    def parse(self, content, max_products=None):
+        soup = BeautifulSoup(content, self.features, parse_only=self.parse_only)
+        cards = self.CARD.select(soup, limit=max_products or 0)
+        return [self.record_from_element(card) for card in cards]
+
+    @classmethod
+    def record_from_element(cls, elem):
+        """상품 카드 요소 → 원본 레코드"""
+        record = empty_record()
+
+        # 브랜드명과 상품명 (prdc-title 안에 있음)
+        title_section = cls.TITLE.select_one(elem)
+        if title_section:
+            title_spans = cls.TITLE_SPANS.select(title_section, limit=2)
+            if len(title_spans) > 0:
+                record['brand'] = title_spans[0].get_text(strip=True)
+            if len(title_spans) > 1:
+                record['name'] = title_spans[1].get_text(strip=True)
+
+        # 가격 섹션
+        price_section = cls.PRICE.select_one(elem)
+        if price_section:
+            for key, selector in cls.PRICE_FIELDS:
+                price_elem = selector.select_one(price_section)
+                if price_elem:
+                    record[key] = price_elem.get_text(strip=True)
+
+        # 이미지
+        img_elem = cls.IMG.select_one(elem)
+        if img_elem:
+            record['image'] = img_elem.get('src') or img_elem.get('data-src')
+
+        # 상세 링크
+        link_elem = cls.LINK.select_one(elem)
+        if link_elem:
+            record['href'] = link_elem.get('href')
+
+        return record
+
+
+def _has_class(name):
+    """XPath: class 속성에 name 토큰이 있는지"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlCardParser:
+    """lxml.html + 미리 컴파일한 XPath 파서 (가장 빠름)"""
+
+    CARD = etree.XPath(f"//div[{_has_class(PRODUCT_CLASS)}]")
+    TITLE_SPANS = etree.XPath(f"(.//*[{_has_class('prdc-title')}])[1]//span[{_has_class('text')}]")
+    HAS_TITLE = etree.XPath(f"boolean(.//*[{_has_class('prdc-title')}])")
+    PRICE = etree.XPath(f"(.//*[{_has_class('prdc-price')}])[1]")
+    PRICE_FIELDS = (
+        ('customer_price', etree.XPath(f"(.//*[{_has_class('customer-price')}])[1]")),
+        ('discount', etree.XPath(f"(.//*[{_has_class('final-discount')}]//em)[1]")),
+        ('final_price', etree.XPath(f"(.//*[{_has_class('final-price')}]//strong)[1]")),
+    )
+    IMG = etree.XPath("(.//img)[1]")
+    LINK = etree.XPath("(.//a)[1]")
+    TEXT = etree.XPath(".//text()")
+
+    def parse(self, content, max_products=None):
+        root = lxml_html.fromstring(content)
+        cards = self.CARD(root)
+        if max_products:
+            cards = cards[:max_products]
+        return [self.record_from_element(card) for card in cards]
+
+    @classmethod
+    def _text(cls, elem):
+        """BeautifulSoup get_text(strip=True)와 동일 (텍스트 노드별 strip 후 이어붙임)"""
+        return ''.join(part.strip() for part in cls.TEXT(elem))
+
+    @classmethod
+    def record_from_element(cls, elem):
+        """상품 카드 요소 → 원본 레코드"""
+        record = empty_record()
+
+        if cls.HAS_TITLE(elem):
+            title_spans = cls.TITLE_SPANS(elem)
+            if len(title_spans) > 0:
+                record['brand'] = cls._text(title_spans[0])
+            if len(title_spans) > 1:
+                record['name'] = cls._text(title_spans[1])
+
+        price_section = cls.PRICE(elem)
+        if price_section:
+            for key, selector in cls.PRICE_FIELDS:
+                price_elem = selector(price_section[0])
+                if price_elem:
+                    record[key] = cls._text(price_elem[0])
+
+        img_elem = cls.IMG(elem)
+        if img_elem:
+            record['image'] = img_elem[0].get('src') or img_elem[0].get('data-src')
+
+        link_elem = cls.LINK(elem)
+        if link_elem:
+            record['href'] = link_elem[0].get('href')
+
+        return record
+
+
+PARSERS = {
+    'html.parser': lambda: SoupCardParser('html.parser'),
+    'lxml': lambda: SoupCardParser('lxml', strain=True),
+    'lxml-xpath': LxmlCardParser,
+}
+
+
+def get_parser(name=None):
+    """이름으로 파서 백엔드 생성 (기본: SCRAPER_HTML_PARSER 또는 lxml-xpath)"""
+    name = name or DEFAULT_PARSER
+    if name not in PARSERS:
+        raise ValueError(f"Invalid HTML parser. Choose from: {list(PARSERS.keys())}")
+    return PARSERS[name]()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+W컨셉 목록 API 직접 호출 백엔드 (브라우저 없이 크롤링)
+- httpx.AsyncClient 커넥션 풀 + keep-alive 재사용
+- ETag / Last-Modified 기반 조건부 요청 (응답은 디스크에 캐시되어 매 시간 실행 간 유지)
+
+목록 API 주소는 환경변수 WCONCEPT_LISTING_URL 로 지정합니다.
+사용 가능한 치환자: {category_key}, {sub_category}, {page}, {size}
+예) 로컬 스텁 서버: http://127.0.0.1:8765/listing/{category_key}/{page}?size={size}
+"""
+
+import hashlib
+import json
+import os
+
+import httpx
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGES = 10
+
+
+class ListingHttpClient:
+    """목록 API용 비동기 HTTP 클라이언트 (여러 카테고리가 하나의 풀을 공유)"""
+
+    def __init__(self, url_template: str = None, cache_dir: str = None,
+                 max_connections: int = 8, timeout: float = 15.0, transport=None):
+        """
+        Args:
+            url_template: 목록 API URL 템플릿 (기본: WCONCEPT_LISTING_URL)
+            cache_dir: 조건부 요청용 응답 캐시 디렉토리 (기본: HTTP_CACHE_DIR 또는 .http_cache)
+            max_connections: 커넥션 풀 크기
+            timeout: 요청 타임아웃 (초)
+            transport: httpx 전송 계층 (테스트용 주입)
+        """
+        self.url_template = url_template or os.environ.get('WCONCEPT_LISTING_URL')
+        self.cache_dir = cache_dir or os.environ.get('HTTP_CACHE_DIR', '.http_cache')
+        self.stats = {'requests': 0, 'not_modified': 0, 'bytes': 0}
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=60.0,
+            ),
+            timeout=timeout,
+            headers={'User-Agent': USER_AGENT, 'Accept': 'application/json'},
+            transport=transport,
+        )
+
+    @property
+    def configured(self) -> bool:
+        """목록 API 주소가 설정되어 있는지 여부"""
+        return bool(self.url_template)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        await self._client.aclose()
+
+    def listing_url(self, category_key: str, sub_category: str, page: int, size: int) -> str:
+        """카테고리/페이지별 목록 API URL 생성"""
+        return self.url_template.format(
+            category_key=category_key,
+            sub_category=sub_category,
+            page=page,
+            size=size,
+        )
+
+    async def iter_listing_pages(self, category_key: str, sub_category: str,
+                                 max_products: int, page_size: int = DEFAULT_PAGE_SIZE):
+        """목록 API 응답(JSON)을 페이지 순서대로 반환하는 async generator"""
+        pages = min(MAX_PAGES, -(-max_products // page_size))
+        for page in range(1, pages + 1):
+            payload = await self.fetch_json(self.listing_url(category_key, sub_category, page, page_size))
+            if payload is None:
+                return
+            yield payload
+
+    async def fetch_json(self, url: str):
+        """조건부 GET: 캐시된 ETag/Last-Modified를 보내고 304면 캐시된 본문 사용"""
+        cached = self._load_cache(url)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        response = await self._client.get(url, headers=headers)
+        self.stats['requests'] += 1
+        self.stats['bytes'] += len(response.content)
+
+        if response.status_code == 304 and cached:
+            self.stats['not_modified'] += 1
+            return cached['body']
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+
+        body = response.json()
+        self._store_cache(url, response.headers, body)
+        return body
+
+    def _cache_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _load_cache(self, url: str):
+        try:
+            with open(self._cache_path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store_cache(self, url: str, headers, body):
+        if not (headers.get('etag') or headers.get('last-modified')):
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._cache_path(url), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'url': url,
+                    'etag': headers.get('etag'),
+                    'last_modified': headers.get('last-modified'),
+                    'body': body,
+                }, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️  HTTP 캐시 저장 실패: {str(e)}")
+
+
+def parse_backends(spec: str, category_keys) -> dict:
+    """'http' 또는 'outer=http,dress=playwright' 형식의 백엔드 설정 해석"""
+    backends = {key: 'playwright' for key in category_keys}
+    if not spec:
+        return backends
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '=' in part:
+            key, backend = (x.strip() for x in part.split('=', 1))
+            if key in backends:
+                backends[key] = backend
+        else:
+            backends = {key: part for key in category_keys}
+    return backends
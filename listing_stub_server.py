@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+목록 API 스텁 서버 (녹화된 응답 재생)
+HTTP 백엔드를 실제 사이트 없이 검증하기 위한 로컬 서버
+
+응답 파일 위치: <fixtures_dir>/<category_key>/listing_<page>.json
+요청 경로: /listing/<category_key>/<page>
+
+사용법:
+    python listing_stub_server.py [fixtures_dir] [port]
+    WCONCEPT_LISTING_URL='http://127.0.0.1:8765/listing/{category_key}/{page}?size={size}' \\
+        SCRAPER_BACKENDS=http python auto_crawl.py
+"""
+
+import hashlib
+import os
+import sys
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+
+def make_handler(fixtures_dir: str):
+    """fixtures_dir를 기준으로 응답하는 요청 핸들러 클래스 생성"""
+
+    class ListingStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive 지원
+
+        def do_GET(self):
+            parts = urlparse(self.path).path.strip('/').split('/')
+            if len(parts) != 3 or parts[0] != 'listing':
+                return self._send(404, b'')
+
+            path = os.path.join(fixtures_dir, parts[1], f'listing_{parts[2]}.json')
+            if not os.path.isfile(path):
+                return self._send(404, b'')
+
+            with open(path, 'rb') as f:
+                body = f.read()
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, b'', etag, last_modified)
+            return self._send(200, body, etag, last_modified)
+
+        def _send(self, status, body, etag=None, last_modified=None):
+            self.send_response(status)
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+            if status == 200:
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ListingStubHandler
+
+
+def serve(fixtures_dir: str = 'fixtures', port: int = 8765):
+    """스텁 서버 실행 (Ctrl+C로 종료)"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(fixtures_dir))
+    print(f"🧪 목록 API 스텁 서버: http://127.0.0.1:{port}/listing/<category_key>/<page>")
+    print(f"📂 응답 디렉토리: {os.path.abspath(fixtures_dir)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️  스텁 서버 종료")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    fixtures_dir = sys.argv[1] if len(sys.argv) > 1 else 'fixtures'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    serve(fixtures_dir, port)
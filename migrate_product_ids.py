@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+예전 hash() 기반 상품 ID → digest 기반 ID 마이그레이션 (1회 실행)
+
+hash()는 프로세스마다 값이 달라서, 이미지/URL에서 번호를 찾지 못한 상품은
+크롤링할 때마다 새 PROD_xxxxxxx 로 저장되었습니다.
+products 에 저장된 이미지/URL/브랜드/상품명으로 product_ids.canonical_product_id 를 다시 계산하여
+같은 상품의 중복 행을 products, ranking_history, ranking_changes, price_changes 에서 합칩니다.
+
+사용법:
+    python migrate_product_ids.py             # DB_PATH (기본 wconcept_tracking.db)
+    python migrate_product_ids.py --dry-run   # 변경 내용만 출력
+    python migrate_product_ids.py --db other.db
+"""
+
+import argparse
+import sqlite3
+from collections import Counter
+
+from database import Database
+from product_ids import LEGACY_HASH_ID_RE, canonical_product_id
+
+
+def build_id_map(db: Database) -> dict:
+    """예전 hash() ID → 새 ID 매핑"""
+    id_map = {}
+    with db.get_connection() as conn:
+        rows = conn.execute("""
+            SELECT product_id, image_url, product_url, brand_name, product_name
+            FROM products
+        """).fetchall()
+
+    for row in rows:
+        if not LEGACY_HASH_ID_RE.match(row['product_id']):
+            continue
+        new_id = canonical_product_id(row['image_url'], row['product_url'],
+                                      row['brand_name'], row['product_name'])
+        if new_id != row['product_id']:
+            id_map[row['product_id']] = new_id
+    return id_map
+
+
+def backup_database(db: Database, backup_path: str):
+    """SQLite 백업 API로 DB 복사 (파일 복사와 달리 WAL 에만 있는 커밋된 내용도 포함)"""
+    target = sqlite3.connect(backup_path)
+    try:
+        with db.read_connection() as conn:
+            conn.backup(target)
+    finally:
+        target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hash() 기반 상품 ID 중복 병합")
+    parser.add_argument('--db', default=None, help="DB 경로 (기본: DB_PATH 환경변수)")
+    parser.add_argument('--dry-run', action='store_true', help="변경하지 않고 결과만 출력")
+    parser.add_argument('--no-backup', action='store_true', help="실행 전 DB 백업 생략")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    id_map = build_id_map(db)
+    targets = Counter(id_map.values())
+
+    print("=" * 70)
+    print(f"상품 ID 마이그레이션: {db.db_path}")
+    print("=" * 70)
+    print(f"   예전 ID: {len(id_map)}개 → 새 ID: {len(targets)}개")
+    for new_id, count in targets.most_common(10):
+        print(f"   {new_id}: {count}개 병합")
+
+    if not id_map:
+        print("✅ 변경할 ID가 없습니다.")
+        return
+    if args.dry_run:
+        print("ℹ️  --dry-run: 변경하지 않았습니다.")
+        return
+
+    if not args.no_backup:
+        backup_path = db.db_path + '.bak'
+        backup_database(db, backup_path)
+        print(f"💾 백업: {backup_path}")
+
+    counts = db.merge_product_ids(id_map)
+    print("\n✅ 마이그레이션 완료")
+    for table, count in counts.items():
+        print(f"   {table}: {count:,}행")
+
+
+if __name__ == "__main__":
+    main()
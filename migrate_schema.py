@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+스키마 마이그레이션 실행 (PRAGMA user_version 기준, database.SCHEMA_MIGRATIONS)
+Database() 를 만들 때도 자동으로 실행되지만, 배포 시작 시 한 번 명시적으로 실행해 두면
+API/스케줄러/크롤러는 버전 확인만 하고 바로 시작합니다.
+
+사용법:
+    python migrate_schema.py            # DB_PATH (기본 wconcept_tracking.db)
+    python migrate_schema.py --status   # 현재 버전과 밀린 단계만 출력
+    python migrate_schema.py --db other.db
+"""
+
+import argparse
+import os
+import sqlite3
+
+from database import Database, SCHEMA_MIGRATIONS, SCHEMA_VERSION
+
+
+def main():
+    parser = argparse.ArgumentParser(description="스키마 마이그레이션 실행")
+    parser.add_argument('--db', default=None, help="DB 경로 (기본: DB_PATH 환경변수)")
+    parser.add_argument('--status', action='store_true', help="실행하지 않고 상태만 출력")
+    args = parser.parse_args()
+
+    db_path = args.db or os.environ.get('DB_PATH', 'wconcept_tracking.db')
+    version = 0
+    if os.path.exists(db_path):
+        conn = sqlite3.connect(db_path)
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    pending = [(step, description) for step, description, _ in SCHEMA_MIGRATIONS if step > version]
+    print(f"📊 스키마 버전: v{version} (최신 v{SCHEMA_VERSION}) - {db_path}")
+    for step, description in pending:
+        print(f"   대기: v{step} {description}")
+
+    if args.status or not pending:
+        return
+
+    db = Database(db_path)
+    print(f"✅ 스키마 v{db.schema_version()} 준비 완료")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+상품 이력 압축 저장 형식 (HISTORY_STORAGE=packed)
+
+ranking_history 는 관측 1회마다 행 하나(id, product_id 문자열, 타임스탬프 문자열, 인덱스 4개)를 쓰지만,
+packed 형식은 (상품, 날짜, 카테고리)마다 행 하나의 data BLOB에 그날 24시간 값을 시(hour) 위치 배열로 담습니다.
+
+    ranks           int16 × 24   (0 = 그 시간 관측 없음)
+    original_prices int32 × 24   (-1 = NULL)
+    sale_prices     int32 × 24   (-1 = NULL)
+    discount_rates  int16 × 24   (-1 = NULL)
+    seconds         int16 × 24   (정시 기준 수집 초, 0~3599)
+
+배열을 위 순서로 이어 붙인 336바이트(little-endian)를 zlib 으로 압축해 저장합니다.
+(하루 동안 가격/수집 초가 거의 같아서 보통 80바이트 안팎, 압축이 더 크면 원본 그대로 저장)
+같은 시간에 두 번 수집하면 나중 값으로 덮어씁니다.
+"""
+
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+
+SLOTS = 24
+MISSING_RANK = 0
+NULL_VALUE = -1
+
+# (배열 이름, array 타입 코드) - BLOB 안의 순서
+FIELDS = (
+    ('ranks', 'h'),
+    ('original_prices', 'i'),
+    ('sale_prices', 'i'),
+    ('discount_rates', 'h'),
+    ('seconds', 'h'),
+)
+RAW_SIZE = sum(array(typecode).itemsize * SLOTS for _, typecode in FIELDS)
+
+
+def empty_day() -> dict:
+    """관측이 없는 하루 배열"""
+    return {
+        name: array(typecode, [MISSING_RANK if name == 'ranks' else NULL_VALUE] * SLOTS)
+        for name, typecode in FIELDS
+    }
+
+
+def decode_day(blob: bytes) -> dict:
+    """data BLOB → 배열"""
+    if len(blob) != RAW_SIZE:
+        blob = zlib.decompress(blob)
+    day_arrays = {}
+    offset = 0
+    for name, typecode in FIELDS:
+        values = array(typecode)
+        size = values.itemsize * SLOTS
+        values.frombytes(blob[offset:offset + size])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        day_arrays[name] = values
+        offset += size
+    return day_arrays
+
+
+def encode_day(day_arrays: dict) -> bytes:
+    """배열 → data BLOB (압축해서 작아질 때만 압축)"""
+    parts = []
+    for name, typecode in FIELDS:
+        values = array(typecode, day_arrays[name])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        parts.append(values.tobytes())
+    raw = b''.join(parts)
+    compressed = zlib.compress(raw, 9)
+    return compressed if len(compressed) < RAW_SIZE else raw
+
+
+def _nullable(value) -> int:
+    return NULL_VALUE if value is None else int(value)
+
+
+def set_observation(day_arrays: dict, collected_at: datetime, ranking: int,
+                    original_price=None, sale_price=None, discount_rate=None):
+    """collected_at 시각의 시(hour) 위치에 관측값 기록"""
+    slot = collected_at.hour
+    day_arrays['ranks'][slot] = int(ranking)
+    day_arrays['original_prices'][slot] = _nullable(original_price)
+    day_arrays['sale_prices'][slot] = _nullable(sale_price)
+    day_arrays['discount_rates'][slot] = _nullable(discount_rate)
+    day_arrays['seconds'][slot] = collected_at.minute * 60 + collected_at.second
+
+
+def merge_days(target: dict, source: dict) -> dict:
+    """target 에 없는 시간만 source 에서 채움 (상품 ID 병합용)"""
+    for slot in range(SLOTS):
+        if target['ranks'][slot] == MISSING_RANK and source['ranks'][slot] != MISSING_RANK:
+            for name, _ in FIELDS:
+                target[name][slot] = source[name][slot]
+    return target
+
+
+def iter_observations(day: str, day_arrays: dict):
+    """하루 배열 → ranking_history 행과 같은 형태의 dict (시간순)"""
+    midnight = datetime.fromisoformat(day)
+    for slot in range(SLOTS):
+        ranking = day_arrays['ranks'][slot]
+        if ranking == MISSING_RANK:
+            continue
+        values = {name: day_arrays[name][slot] for name, _ in FIELDS}
+        collected_at = midnight + timedelta(hours=slot, seconds=values['seconds'])
+        yield {
+            'ranking': ranking,
+            'original_price': None if values['original_prices'] == NULL_VALUE else values['original_prices'],
+            'sale_price': None if values['sale_prices'] == NULL_VALUE else values['sale_prices'],
+            'discount_rate': None if values['discount_rates'] == NULL_VALUE else values['discount_rates'],
+            'collected_at': collected_at.strftime('%Y-%m-%d %H:%M:%S'),
+        }
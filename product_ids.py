@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+상품 ID 생성 규칙 (스크래퍼와 ID 마이그레이션 공통)
+
+우선순위:
+    1. 이미지 URL의 상품 번호   .../307602440_MA70111.jpg, .../301133668.jpg → PROD_307602440
+    2. 상세 URL의 상품 번호     /Product/307602440, ?productId=... → PROD_307602440
+    3. 내용 기반 digest        PROD_H + sha1(정규화한 URL 또는 브랜드|상품명) 앞 12자리
+
+digest는 프로세스와 무관하게 항상 같은 값이므로 (hash()와 달리)
+번호가 없는 상품도 크롤링마다 같은 ID로 이력이 이어집니다.
+"""
+
+import hashlib
+import re
+
+# 이미지 파일명 앞의 상품 번호 (접미사 _XXXX 는 있을 수도 없을 수도 있음)
+IMAGE_ID_RE = re.compile(r'/(\d{6,})(?:_[A-Za-z0-9]+)?\.jpg')
+
+PRODUCT_URL_ID_RES = tuple(re.compile(pattern) for pattern in (
+    r'/product/(\d+)',
+    r'/goods/(\d+)',
+    r'productId=(\d+)',
+    r'goodsId=(\d+)',
+    r'/(\d+)$',  # URL 끝의 숫자
+))
+
+# 예전 hash() 기반 대체 ID (PROD_ + 6~7자리, 실행마다 달라짐) → migrate_product_ids.py 대상
+LEGACY_HASH_ID_RE = re.compile(r'^PROD_\d{6,7}$')
+
+# 상품명 앞의 프로모션 태그 ([15%쿠폰], [한정특가] 등) → 기간마다 바뀌므로 digest에서 제외
+PROMO_TAG_RE = re.compile(r'^(\s*\[[^\]]*\])+')
+SPACES_RE = re.compile(r'\s+')
+
+
+def _normalize(text) -> str:
+    if text is None or text == "N/A":
+        return ''
+    return SPACES_RE.sub(' ', str(text)).strip().lower()
+
+
+def digest_product_id(*parts) -> str:
+    """정규화한 문자열들의 sha1 digest 기반 ID"""
+    key = '|'.join(_normalize(part) for part in parts)
+    return f"PROD_H{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+
+def product_number_from_image(image_url):
+    """이미지 URL → 상품 번호 (없으면 None)"""
+    if not image_url or image_url == "N/A":
+        return None
+    match = IMAGE_ID_RE.search(image_url)
+    return match.group(1) if match else None
+
+
+def product_id_from_url(url):
+    """상세 URL → 상품 ID (번호가 없으면 URL digest, URL이 없으면 None)"""
+    if not url or url == "N/A":
+        return None
+    for pattern in PRODUCT_URL_ID_RES:
+        match = pattern.search(url)
+        if match and match.group(1).strip('0'):
+            return f"PROD_{match.group(1)}"
+    return digest_product_id('url', url.split('#')[0])
+
+
+def content_product_id(brand_name, product_name) -> str:
+    """브랜드 + 상품명 digest (순위는 넣지 않음: 순위가 바뀌어도 같은 ID)"""
+    name = PROMO_TAG_RE.sub('', product_name or '') if product_name != "N/A" else product_name
+    return digest_product_id('content', brand_name, name)
+
+
+def canonical_product_id(image_url, product_url, brand_name, product_name) -> str:
+    """이미지 → 상세 URL → 브랜드/상품명 순서로 결정한 상품 ID"""
+    product_num = product_number_from_image(image_url)
+    if product_num:
+        return f"PROD_{product_num}"
+    return product_id_from_url(product_url) or content_product_id(brand_name, product_name)
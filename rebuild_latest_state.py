@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+product_latest_state 재생성
+ranking_history 전체에서 (상품, 카테고리)별 마지막 순위/가격, 처음/마지막 수집 시각, 수집 횟수를 다시 계산합니다.
+(이력을 직접 수정했거나 최신 상태 테이블이 어긋났을 때 사용, HISTORY_STORAGE=packed 이력이 있으면 거부)
+
+사용법:
+    python rebuild_latest_state.py              # DB_PATH (기본 wconcept_tracking.db)
+    python rebuild_latest_state.py --db other.db
+"""
+
+import argparse
+import sys
+import time
+
+from database import Database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="product_latest_state 재생성")
+    parser.add_argument('--db', default=None, help="DB 경로 (기본: DB_PATH 환경변수)")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    started = time.perf_counter()
+    try:
+        count = db.rebuild_latest_state()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ product_latest_state 재생성: {count:,}행 ({time.perf_counter() - started:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+API 응답 캐시 (api.py GET 엔드포인트 공통)
+
+데이터는 크롤링 때(1시간에 한 번)만 바뀌므로 직렬화가 끝난 응답 바이트를
+(경로, 정렬한 쿼리 파라미터, 데이터 버전) 키로 보관합니다.
+- 데이터 버전이 바뀌면(크롤링 커밋) 이전 항목을 모두 비움
+- LRU: 항목 수(RESPONSE_CACHE_MAX_ENTRIES) / 전체 크기(RESPONSE_CACHE_MAX_MB) 초과 시 오래 안 쓴 것부터 제거
+- TTL(RESPONSE_CACHE_TTL_SECONDS): 'now 기준 N일' 같은 조회 구간이 너무 오래 밀리지 않도록
+- metrics(): 적중/미스/제거 횟수 (API /api/cache/metrics)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Tuple
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '256'))  # 0이면 캐시 안 함
+RESPONSE_CACHE_MAX_MB = int(os.environ.get('RESPONSE_CACHE_MAX_MB', '64'))
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '300'))
+
+
+def make_key(path: str, query_items: Iterable[Tuple[str, str]]) -> Tuple:
+    """경로 + 쿼리 파라미터 (순서 무관, 빈 값 제외)"""
+    return (path, tuple(sorted((name, value) for name, value in query_items if value != '')))
+
+
+class ResponseCache:
+    """데이터 버전별 LRU 응답 캐시"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key → (저장 시각, 크기, 값)
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self._metrics = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+            'oversized': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def _set_version(self, version: Hashable):
+        """데이터 버전이 바뀌었으면 전부 비움 (호출자가 Lock 보유)"""
+        if version != self._version:
+            if self._entries:
+                self._metrics['invalidations'] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key: Hashable, version: Hashable):
+        """캐시된 값 (없거나 만료됐으면 None)"""
+        with self._lock:
+            self._set_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                self._remove(key)
+                self._metrics['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._metrics['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._metrics['hits'] += 1
+            return entry[2]
+
+    def put(self, key: Hashable, version: Hashable, value, size: int):
+        """값 저장 (size: 응답 바이트 수, 한도보다 크면 저장 안 함)"""
+        with self._lock:
+            self._set_version(version)
+            if size > self.max_bytes:
+                self._metrics['oversized'] += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), size, value)
+            self._bytes += size
+            self._metrics['stores'] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._metrics['evictions'] += 1
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """모두 비움 (같은 프로세스에서 데이터를 바꾼 뒤)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version = None
+
+    def metrics(self) -> Dict:
+        """적중률과 현재 크기"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            lookups = metrics['hits'] + metrics['misses']
+            metrics.update({
+                'hit_rate': round(metrics['hits'] / lookups, 4) if lookups else None,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'data_version': self._version,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+            })
+            return metrics
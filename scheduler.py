@@ -2,13 +2,25 @@
 """
 W Concept 크롤링 스케줄러
 매 시간 20분에 자동으로 크롤링 실행 (Fly.io 프로덕션)
+
+상주 브라우저 풀(browser_pool.py)을 띄워두고 크롤링을 같은 프로세스에서 실행합니다.
+- 매 실행마다 Chromium을 새로 띄우지 않음 (풀에서 컨텍스트만 빌려 씀)
+- API의 수동 크롤링 요청은 트리거 파일(CRAWL_TRIGGER_PATH)로 전달받음
+- CRAWL_MODE=subprocess 이면 기존처럼 auto_crawl.py를 별도 프로세스로 실행
+- 하루 한 번 크롤링 후 오래된 원본 이력 다운샘플링 (HISTORY_RAW_RETENTION_DAYS)
 """
 
 import asyncio
+import os
 import subprocess
 from datetime import datetime, timedelta
 import time
 
+CRAWL_MODE = os.environ.get('CRAWL_MODE', 'pool')
+CRAWL_TIMEOUT_SECONDS = 1200  # 20분 타임아웃 (8개 카테고리 크롤링 대응)
+CRAWL_TRIGGER_PATH = os.environ.get('CRAWL_TRIGGER_PATH', '/tmp/wconcept_crawl_trigger')
+HEARTBEAT_SECONDS = 30  # 대기 중 상태 파일 갱신/트리거 확인 주기
+
 def get_next_run_time():
     """다음 실행 시간 계산 (매 시간 20분)"""
     now = datetime.now()
@@ -24,9 +36,7 @@ def get_next_run_time():
     return next_run
 
 def run_crawl():
-    """크롤링 실행"""
-    import os
-    
+    """크롤링 실행 (별도 프로세스, CRAWL_MODE=subprocess)"""
     print("\n" + "=" * 80)
     print(f"🚀 자동 크롤링 시작: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 80)
@@ -41,7 +51,7 @@ def run_crawl():
             cwd=current_dir,
             capture_output=True,
             text=True,
-            timeout=1200  # 20분 타임아웃 (8개 카테고리 크롤링 대응)
+            timeout=CRAWL_TIMEOUT_SECONDS
         )
         
         print(result.stdout)
@@ -54,12 +64,109 @@ def run_crawl():
             print(f"❌ 크롤링 실패 (코드: {result.returncode})")
     
     except subprocess.TimeoutExpired:
-        print("❌ 크롤링 타임아웃 (10분 초과)")
+        print(f"❌ 크롤링 타임아웃 ({CRAWL_TIMEOUT_SECONDS // 60}분 초과)")
     except Exception as e:
         print(f"❌ 오류 발생: {str(e)}")
     
     print("=" * 80 + "\n")
 
+async def crawl_heartbeat(pool, reason):
+    """크롤링 중에도 주기적으로 상태 기록 (API가 오래된 상태로 보고 중복 크롤링을 시작하지 않도록)"""
+    while True:
+        pool.write_health({'crawl_running': True, 'crawl_reason': reason})
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+
+async def run_crawl_in_pool(pool, reason):
+    """상주 브라우저 풀로 크롤링 실행 (같은 프로세스)"""
+    from auto_crawl import crawl_all_categories
+
+    print(f"🚀 크롤링 시작 ({reason})")
+    started = time.perf_counter()
+    heartbeat = asyncio.create_task(crawl_heartbeat(pool, reason))
+    try:
+        await asyncio.wait_for(crawl_all_categories(browser=pool), timeout=CRAWL_TIMEOUT_SECONDS)
+        result = 'success'
+        print("✅ 크롤링 성공!")
+    except asyncio.TimeoutError:
+        result = 'timeout'
+        print(f"❌ 크롤링 타임아웃 ({CRAWL_TIMEOUT_SECONDS // 60}분 초과)")
+    except Exception as e:
+        result = f"error: {str(e)}"
+        print(f"❌ 오류 발생: {str(e)}")
+    finally:
+        heartbeat.cancel()
+
+    return {
+        'last_crawl_at': datetime.now().isoformat(),
+        'last_crawl_reason': reason,
+        'last_crawl_result': result,
+        'last_crawl_seconds': round(time.perf_counter() - started, 1),
+    }
+
+def pop_trigger():
+    """API가 남긴 수동 크롤링 요청 파일이 있으면 삭제하고 True"""
+    try:
+        os.remove(CRAWL_TRIGGER_PATH)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"⚠️  트리거 파일 처리 실패: {str(e)}")
+        return False
+
+async def wait_for_next_run(pool, next_run, last_crawl):
+    """다음 실행 시간까지 대기 (주기적으로 상태 기록, 수동 요청 시 즉시 반환)"""
+    while True:
+        if pop_trigger():
+            return 'manual'
+        remaining = (next_run - datetime.now()).total_seconds()
+        if remaining <= 0:
+            return 'scheduled'
+        pool.write_health({'crawl_running': False, 'next_run': next_run.isoformat(), **last_crawl})
+        await asyncio.sleep(min(HEARTBEAT_SECONDS, remaining))
+
+def run_daily_retention(last_day):
+    """하루 한 번 오래된 원본 이력 다운샘플링 (Database.apply_retention), 실행한 날짜 반환"""
+    today = datetime.now().date()
+    if last_day == today:
+        return last_day
+    
+    try:
+        from database import Database, HISTORY_RAW_RETENTION_DAYS
+        if HISTORY_RAW_RETENTION_DAYS <= 0:
+            return today
+        started = time.time()
+        counts = Database().apply_retention()
+        print(f"🧹 이력 다운샘플링 ({HISTORY_RAW_RETENTION_DAYS}일 이전): "
+              f"ranking_history {counts['ranking_history']:,}행, "
+              f"brand_category_stats {counts['brand_category_stats']:,}행 삭제 "
+              f"({time.time() - started:.1f}초)")
+    except Exception as e:
+        print(f"⚠️  이력 다운샘플링 실패: {e}")
+    return today
+
+async def run_with_pool():
+    """상주 브라우저 풀 스케줄러 루프"""
+    from browser_pool import BrowserPool
+
+    last_crawl = {}
+    last_retention_day = None
+    pop_trigger()  # 재시작 전에 남은 요청은 무시
+
+    async with BrowserPool() as pool:
+        print(f"🌐 상주 브라우저 풀 사용 (페이지 {pool.max_pages}개 / {pool.max_memory_mb}MB마다 재시작)")
+        print(f"🩺 상태 파일: {pool.health_path}\n")
+        while True:
+            next_run = get_next_run_time()
+            wait_seconds = (next_run - datetime.now()).total_seconds()
+            
+            print(f"⏰ 다음 실행 예정: {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"   (약 {int(wait_seconds/60)}분 후)\n")
+            
+            reason = await wait_for_next_run(pool, next_run, last_crawl)
+            last_crawl = await run_crawl_in_pool(pool, reason)
+            last_retention_day = await asyncio.to_thread(run_daily_retention, last_retention_day)
+
 def main():
     """메인 스케줄러 루프"""
     print("🔔 W Concept 크롤링 스케줄러 시작 (Fly.io 프로덕션)")
@@ -67,6 +174,11 @@ def main():
     print("✅ DB는 Fly.io 디스크에 직접 저장되어 즉시 반영됨")
     print("=" * 80 + "\n")
     
+    if CRAWL_MODE != 'subprocess':
+        asyncio.run(run_with_pool())
+        return
+
+    last_retention_day = None
     while True:
         next_run = get_next_run_time()
         now = datetime.now()
@@ -80,6 +192,7 @@ def main():
         
         # 크롤링 실행
         run_crawl()
+        last_retention_day = run_daily_retention(last_retention_day)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+SQLite 연결 관리 (database.py / api.py 공통)
+
+DB 파일마다 ConnectionManager 하나를 두고 연결을 재사용합니다.
+- 읽기: 최대 SQLITE_READ_POOL_SIZE 개 연결을 풀로 돌려 씀 (query_only, 다 쓰고 있으면 대기)
+- 쓰기: 연결 하나 (스레드 간 Lock, 같은 스레드에서 중첩되면 바깥 블록 끝에서 한 번 커밋)
+- PRAGMA(WAL, synchronous, cache_size, mmap_size, temp_store)는 연결을 만들 때 한 번만 설정
+- 연결마다 SQL 문 캐시(cached_statements) 사용
+- metrics(): 연결 생성/재사용/대기 횟수, 대기 시간 (API /api/db/metrics)
+- on_commit: 쓰기 블록이 실제로 데이터를 바꾸고 커밋된 뒤 호출 (database.py 가 데이터 버전 파일 기록에 사용)
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', '4'))
+SQLITE_CACHE_SIZE_MB = int(os.environ.get('SQLITE_CACHE_SIZE_MB', '32'))  # 연결마다
+SQLITE_MMAP_SIZE_MB = int(os.environ.get('SQLITE_MMAP_SIZE_MB', '256'))
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # WAL에서는 NORMAL도 커밋 후 손상 없음
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_SECONDS = 30.0  # DB Lock / 읽기 풀 대기
+
+
+class ConnectionManager:
+    """DB 파일 하나의 읽기 연결 풀 + 쓰기 연결"""
+
+    def __init__(self, db_path: str, read_pool_size: int = SQLITE_READ_POOL_SIZE):
+        self.db_path = db_path
+        self.read_pool_size = max(1, read_pool_size)
+        self._idle_readers = queue.LifoQueue()
+        self._readers_opened = 0
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._writer_depth = 0
+        self._wal_ready = False
+        self._closed = False
+        self.schema_version = 0  # Database.init_database 가 확인한 스키마 버전 (같은 프로세스에서 재확인 생략)
+        self.on_commit = None  # callable(conn): 바깥 쓰기 블록 커밋 후 (변경이 있었을 때만)
+        self._metrics_lock = threading.Lock()  # 여러 스레드에서 갱신
+        self._metrics = {
+            'connections_opened': 0,
+            'reader_acquires': 0,
+            'reader_reuses': 0,
+            'reader_waits': 0,
+            'reader_wait_ms': 0.0,
+            'writer_acquires': 0,
+            'writer_wait_ms': 0.0,
+        }
+
+    def _connect(self, readonly: bool) -> sqlite3.Connection:
+        """새 연결 + PRAGMA 설정 (연결당 한 번)"""
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        if not self._wal_ready:
+            # WAL은 DB 파일에 저장되므로 매니저당 한 번만 확인
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._wal_ready = True
+        conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_MB * 1024}")
+        conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_MB * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if readonly:
+            conn.execute("PRAGMA query_only=1")
+        self._count('connections_opened')
+        return conn
+
+    def _count(self, name: str, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        self._count('reader_acquires')
+        try:
+            conn = self._idle_readers.get_nowait()
+            self._count('reader_reuses')
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._readers_lock:
+            if self._readers_opened < self.read_pool_size:
+                self._readers_opened += 1
+                try:
+                    return self._connect(readonly=True)
+                except Exception:
+                    self._readers_opened -= 1
+                    raise
+
+        # 풀이 가득 참 → 반납될 때까지 대기
+        self._count('reader_waits')
+        started = time.perf_counter()
+        try:
+            conn = self._idle_readers.get(timeout=BUSY_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"읽기 연결 대기 시간 초과 ({self.read_pool_size}개 모두 사용 중)") from None
+        finally:
+            self._count('reader_wait_ms', (time.perf_counter() - started) * 1000)
+        self._count('reader_reuses')
+        return conn
+
+    def _release_reader(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            with self._readers_lock:
+                self._readers_opened -= 1
+            return
+        self._idle_readers.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """읽기 전용 연결 (풀에서 빌려서 반납)"""
+        conn = self._acquire_reader()
+        try:
+            yield conn
+        finally:
+            self._release_reader(conn)
+
+    @contextmanager
+    def writer(self):
+        """쓰기 연결 (한 번에 한 스레드, 블록이 끝나면 커밋 / 예외 시 롤백)"""
+        started = time.perf_counter()
+        with self._writer_lock:
+            self._count('writer_acquires')
+            self._count('writer_wait_ms', (time.perf_counter() - started) * 1000)
+            if self._writer is None:
+                self._writer = self._connect(readonly=False)
+            conn = self._writer
+            self._writer_depth += 1
+            changes_before = conn.total_changes
+            committed = False
+            try:
+                yield conn
+                if self._writer_depth == 1:
+                    conn.commit()
+                    committed = conn.total_changes != changes_before
+            except Exception:
+                if self._writer_depth == 1:
+                    conn.rollback()
+                raise
+            finally:
+                self._writer_depth -= 1
+            if committed and self.on_commit is not None:
+                try:
+                    self.on_commit(conn)
+                except Exception as e:
+                    print(f"⚠️  커밋 후 처리 실패: {e}")
+
+    def metrics(self) -> Dict:
+        """풀 상태와 누적 지표"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['reader_wait_ms'] = round(metrics['reader_wait_ms'], 3)
+        metrics['writer_wait_ms'] = round(metrics['writer_wait_ms'], 3)
+        metrics.update({
+            'db_path': self.db_path,
+            'read_pool_size': self.read_pool_size,
+            'readers_open': self._readers_opened,
+            'readers_idle': self._idle_readers.qsize(),
+            'readers_in_use': self._readers_opened - self._idle_readers.qsize(),
+            'writer_open': self._writer is not None,
+            'pragmas': {
+                'synchronous': SQLITE_SYNCHRONOUS,
+                'cache_size_mb': SQLITE_CACHE_SIZE_MB,
+                'mmap_size_mb': SQLITE_MMAP_SIZE_MB,
+                'temp_store': 'MEMORY',
+                'cached_statements': STATEMENT_CACHE_SIZE,
+            },
+        })
+        return metrics
+
+    def close(self):
+        """쉬고 있는 연결과 쓰기 연결 닫기 (사용 중인 읽기 연결은 반납될 때 닫힘)"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle_readers.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._readers_lock:
+                self._readers_opened -= 1
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path: str) -> ConnectionManager:
+    """DB 경로별 공용 ConnectionManager (같은 프로세스의 Database / API가 공유)"""
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None or manager._closed:
+            manager = _managers[key] = ConnectionManager(db_path)
+        return manager
+
+
+def close_all():
+    """모든 ConnectionManager 닫기 (API 종료 시)"""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    for manager in managers:
+        manager.close()
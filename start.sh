@@ -33,9 +33,9 @@ else
     echo "⚠️  Database file not found, will create new one"
 fi
 
-# 데이터베이스 초기화 (테이블 생성만)
-echo "📊 Initializing database..."
-python3 -c "from database import Database; db = Database(); print('✅ Database initialized')"
+# 스키마 마이그레이션 (PRAGMA user_version 기준, 최신이면 버전 확인만)
+echo "📊 Migrating database schema..."
+python3 migrate_schema.py
 
 # 크롤링 스케줄러 백그라운드 실행 (Option G)
 echo "⏰ Starting crawling scheduler..."
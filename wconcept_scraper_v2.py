@@ -5,11 +5,190 @@ W컨셉 베스트 상품 크롤러 v2
 """
 
 import asyncio
+import gzip
 import json
+import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 import re
+from urllib.parse import urlparse
+
+from html_parsers import SoupCardParser, get_parser
+from http_backend import ListingHttpClient, parse_backends
+from product_ids import canonical_product_id, product_id_from_url, product_number_from_image
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# 공유 브라우저로 동시에 크롤링할 카테고리 수 (환경변수로 조정)
+DEFAULT_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', '3'))
+
+# 상품 추출 방식
+#   'network'  : 목록 API 응답 JSON 사용 (없으면 evaluate → dom 순으로 대체)
+#   'evaluate' : 페이지 안에서 JS 한 번으로 상품 레코드 추출 (실패 시 dom)
+#   'dom'      : 렌더링된 HTML을 파서 백엔드로 파싱 (html_parsers, SCRAPER_HTML_PARSER)
+DEFAULT_EXTRACT_MODE = os.environ.get('SCRAPER_EXTRACT_MODE', 'network')
+EXTRACT_MODES = ('network', 'evaluate', 'dom')
+
+# 설정하면 카테고리별 렌더링 HTML과 목록 API 응답을 이 디렉토리에 저장 (오프라인 재생용 픽스처)
+DEFAULT_CAPTURE_DIR = os.environ.get('SCRAPER_CAPTURE_DIR')
+
+# 1로 설정하면 evaluate 결과를 기존 DOM 파서 결과와 비교하여 차이를 출력
+VERIFY_EXTRACT = os.environ.get('SCRAPER_VERIFY_EXTRACT', '0') == '1'
+
+# 자주 쓰는 정규식 (미리 컴파일)
+NUMBER_RE = re.compile(r'[\d,]+')
+DIGITS_RE = re.compile(r'(\d+)')
+
+# 페이지 안에서 실행되는 상품 카드 추출 함수
+# 텍스트는 BeautifulSoup의 get_text(strip=True)와 같게 (텍스트 노드별 trim 후 이어붙임)
+EXTRACT_PRODUCTS_JS = """
+([selector, maxProducts]) => {
+    const text = (el) => {
+        if (!el) return null;
+        const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        const parts = [];
+        while (walker.nextNode()) {
+            const value = walker.currentNode.nodeValue.trim();
+            if (value) parts.push(value);
+        }
+        return parts.join('');
+    };
+    return Array.from(document.querySelectorAll(selector)).slice(0, maxProducts).map((item) => {
+        const title = item.querySelector('.prdc-title');
+        const spans = title ? title.querySelectorAll('span.text') : [];
+        const price = item.querySelector('.prdc-price');
+        const img = item.querySelector('img');
+        const link = item.querySelector('a');
+        return {
+            brand: spans.length > 0 ? text(spans[0]) : null,
+            name: spans.length > 1 ? text(spans[1]) : null,
+            customer_price: price ? text(price.querySelector('.customer-price')) : null,
+            discount: price ? text(price.querySelector('.final-discount em')) : null,
+            final_price: price ? text(price.querySelector('.final-price strong')) : null,
+            image: img ? (img.getAttribute('src') || img.getAttribute('data-src')) : 'N/A',
+            href: link ? link.getAttribute('href') : null,
+        };
+    });
+}
+"""
+
+# 카테고리별 수집 백엔드: 'http' (목록 API 직접 호출) 또는 'playwright' (기본)
+# 예) SCRAPER_BACKENDS=http  또는  SCRAPER_BACKENDS=outer=http,dress=http
+DEFAULT_BACKENDS = os.environ.get('SCRAPER_BACKENDS', '')
+BACKENDS = ('playwright', 'http')
+
+# 상품 로딩 대기 (고정 sleep 대신 상품 수 증가/목록 응답을 기다림)
+PRODUCT_SELECTOR = 'div.product-item'
+FIRST_PRODUCTS_TIMEOUT_MS = 15000
+SCROLL_WAIT_INITIAL_MS = 3000
+SCROLL_WAIT_MIN_MS = 500
+SCROLL_WAIT_MAX_MS = 8000
+MAX_SCROLLS = 20
+
+
+async def launch_browser(playwright):
+    """헤드리스 Chromium 실행"""
+    return await playwright.chromium.launch(
+        headless=True,
+        args=['--no-sandbox', '--disable-dev-shm-usage']
+    )
+
+
+class ResourcePolicy:
+    """브라우저 컨텍스트 요청 차단 정책 (허용 도메인 > 차단 도메인 > 차단 리소스 타입 순)"""
+    
+    # 상품 이미지는 URL만 필요하므로 실제 다운로드는 차단
+    DEFAULT_BLOCKED_TYPES = ('image', 'media', 'font')
+    
+    # 서드파티 분석/광고 스크립트
+    DEFAULT_BLOCKED_DOMAINS = (
+        'google-analytics.com', 'googletagmanager.com', 'doubleclick.net',
+        'facebook.net', 'facebook.com', 'datadoghq.com', 'datadoghq-browser-agent.com',
+        'browser-intake-datadoghq.com', 'moloco.com', 'criteo.com', 'criteo.net',
+        'kakao.com', 'daumcdn.net', 'naver.net', 'tiktok.com', 'clarity.ms',
+    )
+    
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_domains=DEFAULT_BLOCKED_DOMAINS,
+                 allowed_domains=(), enabled=True):
+        self.blocked_types = set(blocked_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.allowed_domains = tuple(allowed_domains)
+        self.enabled = enabled
+    
+    @classmethod
+    def from_env(cls):
+        """환경변수로 정책 구성 (쉼표 구분 목록, RESOURCE_BLOCKING=0 이면 비활성화)"""
+        def env_list(name, default):
+            value = os.environ.get(name)
+            if value is None:
+                return default
+            return tuple(x.strip() for x in value.split(',') if x.strip())
+        
+        return cls(
+            blocked_types=env_list('RESOURCE_BLOCK_TYPES', cls.DEFAULT_BLOCKED_TYPES),
+            blocked_domains=env_list('RESOURCE_BLOCK_DOMAINS', cls.DEFAULT_BLOCKED_DOMAINS),
+            allowed_domains=env_list('RESOURCE_ALLOW_DOMAINS', ()),
+            enabled=os.environ.get('RESOURCE_BLOCKING', '1') != '0',
+        )
+    
+    @staticmethod
+    def _matches(host, domains):
+        return any(host == domain or host.endswith('.' + domain) for domain in domains)
+    
+    def should_block(self, resource_type, url):
+        """요청을 차단할지 여부"""
+        if not self.enabled:
+            return False
+        host = urlparse(url).hostname or ''
+        if self._matches(host, self.allowed_domains):
+            return False
+        if self._matches(host, self.blocked_domains):
+            return True
+        return resource_type in self.blocked_types
+    
+    async def apply(self, context, stats):
+        """컨텍스트에 라우팅 핸들러 등록 (차단 건수는 stats['blocked']에 누적)"""
+        if not self.enabled:
+            return
+        
+        async def handle(route):
+            request = route.request
+            if self.should_block(request.resource_type, request.url):
+                stats['blocked'] += 1
+                await route.abort()
+            else:
+                await route.continue_()
+        
+        await context.route('**/*', handle)
+
+
+class SharedBrowser:
+    """여러 카테고리가 공유하는 Chromium (처음 필요할 때만 실행)"""
+    
+    def __init__(self, playwright):
+        self._playwright = playwright
+        self._browser = None
+        self._lock = asyncio.Lock()
+    
+    @property
+    def launched(self):
+        return self._browser is not None
+    
+    async def new_context(self, **kwargs):
+        async with self._lock:
+            if self._browser is None:
+                print("🌐 공유 브라우저 실행 중...")
+                self._browser = await launch_browser(self._playwright)
+        return await self._browser.new_context(**kwargs)
+    
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+            print("\n✅ 공유 브라우저 종료")
+
 
 class WConceptScraper:
     """W컨셉 베스트 상품 크롤러"""
@@ -26,22 +205,68 @@ class WConceptScraper:
         'underwear': {'name': '언더웨어', 'sub_category': '10101212'},
     }
     
-    def __init__(self, category_key='outer'):
+    # 베스트 목록을 내려주는 API 호스트 (XHR 응답 캡처 대상)
+    LISTING_API_HOSTS = ('api-display.wconcept.co.kr', 'gw-front.wconcept.co.kr')
+    
+    # 목록 API 응답 필드 → 상품 필드 매핑 (앞의 키부터 조회)
+    PAYLOAD_FIELDS = {
+        'item_code': ('itemCd', 'itemCode', 'productNo', 'productId', 'goodsNo'),
+        'brand_name': ('brandNameKr', 'brandName', 'brandNm', 'brandNameEn'),
+        'product_name': ('itemName', 'productName', 'itemNm', 'goodsName', 'goodsNm'),
+        'original_price': ('customerPrice', 'originalPrice', 'normalPrice'),
+        'sale_price': ('finalPrice', 'salePrice', 'finalSalePrice'),
+        'discount_rate': ('finalDiscountRate', 'discountRate', 'saleRate'),
+        'image_url': ('imageUrlMobile', 'imageUrl', 'imgUrl', 'thumbnailUrl'),
+        'product_url': ('landingUrl', 'linkUrl', 'productUrl'),
+    }
+    
+    def __init__(self, category_key='outer', extract_mode=DEFAULT_EXTRACT_MODE, backend='playwright',
+                 resource_policy=None, html_parser=None, capture_dir=DEFAULT_CAPTURE_DIR):
         """
         Args:
             category_key: 'outer', 'dress', 'blouse', 'shirt', 'tshirt', 'knit', 'skirt', 'underwear' 중 하나
+            extract_mode: 'network' (목록 API JSON 우선), 'evaluate' (in-page JS) 또는 'dom' (HTML 파싱)
+            backend: 'playwright' 또는 'http' (실패 시 playwright로 대체)
+            resource_policy: 요청 차단 정책 (기본: ResourcePolicy.from_env())
+            html_parser: DOM 파싱 백엔드 이름 또는 인스턴스 (html_parsers 참고)
+            capture_dir: 픽스처 저장 디렉토리 (렌더링 HTML + 목록 API JSON)
         """
         if category_key not in self.CATEGORIES:
             raise ValueError(f"Invalid category. Choose from: {list(self.CATEGORIES.keys())}")
+        if extract_mode not in EXTRACT_MODES:
+            raise ValueError(f"Invalid extract mode. Choose from: {list(EXTRACT_MODES)}")
+        if backend not in BACKENDS:
+            raise ValueError(f"Invalid backend. Choose from: {list(BACKENDS)}")
         
         self.category_key = category_key
         self.category_name = self.CATEGORIES[category_key]['name']
-        sub_category = self.CATEGORIES[category_key]['sub_category']
+        self.sub_category = sub_category = self.CATEGORIES[category_key]['sub_category']
         self.url = f"https://display.wconcept.co.kr/rn/best?displayCategoryType=10101&displaySubCategoryType={sub_category}&gnbType=Y"
+        self.extract_mode = extract_mode
+        self.backend = backend
+        self.resource_policy = resource_policy or ResourcePolicy.from_env()
+        self.html_parser = html_parser if hasattr(html_parser, 'parse') else get_parser(html_parser)
+        self.capture_dir = capture_dir
+        self._raw_payloads = []
+        self.network_stats = {'requests': 0, 'bytes': 0, 'blocked': 0}
+        self._size_tasks = []
         self.products = []
+        self.elapsed_seconds = None
+        self.extract_source = None
+        self._payload_items = []
+        self._payload_codes = set()
+        self._capture_tasks = []
+        self._payload_event = None
+        self.phase_timings = {}
     
-    async def scrape(self, max_products=200):
-        """상품 데이터 크롤링"""
+    async def scrape(self, max_products=200, browser=None, http_client=None):
+        """상품 데이터 크롤링
+
+        Args:
+            max_products: 수집할 최대 상품 수
+            browser: 공유 Chromium 브라우저 (없으면 직접 실행 후 종료)
+            http_client: 공유 ListingHttpClient (http 백엔드용, 없으면 직접 생성)
+        """
         
         print("=" * 70)
         print(f"W컨셉 베스트 상품 크롤링 시작 - {self.category_name}")
@@ -51,161 +276,440 @@ class WConceptScraper:
         print(f"🔗 URL: {self.url}")
         print()
         
+        if self.backend == 'http':
+            if await self.scrape_http(max_products, client=http_client):
+                self._save_results()
+                return self.products
+            print(f"↩️  [{self.category_key}] HTTP 백엔드 실패 → Playwright로 대체")
+        
+        if browser is not None:
+            # 공유 브라우저 사용 (브라우저 종료는 호출자 책임)
+            await self._scrape_with_browser(browser, max_products)
+            return self.products
+        
         async with async_playwright() as p:
             # 브라우저 실행
             print("🌐 브라우저 실행 중...")
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-dev-shm-usage']
-            )
-            
-            context = await browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            
-            page = await context.new_page()
-            
+            browser = await launch_browser(p)
             try:
-                # 페이지 접속
-                print(f"📡 페이지 접속 중...")
-                await page.goto(self.url, wait_until='domcontentloaded', timeout=30000)
-                
-                # 페이지 로딩 대기
-                print("⏳ 페이지 로딩 대기...")
-                await asyncio.sleep(5)
-                
-                # 상품이 로드될 때까지 대기
-                try:
-                    await page.wait_for_selector('div.product-item', timeout=10000)
-                    print("✓ 상품 요소 로드됨")
-                except:
-                    print("⚠️  상품 요소 로드 타임아웃 (계속 진행)")
-                
-                # 스크롤하여 모든 상품 로드
-                print(f"📜 스크롤하여 {max_products}개 상품 로딩...")
-                await self._scroll_to_load_products(page, max_products)
-                
-                # 페이지 소스 가져오기
-                content = await page.content()
-                
-                # BeautifulSoup으로 파싱
-                print("🔍 HTML 파싱 중...")
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # 상품 요소 찾기
-                product_elements = soup.select('div.product-item')
-                print(f"✅ 발견된 상품: {len(product_elements)}개")
-                
-                # 각 상품 정보 추출
-                print("\n📦 상품 정보 추출 중...")
-                for idx, elem in enumerate(product_elements[:max_products], 1):
-                    try:
-                        product = self._extract_product_info(elem, idx)
-                        if product:
-                            self.products.append(product)
-                            if idx % 20 == 0:
-                                print(f"   진행: {idx}/{max_products}...")
-                    except Exception as e:
-                        print(f"   ⚠️  상품 {idx} 추출 실패: {str(e)}")
-                
-                print(f"\n✅ 총 {len(self.products)}개 상품 수집 완료!")
-                
-                # 결과 저장
-                self._save_results()
-                
-            except Exception as e:
-                print(f"\n❌ 오류 발생: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                await self._scrape_with_browser(browser, max_products)
             finally:
                 await browser.close()
                 print("\n✅ 브라우저 종료")
         
         return self.products
     
-    async def _scroll_to_load_products(self, page, target_count):
-        """스크롤하여 상품 로드"""
-        last_count = 0
-        scroll_attempts = 0
-        max_scrolls = 20  # 최대 스크롤 횟수
-        
-        while scroll_attempts < max_scrolls:
-            # 현재 로드된 상품 수 확인
-            current_count = await page.locator('div.product-item').count()
+    async def scrape_http(self, max_products=200, client=None):
+        """브라우저 없이 목록 API를 직접 호출해 크롤링 (성공 시 상품 리스트 반환)"""
+        started = time.perf_counter()
+        own_client = client is None
+        if own_client:
+            client = ListingHttpClient()
+        
+        products = []
+        try:
+            if not client.configured:
+                print(f"⚠️  [{self.category_key}] WCONCEPT_LISTING_URL 미설정")
+                return []
+            
+            print(f"📡 [{self.category_key}] 목록 API 호출 중 (HTTP 백엔드)...")
+            async for payload in client.iter_listing_pages(self.category_key, self.sub_category, max_products):
+                if not self.add_listing_payload(payload) or len(self._payload_items) >= max_products:
+                    break
+            products = await self._extract_from_payloads(max_products)
+        except Exception as e:
+            print(f"⚠️  [{self.category_key}] HTTP 백엔드 오류: {str(e)}")
+            products = []
+        finally:
+            if own_client:
+                await client.close()
+            if not products:
+                self._reset_payloads()
+        
+        if products:
+            self.products.extend(products)
+            self.extract_source = 'http'
+            self.elapsed_seconds = time.perf_counter() - started
+            print(f"\n✅ [{self.category_key}] 총 {len(self.products)}개 상품 수집 완료! (HTTP)")
+            print(f"⏱️  [{self.category_key}] 소요 시간: {self.elapsed_seconds:.1f}초")
+        return products
+    
+    def _reset_payloads(self):
+        """누적된 목록 API 응답 초기화"""
+        self._payload_items = []
+        self._payload_codes = set()
+        self._capture_tasks = []
+        self._raw_payloads = []
+    
+    async def _scrape_with_browser(self, browser, max_products):
+        """주어진 브라우저에 새 컨텍스트를 열어 크롤링"""
+        started = time.perf_counter()
+        
+        context = await browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=USER_AGENT
+        )
+        
+        # 이미지/폰트/분석 스크립트 차단 + 요청 수/바이트 집계
+        await self.resource_policy.apply(context, self.network_stats)
+        context.on('requestfinished', self._on_request_finished)
+        
+        page = await context.new_page()
+        
+        if self.extract_mode == 'network':
+            # 목록 API 응답을 가로채 JSON 그대로 보관
+            page.on('response', self._on_response)
+        
+        self._payload_event = asyncio.Event()
+        
+        try:
+            # 페이지 접속
+            print(f"📡 [{self.category_key}] 페이지 접속 중...")
+            async with self._phase('navigation'):
+                await page.goto(self.url, wait_until='domcontentloaded', timeout=30000)
+            
+            # 첫 상품이 보일 때까지 대기 (DOM 또는 목록 API 응답 중 먼저 오는 것)
+            async with self._phase('first_products'):
+                if await self._wait_for_more_products(page, 0, FIRST_PRODUCTS_TIMEOUT_MS):
+                    print(f"✓ [{self.category_key}] 상품 요소 로드됨")
+                else:
+                    print(f"⚠️  [{self.category_key}] 상품 요소 로드 타임아웃 (계속 진행)")
+            
+            # 스크롤하여 모든 상품 로드
+            print(f"📜 [{self.category_key}] 스크롤하여 {max_products}개 상품 로딩...")
+            async with self._phase('scroll'):
+                await self._scroll_to_load_products(page, max_products)
+            
+            if self.capture_dir:
+                if self._capture_tasks:
+                    await asyncio.gather(*self._capture_tasks, return_exceptions=True)
+                self.save_capture(await page.content())
+            
+            # 네트워크 응답 우선, 없으면 DOM 파싱
+            async with self._phase('extract'):
+                products = []
+                if self.extract_mode == 'network':
+                    products = await self._extract_from_payloads(max_products)
+                    if products:
+                        self.extract_source = 'network'
+                    else:
+                        print(f"⚠️  [{self.category_key}] 목록 API 응답 없음 → in-page 추출로 대체")
+                if not products and self.extract_mode in ('network', 'evaluate'):
+                    products = await self._extract_with_evaluate(page, max_products)
+                    if products:
+                        self.extract_source = 'evaluate'
+                if not products:
+                    products = await self._extract_from_dom(page, max_products)
+                    self.extract_source = 'dom'
+                self.products.extend(products)
+            
+            print(f"\n✅ [{self.category_key}] 총 {len(self.products)}개 상품 수집 완료!")
+            
+            # 결과 저장
+            self._save_results()
             
+        except Exception as e:
+            print(f"\n❌ [{self.category_key}] 오류 발생: {str(e)}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            if self._size_tasks:
+                await asyncio.gather(*self._size_tasks, return_exceptions=True)
+            await context.close()
+            self.elapsed_seconds = time.perf_counter() - started
+            phases = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in self.phase_timings.items())
+            print(f"⏱️  [{self.category_key}] 소요 시간: {self.elapsed_seconds:.1f}초 ({phases})")
+            print(f"📶 [{self.category_key}] 네트워크: 요청 {self.network_stats['requests']}건, "
+                  f"{self.network_stats['bytes'] / 1024:,.0f}KB 다운로드, 차단 {self.network_stats['blocked']}건")
+    
+    def _on_request_finished(self, request):
+        """완료된 요청 수와 전송 바이트(헤더+본문) 집계"""
+        self.network_stats['requests'] += 1
+        self._size_tasks.append(asyncio.ensure_future(self._add_request_bytes(request)))
+    
+    async def _add_request_bytes(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.network_stats['bytes'] += max(0, sizes.get('responseHeadersSize', 0)) + max(0, sizes.get('responseBodySize', 0))
+    
+    async def _extract_with_evaluate(self, page, max_products):
+        """page.evaluate 한 번으로 상품 카드 레코드를 받아 정규화 (HTML 전송/파싱 없음)"""
+        try:
+            records = await page.evaluate(EXTRACT_PRODUCTS_JS, [PRODUCT_SELECTOR, max_products])
+        except Exception as e:
+            print(f"⚠️  [{self.category_key}] in-page 추출 실패: {str(e)} → DOM 파싱으로 대체")
+            return []
+        
+        products = []
+        for idx, record in enumerate(records, 1):
+            try:
+                products.append(self._normalize_record(record, idx))
+            except Exception as e:
+                print(f"   ⚠️  [{self.category_key}] 상품 {idx} 정규화 실패: {str(e)}")
+        print(f"✅ [{self.category_key}] in-page 추출: {len(products)}개 상품")
+        
+        if VERIFY_EXTRACT and products:
+            expected = await self._extract_from_dom(page, max_products)
+            diffs = diff_products(expected, products)
+            if diffs:
+                print(f"⚠️  [{self.category_key}] in-page 추출 결과가 DOM 파서와 {len(diffs)}건 다름:")
+                for diff in diffs[:10]:
+                    print(f"   - {diff}")
+            else:
+                print(f"✓ [{self.category_key}] in-page 추출 결과가 DOM 파서와 일치")
+        
+        return products
+    
+    async def _extract_from_dom(self, page, max_products):
+        """렌더링된 HTML을 파서 백엔드로 파싱하여 상품 추출"""
+        content = await page.content()
+        return self.parse_html(content, max_products)
+    
+    def parse_html(self, content, max_products=200):
+        """HTML 문자열 → 상품 리스트 (저장된 페이지 재생/벤치마크에도 사용)"""
+        print(f"🔍 [{self.category_key}] HTML 파싱 중... ({type(self.html_parser).__name__})")
+        records = self.html_parser.parse(content, max_products)
+        print(f"✅ [{self.category_key}] 발견된 상품: {len(records)}개")
+        
+        # 각 상품 정보 추출
+        products = []
+        for idx, record in enumerate(records, 1):
+            try:
+                products.append(self._normalize_record(record, idx))
+            except Exception as e:
+                print(f"   ⚠️  [{self.category_key}] 상품 {idx} 추출 실패: {str(e)}")
+        
+        return products
+    
+    def _on_response(self, response):
+        """page.on('response') 핸들러: 목록 API 응답만 골라 비동기로 읽기"""
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        if not any(host in response.url for host in self.LISTING_API_HOSTS):
+            return
+        self._capture_tasks.append(asyncio.ensure_future(self._capture_response(response)))
+    
+    async def _capture_response(self, response):
+        """JSON 응답에서 상품 목록을 찾아 순서대로 누적"""
+        try:
+            if 'json' not in response.headers.get('content-type', ''):
+                return
+            payload = await response.json()
+        except Exception:
+            return
+        if self.add_listing_payload(payload) and self.capture_dir:
+            self._raw_payloads.append(payload)
+    
+    def add_listing_payload(self, payload):
+        """목록 API 응답(JSON) 하나를 누적 (페이지네이션 응답은 순서대로 이어붙임)
+
+        Returns:
+            새로 추가된 상품 수
+        """
+        added = 0
+        for item in self._find_payload_items(payload):
+            code = self._payload_value(item, 'item_code')
+            key = str(code) if code is not None else id(item)
+            if key in self._payload_codes:
+                continue
+            self._payload_codes.add(key)
+            self._payload_items.append(item)
+            added += 1
+        if added and self._payload_event is not None:
+            self._payload_event.set()
+        return added
+    
+    @classmethod
+    def _find_payload_items(cls, payload):
+        """응답 JSON 안에서 상품 목록 배열을 재귀적으로 탐색"""
+        if isinstance(payload, list):
+            if payload and all(isinstance(item, dict) for item in payload) and any(
+                cls._payload_value(item, 'item_code') is not None
+                and cls._payload_value(item, 'product_name') is not None
+                for item in payload
+            ):
+                return payload
+            for item in payload:
+                found = cls._find_payload_items(item)
+                if found:
+                    return found
+        elif isinstance(payload, dict):
+            for value in payload.values():
+                found = cls._find_payload_items(value)
+                if found:
+                    return found
+        return []
+    
+    @classmethod
+    def _payload_value(cls, item, field):
+        """매핑된 후보 키 중 처음으로 값이 있는 항목 반환"""
+        for key in cls.PAYLOAD_FIELDS[field]:
+            value = item.get(key)
+            if value not in (None, ''):
+                return value
+        return None
+    
+    async def _extract_from_payloads(self, max_products):
+        """캡처된 목록 API 응답에서 상품 추출 (HTML 직렬화/파싱 없음)"""
+        if self._capture_tasks:
+            await asyncio.gather(*self._capture_tasks, return_exceptions=True)
+        
+        products = []
+        for idx, item in enumerate(self._payload_items[:max_products], 1):
+            try:
+                products.append(self._product_from_payload(item, idx))
+            except Exception as e:
+                print(f"   ⚠️  [{self.category_key}] 상품 {idx} 변환 실패: {str(e)}")
+        
+        if products:
+            print(f"✅ [{self.category_key}] 목록 API 응답에서 {len(products)}개 상품 추출")
+        return products
+    
+    def _product_from_payload(self, item, rank):
+        """목록 API 상품 항목 → _extract_product_info와 동일한 상품 dict"""
+        
+        def to_int(value):
+            if value is None:
+                return None
+            if isinstance(value, (int, float)):
+                return int(value)
+            numbers = NUMBER_RE.findall(str(value))
+            return int(numbers[0].replace(',', '')) if numbers else None
+        
+        price_info = {
+            'original_price': to_int(self._payload_value(item, 'original_price')),
+            'sale_price': to_int(self._payload_value(item, 'sale_price')),
+            'discount_rate': to_int(self._payload_value(item, 'discount_rate')) or None,
+        }
+        if not price_info['sale_price'] and price_info['original_price']:
+            price_info['sale_price'] = price_info['original_price']
+        
+        brand_name = str(self._payload_value(item, 'brand_name') or "N/A").strip()
+        product_name = str(self._payload_value(item, 'product_name') or "N/A").strip()
+        image_url = self._payload_value(item, 'image_url') or "N/A"
+        
+        # 상품 번호는 API가 내려주는 값을 그대로 사용 (정확한 ID)
+        code = self._payload_value(item, 'item_code')
+        if code is not None and str(code).isdigit():
+            product_id = f"PROD_{code}"
+            product_url = f"https://www.wconcept.co.kr/Product/{code}"
+        else:
+            href = self._payload_value(item, 'product_url') or "N/A"
+            if href != "N/A" and not href.startswith('http'):
+                href = f"https://www.wconcept.co.kr{href}"
+            product_url = href
+            product_id = canonical_product_id(None, href, brand_name, product_name)
+        
+        return self._build_product(rank, product_id, brand_name, product_name,
+                                   price_info, image_url, product_url)
+    
+    @asynccontextmanager
+    async def _phase(self, name):
+        """구간별 소요 시간 기록 (navigation / first_products / scroll / extract)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_timings[name] = time.perf_counter() - started
+    
+    def _loaded_count(self, dom_count):
+        """현재까지 확보된 상품 수 (DOM 또는 목록 API 응답 중 큰 값)"""
+        return max(dom_count, len(self._payload_items))
+    
+    async def _wait_for_more_products(self, page, current_count, timeout_ms):
+        """상품 수가 current_count보다 늘어나거나 새 목록 응답이 올 때까지 대기
+
+        Returns:
+            제한 시간 안에 늘어났으면 True
+        """
+        self._payload_event.clear()
+        waiters = [asyncio.ensure_future(page.wait_for_function(
+            "([selector, n]) => document.querySelectorAll(selector).length > n",
+            arg=[PRODUCT_SELECTOR, current_count],
+            timeout=timeout_ms,
+        ))]
+        if self.extract_mode == 'network':
+            waiters.append(asyncio.ensure_future(self._payload_event.wait()))
+        
+        done, pending = await asyncio.wait(waiters, timeout=timeout_ms / 1000,
+                                           return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return any(not task.cancelled() and task.exception() is None for task in done)
+    
+    async def _scroll_to_load_products(self, page, target_count):
+        """스크롤하여 상품 로드
+
+        고정 sleep 대신 상품 수 증가(또는 목록 응답)를 기다리며,
+        대기 시간은 직전 로딩에 걸린 시간을 기준으로 조정합니다.
+        """
+        timeout_ms = SCROLL_WAIT_INITIAL_MS
+        current_count = self._loaded_count(await page.locator(PRODUCT_SELECTOR).count())
+        
+        for _ in range(MAX_SCROLLS):
             if current_count >= target_count:
                 print(f"   ✓ {current_count}개 상품 로드됨")
                 break
             
-            # 변화가 없으면 중단
-            if current_count == last_count:
-                scroll_attempts += 1
-                if scroll_attempts >= 3:
-                    print(f"   ⚠️  더 이상 로드되지 않음 (현재: {current_count}개)")
-                    break
-            else:
-                scroll_attempts = 0
-            
-            last_count = current_count
-            
-            # 페이지 끝까지 스크롤
+            # 페이지 끝까지 스크롤 후 로딩 대기
             await page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-            await asyncio.sleep(1.5)
+            started = time.perf_counter()
+            if not await self._wait_for_more_products(page, current_count, timeout_ms):
+                print(f"   ⚠️  더 이상 로드되지 않음 (현재: {current_count}개)")
+                break
+            
+            # 적응형 타임아웃: 관측된 로딩 시간의 3배 (최소/최대 제한)
+            observed_ms = (time.perf_counter() - started) * 1000
+            timeout_ms = min(SCROLL_WAIT_MAX_MS, max(SCROLL_WAIT_MIN_MS, observed_ms * 3))
+            current_count = self._loaded_count(await page.locator(PRODUCT_SELECTOR).count())
     
     def _extract_product_info(self, elem, rank):
-        """상품 정보 추출"""
-        
-        # 브랜드명과 상품명 (prdc-title 안에 있음)
-        title_section = elem.select_one('.prdc-title')
-        if title_section:
-            title_spans = title_section.select('span.text')
-            brand_name = title_spans[0].get_text(strip=True) if len(title_spans) > 0 else "N/A"
-            product_name = title_spans[1].get_text(strip=True) if len(title_spans) > 1 else "N/A"
-        else:
-            brand_name = "N/A"
-            product_name = "N/A"
+        """상품 정보 추출 (BeautifulSoup 요소)"""
+        return self._normalize_record(self._record_from_element(elem), rank)
+    
+    def _record_from_element(self, elem):
+        """상품 카드 요소(BeautifulSoup) → 원본 레코드 (EXTRACT_PRODUCTS_JS 반환값과 같은 형태)"""
+        return SoupCardParser.record_from_element(elem)
+    
+    def _normalize_record(self, record, rank):
+        """원본 레코드(텍스트) → 상품 dict (DOM 파싱/in-page 추출 공통)"""
+        brand_name = record['brand'] if record.get('brand') is not None else "N/A"
+        product_name = record['name'] if record.get('name') is not None else "N/A"
         
         # 가격 정보
-        price_info = self._extract_price_info(elem)
+        price_info = self._parse_price_info(record.get('customer_price'),
+                                            record.get('discount'),
+                                            record.get('final_price'))
         
         # 이미지
-        img_elem = elem.select_one('img')
-        image_url = img_elem.get('src') or img_elem.get('data-src') if img_elem else "N/A"
+        image_url = record.get('image')
         
-        # 상품 ID 및 URL 추출
-        product_id = None
+        # 상품 URL: 이미지의 상품 번호로 구성 (예: 307602440_MA70111.jpg → 307602440)
         product_url = "N/A"
+        product_num = product_number_from_image(image_url)
+        if product_num:
+            # W Concept 제품 상세 URL 구성
+            product_url = f"https://www.wconcept.co.kr/Product/{product_num}"
+        else:
+            # 이미지에서 실패하면 a 태그의 href 사용
+            href = record.get('href')
+            if href and href != "N/A":
+                if not href.startswith('http'):
+                    product_url = f"https://www.wconcept.co.kr{href}"
+                else:
+                    product_url = href
         
-        # 이미지 URL에서 상품 번호 추출 (예: 307602440_MA70111.jpg → 307602440)
-        if image_url and image_url != "N/A":
-            img_match = re.search(r'/(\d+)_[A-Z0-9]+\.jpg', image_url)
-            if img_match:
-                product_num = img_match.group(1)
-                product_id = f"PROD_{product_num}"
-                # W Concept 제품 상세 URL 구성
-                product_url = f"https://www.wconcept.co.kr/Product/{product_num}"
-        
-        # 이미지에서 실패하면 다른 방법 시도
-        if not product_id:
-            # a 태그에서 href 찾기
-            link_elem = elem.select_one('a')
-            if link_elem:
-                href = link_elem.get('href', "N/A")
-                if href and href != "N/A":
-                    if not href.startswith('http'):
-                        product_url = f"https://www.wconcept.co.kr{href}"
-                    else:
-                        product_url = href
-                    # URL에서 ID 추출
-                    product_id = self._extract_product_id(product_url)
-        
-        # 그래도 실패하면 rank와 브랜드/상품명 조합으로 고유 ID 생성
-        if not product_id or product_id == "PROD_0":
-            unique_str = f"{rank}_{brand_name}_{product_name}"
-            product_id = f"PROD_{abs(hash(unique_str)) % 10000000:07d}"
-            # URL도 없으면 N/A로 유지
+        # 상품 ID: 이미지 → URL → 브랜드/상품명 digest (실행마다 같은 값)
+        product_id = canonical_product_id(image_url, product_url, brand_name, product_name)
         
+        return self._build_product(rank, product_id, brand_name, product_name,
+                                   price_info, image_url, product_url)
+    
+    def _build_product(self, rank, product_id, brand_name, product_name, price_info, image_url, product_url):
+        """추출 경로와 무관하게 동일한 형태의 상품 dict 생성"""
         return {
             'rank': rank,
             'product_id': product_id,
@@ -222,7 +726,13 @@ class WConceptScraper:
         }
     
     def _extract_price_info(self, elem):
-        """가격 정보 추출"""
+        """가격 정보 추출 (BeautifulSoup 요소)"""
+        record = self._record_from_element(elem)
+        return self._parse_price_info(record['customer_price'], record['discount'], record['final_price'])
+    
+    @staticmethod
+    def _parse_price_info(customer_text, discount_text, final_text):
+        """가격 텍스트 → 원가/판매가/할인율"""
         price_info = {
             'original_price': None,
             'sale_price': None,
@@ -234,30 +744,22 @@ class WConceptScraper:
             if not text:
                 return None
             # 숫자와 쉼표만 추출
-            numbers = re.findall(r'[\d,]+', text)
+            numbers = NUMBER_RE.findall(text)
             if numbers:
                 return int(numbers[0].replace(',', ''))
             return None
         
-        # 가격 섹션 찾기
-        price_section = elem.select_one('.prdc-price')
-        if price_section:
-            # 원가
-            customer_price_elem = price_section.select_one('.customer-price')
-            if customer_price_elem:
-                price_info['original_price'] = extract_number(customer_price_elem.get_text(strip=True))
-            
-            # 할인율
-            discount_elem = price_section.select_one('.final-discount em')
-            if discount_elem:
-                discount_match = re.search(r'(\d+)', discount_elem.get_text(strip=True))
-                if discount_match:
-                    price_info['discount_rate'] = int(discount_match.group(1))
-            
-            # 최종 판매가
-            final_price_elem = price_section.select_one('.final-price strong')
-            if final_price_elem:
-                price_info['sale_price'] = extract_number(final_price_elem.get_text(strip=True))
+        # 원가
+        price_info['original_price'] = extract_number(customer_text)
+        
+        # 할인율
+        if discount_text:
+            discount_match = DIGITS_RE.search(discount_text)
+            if discount_match:
+                price_info['discount_rate'] = int(discount_match.group(1))
+        
+        # 최종 판매가
+        price_info['sale_price'] = extract_number(final_text)
         
         # 할인가가 없으면 판매가를 원가로
         if not price_info['sale_price'] and price_info['original_price']:
@@ -266,27 +768,26 @@ class WConceptScraper:
         return price_info
     
     def _extract_product_id(self, url):
-        """URL에서 상품 ID 추출"""
-        if not url or url == "N/A":
-            # URL이 없으면 이미지 URL에서 ID 추출 시도
-            return None
-        
-        # URL 패턴에서 ID 추출 시도
-        patterns = [
-            r'/product/(\d+)',
-            r'/goods/(\d+)',
-            r'productId=(\d+)',
-            r'goodsId=(\d+)',
-            r'/(\d+)$',  # URL 끝의 숫자
-        ]
+        """URL에서 상품 ID 추출 (번호가 없으면 URL digest, URL이 없으면 None)"""
+        return product_id_from_url(url)
+    
+    def save_capture(self, content):
+        """픽스처 저장: <capture_dir>/<category_key>/page.html.gz, listing_<n>.json
+
+        listing_<n>.json 은 listing_stub_server.py 가 그대로 재생할 수 있는 형식입니다.
+        기대 결과(expected.json)는 benchmark_fixtures.py --update 로 생성합니다.
+        """
+        directory = os.path.join(self.capture_dir, self.category_key)
+        os.makedirs(directory, exist_ok=True)
         
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return f"PROD_{match.group(1)}"
+        with gzip.open(os.path.join(directory, 'page.html.gz'), 'wt', encoding='utf-8') as f:
+            f.write(content)
+        for idx, payload in enumerate(self._raw_payloads, 1):
+            with open(os.path.join(directory, f'listing_{idx}.json'), 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
         
-        # 추출 실패 시 URL 해시값 사용
-        return f"PROD_{abs(hash(url)) % 1000000:06d}"
+        print(f"🗂️  [{self.category_key}] 픽스처 저장: {directory} "
+              f"(HTML {len(content) / 1024:,.0f}KB, 목록 응답 {len(self._raw_payloads)}개)")
     
     def _save_results(self):
         """결과 저장"""
@@ -348,23 +849,165 @@ class WConceptScraper:
             print(f"   최대 할인율: {max(discount_rates)}%")
 
 
-async def scrape_all_categories(max_products=200):
+async def iter_category_batches(category_keys=None, max_products=200, concurrency=DEFAULT_CONCURRENCY,
+                                extract_mode=DEFAULT_EXTRACT_MODE, backends=DEFAULT_BACKENDS, browser=None,
+                                report=None, queue_size=1):
+    """카테고리 크롤링이 끝나는 대로 (category_key, 상품 리스트)를 반환하는 async generator
+
+    Chromium 하나(또는 browser)를 공유하여 여러 카테고리를 동시에 크롤링합니다.
+    완료된 배치는 크기 queue_size인 큐를 거쳐 전달되므로, 소비 쪽(DB 저장)이 밀리면
+    다음 카테고리는 결과를 넘기기 전에 대기합니다 (메모리에 쌓이는 배치 수 제한).
+    실패한 카테고리는 빈 리스트로 전달됩니다.
+
+    Args:
+        category_keys: 크롤링할 카테고리 목록 (기본: 전체)
+        max_products: 카테고리당 최대 상품 수
+        concurrency: 동시에 열어둘 페이지(컨텍스트) 수
+        extract_mode: 'network' 또는 'dom' (WConceptScraper 참고)
+        backends: 카테고리별 백엔드 dict 또는 SCRAPER_BACKENDS 형식 문자열
+        browser: 외부에서 관리하는 브라우저 (예: BrowserPool). 없으면 이번 실행용으로 띄움
+        report: 전달하면 모든 배치가 끝난 뒤 실행 리포트로 채워짐
+        queue_size: 소비되지 않은 채 대기할 수 있는 완료 배치 수
+    """
+    if category_keys is None:
+        category_keys = list(WConceptScraper.CATEGORIES.keys())
+    concurrency = max(1, int(concurrency))
+    if not isinstance(backends, dict):
+        backends = parse_backends(backends, category_keys)
+    
+    timings = {key: None for key in category_keys}
+    network = {key: None for key in category_keys}
+    phases = {key: None for key in category_keys}
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = asyncio.Queue(maxsize=max(1, int(queue_size)))
+    started = time.perf_counter()
+    
+    async def run_category(browser, http_client, category_key):
+        products = []
+        async with semaphore:
+            try:
+                scraper = WConceptScraper(category_key=category_key, extract_mode=extract_mode,
+                                          backend=backends.get(category_key, 'playwright'))
+                products = await scraper.scrape(max_products=max_products, browser=browser,
+                                                http_client=http_client)
+                timings[category_key] = scraper.elapsed_seconds
+                network[category_key] = scraper.network_stats
+                phases[category_key] = scraper.phase_timings
+            except Exception as e:
+                print(f"❌ {category_key} 카테고리 크롤링 실패: {str(e)}")
+        # 세마포어를 놓은 뒤 전달 → 저장을 기다리는 동안 다음 카테고리가 로딩됨
+        await batches.put((category_key, products))
+    
+    async def run_all():
+        async with ListingHttpClient() as http_client:
+            if browser is not None:
+                await asyncio.gather(*(run_category(browser, http_client, key) for key in category_keys))
+            else:
+                async with async_playwright() as p:
+                    shared = SharedBrowser(p)
+                    try:
+                        await asyncio.gather(*(run_category(shared, http_client, key) for key in category_keys))
+                    finally:
+                        await shared.close()
+    
+    print(f"🚀 카테고리 {len(category_keys)}개 크롤링 (동시 실행: {concurrency})")
+    producer = asyncio.ensure_future(run_all())
+    try:
+        while True:
+            if producer.done():
+                # 모든 카테고리 종료: 남은 배치만 전달
+                while not batches.empty():
+                    yield batches.get_nowait()
+                break
+            getter = asyncio.ensure_future(batches.get())
+            done, _ = await asyncio.wait((getter, producer), return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+            else:
+                getter.cancel()
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+    
+    if report is not None:
+        report.update({
+            'concurrency': concurrency,
+            'category_seconds': timings,
+            'category_network': network,
+            'category_phases': phases,
+            'total_seconds': time.perf_counter() - started,
+        })
+
+
+async def scrape_categories(category_keys=None, max_products=200, concurrency=DEFAULT_CONCURRENCY,
+                            extract_mode=DEFAULT_EXTRACT_MODE, backends=DEFAULT_BACKENDS, browser=None):
+    """Chromium 하나를 띄워 여러 카테고리를 동시에 크롤링 (전체 결과를 모아서 반환)
+
+    인자는 iter_category_batches 와 같습니다.
+
+    Returns:
+        (카테고리별 상품 dict, 실행 리포트 dict)
+    """
+    if category_keys is None:
+        category_keys = list(WConceptScraper.CATEGORIES.keys())
+    
+    results = {key: [] for key in category_keys}
+    report = {}
+    async for category_key, products in iter_category_batches(
+            category_keys, max_products, concurrency, extract_mode, backends, browser, report=report):
+        results[category_key] = products
+    print_timing_report(results, report)
+    
+    return results, report
+
+
+def diff_products(expected, actual, ignore=('collected_at',)):
+    """두 추출 결과를 비교하여 차이점 목록 반환 (추출 경로 간 정확성 비교용)"""
+    diffs = []
+    if len(expected) != len(actual):
+        diffs.append(f"상품 수: {len(expected)} != {len(actual)}")
+    for a, b in zip(expected, actual):
+        for key in a:
+            if key in ignore:
+                continue
+            if a.get(key) != b.get(key):
+                diffs.append(f"rank {a['rank']} {key}: {a.get(key)!r} != {b.get(key)!r}")
+    return diffs
+
+
+def print_timing_report(results, report):
+    """카테고리별 / 전체 소요 시간 출력"""
+    print(f"\n{'='*70}")
+    print(f"⏱️  크롤링 소요 시간 (동시 실행: {report['concurrency']})")
+    print(f"{'='*70}")
+    for category_key, seconds in report['category_seconds'].items():
+        count = len(results.get(category_key, []))
+        elapsed = f"{seconds:6.1f}초" if seconds is not None else "   실패"
+        stats = report['category_network'].get(category_key) or {}
+        network = (f"  요청 {stats['requests']}건 / {stats['bytes'] / 1024:,.0f}KB / 차단 {stats['blocked']}건"
+                   if stats.get('requests') else "")
+        print(f"   {category_key:10s} : {elapsed}  ({count}개){network}")
+        phase_timings = report['category_phases'].get(category_key)
+        if phase_timings:
+            print("   " + " " * 13 + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in phase_timings.items()))
+    print(f"   {'전체':9s} : {report['total_seconds']:6.1f}초")
+    total_bytes = sum((stats or {}).get('bytes', 0) for stats in report['category_network'].values())
+    total_requests = sum((stats or {}).get('requests', 0) for stats in report['category_network'].values())
+    if total_requests:
+        print(f"   {'네트워크':7s} : 요청 {total_requests}건, {total_bytes / 1024 / 1024:,.1f}MB")
+
+
+async def scrape_all_categories(max_products=200, concurrency=DEFAULT_CONCURRENCY):
     """모든 카테고리 크롤링"""
-    all_products = []
     
     print("\n" + "=" * 70)
     print("🚀 전체 카테고리 크롤링 시작")
     print("=" * 70)
     
-    for category_key in WConceptScraper.CATEGORIES.keys():
-        try:
-            print(f"\n{'='*70}")
-            scraper = WConceptScraper(category_key=category_key)
-            products = await scraper.scrape(max_products=max_products)
-            all_products.extend(products)
-            print(f"✅ {scraper.category_name}: {len(products)}개 상품 수집 완료")
-        except Exception as e:
-            print(f"❌ {category_key} 카테고리 크롤링 실패: {str(e)}")
+    results, _ = await scrape_categories(max_products=max_products, concurrency=concurrency)
+    all_products = [product for products in results.values() for product in products]
     
     print(f"\n{'='*70}")
     print(f"🎉 전체 크롤링 완료! 총 {len(all_products)}개 상품 수집")